@@ -1,3 +1,5 @@
 FOLDERPATH = "files"
 CHROMA_COLLECTION_NAME = "groq_rag"
 CHROMA_PERSIST_DIR = "./vectorstore"
+# Identifiers one /operation-definitions request may resolve
+MAX_OPERATION_DEFINITION_INPUTS = 1000
@@ -1,5 +1,4 @@
 import sys
-import inspect
 import json
 import os
 import nltk
@@ -7,6 +6,10 @@ import spacy
 import textwrap
 from nltk.corpus import wordnet as wn
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from multi_layer_operation_predictor.function_scanner import extract_functions
+
 nltk.download('wordnet')
 
 nlp = spacy.load("en_core_web_md")
@@ -60,27 +63,25 @@ def split_function_name(function_name):
 
     return variations, phrase_combinations
 
-def get_function_details(func):
+def get_function_details(operation_name, source_code):
     """Retrieve details about the function including name, source, and input examples."""
-    source_code = inspect.getsource(func)
     source_code = textwrap.dedent(source_code)
 
-    operation_name = func.__name__
-    related_words = get_related_words_wordnet(func.__name__)
-    spacy_related_words = get_related_words_spacy(func.__name__)
+    related_words = get_related_words_wordnet(operation_name)
+    spacy_related_words = get_related_words_spacy(operation_name)
     related_words.extend(spacy_related_words)
 
     relevant_related_words = [word for word in related_words if len(word) > 2]
 
-    name_variations, phrase_combinations = split_function_name(func.__name__)
+    name_variations, phrase_combinations = split_function_name(operation_name)
 
     input_examples = [
-        func.__name__,
+        operation_name,
     ] + list(name_variations.values()) + relevant_related_words + phrase_combinations
 
     input_examples = list(set(input_examples))
 
-    if len(func.__name__.split('_')) == 1:
+    if len(operation_name.split('_')) == 1:
         unique_input_examples = list(set(input_examples))
         unique_input_examples.extend(relevant_related_words)
         input_examples = list(set(unique_input_examples))
@@ -92,18 +93,9 @@ def get_function_details(func):
     }
 
 def extract_functions_from_file(file_path):
-    """Extract functions from a Python file."""
-    dir_path = os.path.dirname(file_path)
-
-    sys.path.append(dir_path)
-
-    module_name = os.path.basename(file_path).replace('.py', '')
-
-    module = __import__(module_name)
-
-    functions = [getattr(module, func) for func in dir(module) if inspect.isfunction(getattr(module, func))]
-
-    return functions
+    """Extract functions from a Python file without importing it."""
+    with open(file_path, 'r') as file:
+        return extract_functions(file.read(), 'python')
 
 def parse_functions():
     """parse_functions function to parse all Python files and save the function details to a JSON file."""
@@ -114,11 +106,14 @@ def parse_functions():
         if file_name.endswith('.py'):
             file_path = os.path.join(directory_path, file_name)
             functions = extract_functions_from_file(file_path)
-            function_details = [get_function_details(func) for func in functions]
+            function_details = [get_function_details(name, code) for name, code in functions.items()]
             all_function_details.extend(function_details)
 
-    # Output file for JSON
-    output_file = 'operations_data.json'
+    # Output file for JSON, the operation predictor reads its input examples as aliases
+    output_file = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        'multi_layer_operation_predictor', 'data', 'python_operations_data.json'
+    )
 
     # Save the details to a JSON file
     with open(output_file, 'w') as json_file:
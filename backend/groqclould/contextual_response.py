@@ -1,4 +1,7 @@
 import os
+import threading
+import time
+import logging
 import chromadb
 import nest_asyncio
 from typing import List
@@ -27,6 +30,11 @@ if not GROQ_API_KEY:
     raise ValueError("GROQ_API_KEY environment variable is not set.")
 os.environ["GROQ_API_KEY"] = GROQ_API_KEY
 
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_NAME = "BAAI/bge-small-en-v1.5"
+RAG_LLM_MODEL_NAME = "llama3-8b-8192"
+
 # Initialize Chroma collection name
 def initialize_models() -> tuple:
     """
@@ -35,10 +43,61 @@ def initialize_models() -> tuple:
     Returns:
         tuple: A tuple containing the embedding model and the RAG LLM model.
     """
-    embed_model = HuggingFaceEmbeddings(model_name="BAAI/bge-small-en-v1.5")
-    rag_llm = ChatGroq(model="llama3-8b-8192")
+    embed_model = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+    rag_llm = ChatGroq(model=RAG_LLM_MODEL_NAME)
     return embed_model, rag_llm
 
+class ContextualModels:
+    """
+    The embedding model and the RAG LLM, loaded once per process and shared by all requests.
+
+    Loading the embedding model takes seconds, so it happens on the first get() or in the
+    background after warm(). Both models are safe to use from several threads at once.
+    """
+
+    def __init__(self):
+        self._models = None
+        self._lock = threading.Lock()
+        self.load_seconds = None
+        self.error = None
+
+    def get(self) -> tuple:
+        """Returns (embedding model, RAG LLM), loading them the first time they are needed."""
+        if self._models is None:
+            with self._lock:
+                if self._models is None:
+                    started = time.perf_counter()
+                    try:
+                        self._models = initialize_models()
+                    except Exception as e:
+                        self.error = str(e)
+                        raise
+                    self.load_seconds = time.perf_counter() - started
+                    self.error = None
+                    logger.info(f"Loaded {EMBEDDING_MODEL_NAME} and {RAG_LLM_MODEL_NAME} in {self.load_seconds:.1f}s")
+        return self._models
+
+    def warm(self):
+        """Starts loading the models in the background so no request waits for them."""
+        def load():
+            try:
+                self.get()
+            except Exception:
+                logger.exception("Failed to load the contextual response models")
+
+        threading.Thread(target=load, name="contextual-models-loader", daemon=True).start()
+
+    def status(self) -> dict:
+        return {
+            "resident": self._models is not None,
+            "embedding_model": EMBEDDING_MODEL_NAME,
+            "llm_model": RAG_LLM_MODEL_NAME,
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+        }
+
+contextual_models = ContextualModels()
+
 def load_files_and_create_retriever(directory: str, embed_model: HuggingFaceEmbeddings):
     """
     Load files from the specified directory, split them into chunks, and create a retriever.
@@ -131,7 +190,7 @@ async def get_contextual_response(question: str) -> str:
     Returns:
         str: The generated response.
     """
-    embed_model, rag_llm = initialize_models()
+    embed_model, rag_llm = contextual_models.get()
 
     # Load files and create a retriever
     retriever = load_files_and_create_retriever(FOLDERPATH, embed_model)
@@ -1,16 +1,32 @@
 import base64
 from flask import request
+from multi_layer_operation_predictor.tenants import get_tenant_key
 
 def make_key():
-    """Generate a cache key from request data"""
+    """Generate a cache key from request data, per user since responses may use their extracted functions"""
     user_data = request.get_json()
     sorted_items = sorted(user_data.items())
     endpoint = request.endpoint
-    return f"{endpoint}:{','.join([f'{k}={v}' for k, v in sorted_items])}"
+    user_id = getattr(request, "user", {}).get("sub")
+    return f"{endpoint}:{user_id}:{','.join([f'{k}={v}' for k, v in sorted_items])}"
 
 def decode_code(encoded_data: str) -> str:
     """Decode base64 encoded data"""
     try:
         return base64.b64decode(encoded_data).decode('utf-8')
     except Exception as e:
-        raise ValueError("Invalid encoded code") 
+        raise ValueError("Invalid encoded code")
+
+def get_request_tenant(data):
+    """
+    Tenant whose extracted functions a request searches, None for the shared ones.
+
+    The user is the one authenticated by requires_auth, never one named in the request body.
+
+    Raises:
+        ValueError: When the request's repo_url is not a repository URL.
+    """
+    repo_url = data.get("repo_url")
+    if not repo_url:
+        return None
+    return get_tenant_key(request.user["sub"], repo_url)
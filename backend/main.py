@@ -1,8 +1,8 @@
 import os
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 from flask_caching import Cache
-from constants import FOLDERPATH
+from constants import FOLDERPATH, MAX_OPERATION_DEFINITION_INPUTS
 from db.sqlalchemy_orm import (
     save_chat_message,
     get_chat_messages_by_page,
@@ -17,14 +17,20 @@ from db.sqlalchemy_orm import (
 )
 from sqlalchemy import func
 from mappers.model_mapper import map_models, map_chat_models
+from groqclould.contextual_response import contextual_models
+from multi_layer_operation_predictor.operation_predictor import (
+    warm_operation_predictor,
+    get_operation_definitions,
+)
+from multi_layer_operation_predictor.telemetry import metrics as predictor_metrics
 from config import get_cache_config
 import nest_asyncio
 from dotenv import load_dotenv
-from helpers.request_helper import make_key
+from helpers.request_helper import get_request_tenant, make_key
 from scheduler.token_scheduler import token_scheduler
 import logging
 import atexit
-from routes.github_routes import get_github_token_route, extract_repo_functions
+from routes.github_routes import get_github_token_route, extract_repo_functions, get_extraction_status, extraction_jobs
 from auth.clerk_auth import requires_auth
 
 # Setup logging
@@ -45,6 +51,19 @@ cache = Cache(app)
 # Register scheduler shutdown on app exit
 atexit.register(token_scheduler.stop)
 
+# Background startup work runs in the process serving requests only, since the debug
+# reloader's watcher process imports this module too
+if __name__ != "__main__" or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+    # Queue repository extractions left unfinished by the last run again
+    extraction_jobs.resume()
+    atexit.register(extraction_jobs.stop)
+
+    # Load the multi-layer predictor's lemmatizer and ML models in the background
+    warm_operation_predictor()
+
+    # Load the embedding model and Groq LLM of contextual completions in the background
+    contextual_models.warm()
+
 @app.route("/train-model", methods=["POST"])
 @requires_auth
 def train_model():
@@ -71,11 +90,37 @@ def generate_code_snippet():
     language = data.get("language")
     model = data.get("model")
     enableContextualResponse = data.get("toggle")
+    try:
+        tenant = get_request_tenant(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     response = map_models(
-        model, prefix, currentLine, suffix, language, enableContextualResponse
+        model, prefix, currentLine, suffix, language, enableContextualResponse, tenant
     )
     return response
 
+@app.route("/operation-definitions", methods=["POST"])
+@requires_auth
+def operation_definitions():
+    data = request.json
+    inputs = data.get("inputs")
+    language = data.get("language")
+
+    if not isinstance(inputs, list) or not language:
+        return jsonify({"error": "Missing required fields"}), 400
+    if not all(isinstance(user_input, str) for user_input in inputs):
+        return jsonify({"error": "inputs must be a list of strings"}), 400
+    if len(inputs) > MAX_OPERATION_DEFINITION_INPUTS:
+        return jsonify({"error": f"At most {MAX_OPERATION_DEFINITION_INPUTS} inputs can be resolved at once"}), 400
+
+    # With a repo_url the functions the user extracted from that repository are searched
+    try:
+        tenant = get_request_tenant(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    definitions = get_operation_definitions(inputs, language, tenant)
+    return jsonify({"definitions": definitions})
+
 @app.route("/ask-query", methods=["POST"])
 @requires_auth
 @cache.cached(timeout=600, make_cache_key=make_key)
@@ -181,6 +226,22 @@ def github_token_route():
 def extract_functions_route():
     return extract_repo_functions()
 
+@app.route("/extract-repo-functions/status", methods=["GET"])
+@requires_auth
+def extract_functions_status_route():
+    return get_extraction_status()
+
+@app.route("/metrics/operation-predictor", methods=["GET"])
+def operation_predictor_metrics():
+    """Prometheus scrape endpoint for the multi-layer predictor's stage counters and latencies"""
+    return Response(predictor_metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/health/contextual-models", methods=["GET"])
+def contextual_models_health():
+    """Whether the contextual completion models are loaded, 503 until they are"""
+    status = contextual_models.status()
+    return jsonify(status), 200 if status["resident"] else 503
+
 @app.route("/api/protected-resource", methods=["GET"])
 @requires_auth
 def protected_resource():
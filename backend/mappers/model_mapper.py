@@ -30,6 +30,7 @@ def map_models(
     suffix: str,
     language: str,
     enableContextualResponse: bool,
+    tenant: str = None,
 ):
     if model == Model.Groq.value:
         if enableContextualResponse:
@@ -53,7 +54,7 @@ def map_models(
             prompt=currentLine, suffix=suffix, prefix=prefix, language=language
         )
     elif model == Model.MULTI_LAYER.value:
-        closest_match = get_operation_definition(currentLine, language)
+        closest_match = get_operation_definition(currentLine, language, tenant)
         return closest_match.replace(currentLine, "")
     else:
         return "Model not found"
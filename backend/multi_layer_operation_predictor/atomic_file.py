@@ -0,0 +1,34 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_write(file_path, mode="w", encoding=None):
+    """
+    Opens a temporary file next to file_path and moves it into place once the block succeeds.
+
+    Readers never see a partially written file, and processes that still have the previous
+    file open or mapped keep reading a consistent copy. The temporary file has a unique name,
+    so concurrent writers of the same file don't clash, and it is removed when the block fails.
+
+    Args:
+        file_path: Destination of the file.
+        mode: "w" for text or "wb" for bytes.
+        encoding: Encoding of a text file, utf-8 when not given.
+    """
+    if "b" not in mode and encoding is None:
+        encoding = "utf-8"
+    with tempfile.NamedTemporaryFile(
+        mode, encoding=encoding, dir=os.path.dirname(os.path.abspath(file_path)),
+        prefix=f".{os.path.basename(file_path)}.", suffix=".tmp", delete=False,
+    ) as f:
+        try:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+    os.replace(f.name, file_path)
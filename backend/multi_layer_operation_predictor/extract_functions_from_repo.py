@@ -1,16 +1,55 @@
-import ast
 import json
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from github import Github
 import base64
 import os
-import re
 import logging
+import posixpath
+import tarfile
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from multi_layer_operation_predictor.atomic_file import atomic_write
+from multi_layer_operation_predictor.function_scanner import extract_functions
+from multi_layer_operation_predictor.function_store import write_function_store
+from multi_layer_operation_predictor.path_filter import PathFilter
+from multi_layer_operation_predictor.tenants import get_tenant_dir
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
 
+def parse_file(path, content):
+    """Entry point of parser processes, extraction needs no repository so no extractor is created"""
+    return FunctionExtractor.extract_file(path, content)
+
+
+_parser_pools = {}
+_parser_pools_lock = threading.Lock()
+
+
+def get_parser_pool(max_workers):
+    """
+    Process pool for parse_file shared by every extraction with the same number of workers,
+    so concurrent jobs never start more than max_workers processes between them.
+
+    It is created on first use. Workers come from a fork server rather than being forked
+    from the calling process, whose other threads may hold locks a forked child would inherit.
+    """
+    with _parser_pools_lock:
+        pool = _parser_pools.get(max_workers)
+        # A pool whose worker died refuses new work, start a fresh one
+        if pool is None or getattr(pool, "_broken", False):
+            pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("forkserver"))
+            _parser_pools[max_workers] = pool
+        return pool
+
+
 class FunctionExtractor:
     SUPPORTED_LANGUAGES = {
         "javascript": {"ext": "js", "label": "JavaScript"},
@@ -19,13 +58,53 @@ class FunctionExtractor:
         "php": {"ext": "php", "label": "PHP"},
         "java": {"ext": "java", "label": "Java"},
     }
+    GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+    # Number of blobs downloaded at the same time, also the size of the connection pool
+    FETCH_WORKERS = int(os.getenv("GITHUB_FETCH_WORKERS", "8"))
+    REQUEST_TIMEOUT = 30
+    # "tree" fetches supported files one by one, "archive" streams the repository tarball once
+    INGESTION_MODE = os.getenv("GITHUB_INGESTION_MODE", "tree")
+    # Processes parsing files, fewer files than PROCESS_POOL_MIN_FILES are parsed on a single thread
+    PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "0")) or os.cpu_count() or 1
+    PROCESS_POOL_MIN_FILES = 32
+    # Seconds between manifest checkpoints while a tree is fetched, an interrupted run resumes from them
+    CHECKPOINT_INTERVAL = 30
+    # Files larger than this many bytes are never downloaded, path_filter has the other rules
+    MAX_FILE_SIZE = int(os.getenv("EXTRACTION_MAX_FILE_SIZE", "1000000"))
+    # Comma separated globs, only files matching an include glob are extracted when any are set
+    INCLUDE_GLOBS = [glob.strip() for glob in os.getenv("EXTRACTION_INCLUDE_GLOBS", "").split(",") if glob.strip()]
+    EXCLUDE_GLOBS = [glob.strip() for glob in os.getenv("EXTRACTION_EXCLUDE_GLOBS", "").split(",") if glob.strip()]
+    log = logging.getLogger(__name__)
 
-    def __init__(self, repo_url, access_token=None):
+    def __init__(
+        self, repo_url, access_token=None, api_url=None, max_workers=None, ingestion_mode=None, manifest_dir=None,
+        parse_workers=None, progress_callback=None, tenant=None, include_globs=None, exclude_globs=None,
+        max_file_size=None,
+    ):
         self.repo_url = repo_url
         self.functions_by_language = {lang: {} for lang in self.SUPPORTED_LANGUAGES}
         self.owner, self.repo_name = self._parse_github_url(repo_url)
-        self.github = Github(access_token) if access_token else Github()
-        self.log = logging.getLogger(__name__)
+        self.access_token = access_token
+        self.api_url = (api_url or self.GITHUB_API_URL).rstrip("/")
+        self.max_workers = max_workers or self.FETCH_WORKERS
+        self.ingestion_mode = ingestion_mode or self.INGESTION_MODE
+        # Functions are saved for this tenant only, see tenants.get_tenant_key
+        self.tenant = tenant
+        # Per tenant too, so one user's sync state never drives another's
+        self.manifest_dir = manifest_dir or os.path.join(self.get_data_dir(), "manifests")
+        self.parse_workers = parse_workers or self.PARSE_WORKERS
+        self.path_filter = PathFilter(
+            self.INCLUDE_GLOBS if include_globs is None else include_globs,
+            self.EXCLUDE_GLOBS if exclude_globs is None else exclude_globs,
+            max_file_size or self.MAX_FILE_SIZE,
+        )
+        self.progress = {
+            "files_total": 0, "files_unchanged": 0, "files_fetched": 0, "files_parsed": 0, "functions_found": 0,
+            "files_skipped": 0, "bytes_skipped": 0,
+        }
+        self.progress_callback = progress_callback
+        self._progress_lock = threading.Lock()
+        self.github = Github(access_token, base_url=self.api_url) if access_token else Github(base_url=self.api_url)
 
     def _parse_github_url(self, url):
         parts = url.rstrip("/").split("/")
@@ -35,122 +114,475 @@ class FunctionExtractor:
         abs_path = os.path.dirname(os.path.abspath(__file__))
         return os.path.join(abs_path, relative_path)
 
+    def get_data_dir(self):
+        """Directory the function indexes are saved to, the tenant's own one when there is a tenant"""
+        return get_tenant_dir(self.get_absolute_path("data"), self.tenant)
+
     def ensure_directory_exists(self, directory):
         if not os.path.exists(directory):
             os.makedirs(directory)
 
-    def detect_language(self, file_extension):
+    def write_json_atomically(self, output_file, data):
+        """Write JSON through a temporary file so readers never see a partial file."""
+        with atomic_write(output_file) as f:
+            json.dump(data, f, indent=4)
+
+    @classmethod
+    def detect_language(cls, file_extension):
         """Map file extension to supported language"""
-        for lang, info in self.SUPPORTED_LANGUAGES.items():
+        for lang, info in cls.SUPPORTED_LANGUAGES.items():
             if file_extension == info["ext"]:
                 return lang
         return None
 
-    def extract_function_info(self, content, language):
+    @classmethod
+    def detect_path_language(cls, path):
+        return cls.detect_language(path.split(".")[-1].lower())
+
+    @classmethod
+    def extract_function_info(cls, content, language):
         """Extract functions based on language"""
-        if language == "python":
-            return self._extract_python_functions(content)
-        elif language == "java":
-            return self._extract_java_functions(content)
-        elif language in ["javascript", "typescript"]:
-            return self._extract_js_ts_functions(content)
-        elif language == "php":
-            return self._extract_php_functions(content)
-        return {}
-
-    def _extract_python_functions(self, content):
-        functions = {}
+        if language not in cls.SUPPORTED_LANGUAGES:
+            return {}
         try:
-            tree = ast.parse(content)
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef):
-                    function_code = ast.get_source_segment(content, node)
-                    functions[node.name] = function_code
+            return extract_functions(content, language)
         except Exception as e:
-            self.log.error(f"Error parsing Python content: {str(e)}")
-        return functions
-
-    def _extract_java_functions(self, content):
-        functions = {}
-        pattern = r"((?:public|private|protected)?\s*(?:static)?\s*\w+\s+\w+\s*\([^)]*\)\s*\{(?:[^{}]|\{(?:[^{}]|\{[^{}]*\})*\})*\})"
-        matches = re.finditer(pattern, content)
-        for match in matches:
-            func_code = match.group(1)
-            name_pattern = r"\w+\s+(\w+)\s*\("
-            name_match = re.search(name_pattern, func_code)
-            if name_match:
-                func_name = name_match.group(1)
-                functions[func_name] = func_code
-        return functions
-
-    def _extract_js_ts_functions(self, content):
-        functions = {}
-        patterns = [
-            r"function\s+(\w+)\s*\([^)]*\)\s*\{(?:[^{}]|\{(?:[^{}]|\{[^{}]*\})*\})*\}",  # Regular function
-            r"(?:const|let|var)\s+(\w+)\s*=\s*function\s*\([^)]*\)\s*\{(?:[^{}]|\{(?:[^{}]|\{[^{}]*\})*\})*\}",  # Function expression
-            r"(?:const|let|var)\s+(\w+)\s*=\s*\([^)]*\)\s*=>\s*\{(?:[^{}]|\{(?:[^{}]|\{[^{}]*\})*\})*\}",  # Arrow function
-            r"(?:const|let|var)\s+(\w+)\s*=\s*\([^)]*\)\s*=>\s*(?:[^;{\n]+)",  # Single-line arrow function
-            r"(\w+)\s*=\s*\([^)]*\)\s*=>\s*\{(?:[^{}]|\{(?:[^{}]|\{[^{}]*\})*\})*\}",  # Class method arrow function
+            cls.log.error(f"Error parsing {cls.SUPPORTED_LANGUAGES[language]['label']} content: {str(e)}")
+            return {}
+
+    def _report_progress(self, **counts):
+        """Add to the progress counters and hand them to progress_callback, parse callbacks run on other threads"""
+        with self._progress_lock:
+            for name, count in counts.items():
+                self.progress[name] += count
+            progress = dict(self.progress)
+        if self.progress_callback:
+            self.progress_callback(progress)
+
+    def _on_parsed(self, future):
+        if not future.cancelled() and future.exception() is None:
+            self._report_progress(files_parsed=1, functions_found=len(future.result()))
+
+    def _count_functions(self):
+        """Replace the running count with the functions kept after name clashes were merged"""
+        with self._progress_lock:
+            self.progress["functions_found"] = sum(len(functions) for functions in self.functions_by_language.values())
+        self._report_progress()
+
+        skipped = self.path_filter.summary()
+        if skipped["files"]:
+            self.log.info(
+                f"Skipped {skipped['files']} files ({skipped['bytes']} bytes) of {self.repo_url}: {skipped['reasons']}"
+            )
+
+    def _skip(self, path, reason, size=None):
+        """Count a file the path filter ruled out"""
+        self.path_filter.skip(path, reason, size)
+        self._report_progress(files_skipped=1, bytes_skipped=size or 0)
+
+    def _filter_tree(self, session, entries, manifest):
+        """
+        Load the tree's .gitignore files into the path filter and drop the entries it skips.
+
+        .gitignore files whose SHA is unchanged are taken from the manifest instead of fetched.
+        """
+        previous = manifest.get("gitignores", {})
+        gitignores = {}
+        for entry in entries:
+            path = entry["path"]
+            if posixpath.basename(path) != ".gitignore" or self.path_filter.is_excluded(path):
+                continue
+            known = previous.get(path)
+            if known and known["sha"] == entry["sha"]:
+                text = known["text"]
+            else:
+                data = self._fetch_blob(session, entry)
+                text = data.decode("utf-8", "replace") if data is not None else None
+            if text is not None:
+                gitignores[path] = {"sha": entry["sha"], "text": text}
+                self.path_filter.add_gitignore(path, text)
+        manifest["gitignores"] = gitignores
+
+        kept = []
+        for entry in entries:
+            if posixpath.basename(entry["path"]) == ".gitignore":
+                continue
+            reason = self.path_filter.check(entry["path"], entry.get("size"))
+            if reason:
+                self._skip(entry["path"], reason, entry.get("size"))
+            else:
+                kept.append(entry)
+        return kept
+
+    @classmethod
+    def extract_file(cls, path, content):
+        """Extract the functions of one file, an empty dict if it can't be parsed"""
+        try:
+            return cls.extract_function_info(content, cls.detect_path_language(path))
+        except Exception as e:
+            cls.log.error(f"Error processing {path}: {str(e)}")
+            return {}
+
+    def process_file(self, path, content):
+        """Extract the functions of one file into functions_by_language"""
+        language = self.detect_path_language(path)
+        if language:
+            self.functions_by_language[language].update(self.extract_file(path, content))
+
+    @contextmanager
+    def _parser_pool(self, file_count=None):
+        """
+        Executor for parse_file. Parsing and scanning hold the GIL, so they run in the
+        shared worker processes, unless the job is too small to be worth sending there.
+        """
+        if self.parse_workers > 1 and (file_count is None or file_count >= self.PROCESS_POOL_MIN_FILES):
+            yield get_parser_pool(self.parse_workers)
+        else:
+            with ThreadPoolExecutor(max_workers=1) as parsers:
+                yield parsers
+
+    def get_manifest_path(self):
+        return os.path.join(self.manifest_dir, f"{self.owner}__{self.repo_name}.json")
+
+    def load_manifest(self):
+        """
+        Load what the previous tree extraction of this repository saw.
+
+        The manifest keeps the ETags of the repository and tree listings, and the blob SHA
+        and extracted functions of every file, so unchanged files are never fetched again.
+        """
+        try:
+            with open(self.get_manifest_path(), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("repo_url") == self.repo_url:
+                return manifest
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.log.warning(f"Ignoring unreadable manifest for {self.repo_url}: {str(e)}")
+        return {"repo_url": self.repo_url, "etags": {}, "files": {}}
+
+    def save_manifest(self, manifest):
+        self.ensure_directory_exists(self.manifest_dir)
+        self.write_json_atomically(self.get_manifest_path(), manifest)
+
+    def _create_session(self):
+        """HTTP session shared by every worker, its pool keeps one connection per worker alive"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["Accept"] = "application/vnd.github+json"
+        if self.access_token:
+            session.headers["Authorization"] = f"token {self.access_token}"
+        return session
+
+    def _get_json(self, session, path, params=None):
+        response = session.get(f"{self.api_url}{path}", params=params, timeout=self.REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    def _get_json_if_modified(self, session, path, etag=None, params=None):
+        """
+        Conditional GET, GitHub doesn't count a 304 answer against the rate limit.
+
+        Returns:
+            A (data, etag) pair, data is None when the resource still matches etag.
+        """
+        headers = {"If-None-Match": etag} if etag else {}
+        response = session.get(f"{self.api_url}{path}", params=params, headers=headers, timeout=self.REQUEST_TIMEOUT)
+        if response.status_code == 304:
+            return None, etag
+        response.raise_for_status()
+        return response.json(), response.headers.get("ETag")
+
+    def list_repository_tree(self, session, manifest=None):
+        """
+        List every blob of the default branch with one recursive Git Trees call.
+
+        Args:
+            session: Session from _create_session.
+            manifest: Manifest from load_manifest, its ETags make the listings conditional
+                      and it is updated with the new ones.
+        Returns:
+            The tree entries of blobs with a supported extension and of .gitignore files,
+            or None when GitHub truncated the listing and it has to be walked directory by directory.
+        """
+        manifest = manifest if manifest is not None else {"etags": {}, "files": {}}
+        etags = manifest["etags"]
+        repo_path = f"/repos/{self.owner}/{self.repo_name}"
+
+        repository, etags["repository"] = self._get_json_if_modified(session, repo_path, etags.get("repository"))
+        if repository is not None:
+            manifest["default_branch"] = repository["default_branch"]
+        branch = manifest["default_branch"]
+
+        tree, etags["tree"] = self._get_json_if_modified(
+            session, f"{repo_path}/git/trees/{branch}", etags.get("tree"), params={"recursive": "1"}
+        )
+        if tree is None:
+            # Unchanged since the last extraction, which recorded every blob it kept
+            known_files = {**manifest.get("gitignores", {}), **manifest["files"]}
+            return [
+                {"path": path, "type": "blob", "sha": file["sha"], "size": file.get("size")}
+                for path, file in known_files.items()
+            ]
+        if tree.get("truncated"):
+            return None
+        return [
+            entry for entry in tree["tree"]
+            if entry["type"] == "blob"
+            and (self.detect_path_language(entry["path"]) or posixpath.basename(entry["path"]) == ".gitignore")
         ]
 
-        for pattern in patterns:
-            matches = re.finditer(pattern, content)
-            for match in matches:
-                func_name = match.group(1)
-                func_code = match.group(0)
-                functions[func_name] = func_code
-        return functions
-
-    def _extract_php_functions(self, content):
-        functions = {}
-        pattern = r"(?:public|private|protected)?\s*function\s+(\w+)\s*\([^)]*\)\s*\{(?:[^{}]|\{(?:[^{}]|\{[^{}]*\})*\})*\}"
-        matches = re.finditer(pattern, content)
-        for match in matches:
-            func_code = match.group(0)
-            name_pattern = r"function\s+(\w+)\s*\("
-            name_match = re.search(name_pattern, func_code)
-            if name_match:
-                func_name = name_match.group(1)
-                functions[func_name] = func_code
-        return functions
+    def _fetch_blob(self, session, entry):
+        """The bytes of a blob, None when it can't be downloaded"""
+        try:
+            blob = self._get_json(session, f"/repos/{self.owner}/{self.repo_name}/git/blobs/{entry['sha']}")
+            return base64.b64decode(blob["content"])
+        except Exception as e:
+            self.log.error(f"Error fetching {entry['path']}: {str(e)}")
+            return None
 
     def fetch_repository(self):
         """Fetch files from GitHub and process them"""
         self.log.info(f"Fetching repository: {self.repo_url}")
+        if self.ingestion_mode == "archive":
+            return self.fetch_repository_archive()
+        return self.fetch_repository_tree()
+
+    def fetch_repository_tree(self):
+        """
+        Fetch supported files listed by one recursive Git Trees call in parallel.
+
+        Only blobs whose SHA differs from the manifest of the previous extraction are
+        downloaded and parsed, the functions of the others come from the manifest.
+        """
+        try:
+            manifest = self.load_manifest()
+            with self._create_session() as session:
+                entries = self.list_repository_tree(session, manifest)
+                if entries is None:
+                    self.log.warning(f"Tree of {self.repo_url} is truncated, walking it directory by directory")
+                    return self.fetch_repository_contents()
+                entries = self._filter_tree(session, entries, manifest)
+
+                previous = manifest["files"]
+                changed = [entry for entry in entries if previous.get(entry["path"], {}).get("sha") != entry["sha"]]
+                self.log.info(f"Fetching {len(changed)} of {len(entries)} files with {self.max_workers} workers")
+                self._report_progress(files_total=len(entries), files_unchanged=len(entries) - len(changed))
+
+                files = {}
+                with ThreadPoolExecutor(max_workers=self.max_workers) as fetchers, \
+                        self._parser_pool(len(changed)) as parsers:
+                    # Every file goes to the parsers as soon as it is downloaded, so parsing
+                    # overlaps with the downloads still in flight
+                    downloads = {fetchers.submit(self._fetch_blob, session, entry): entry for entry in changed}
+                    parsed = {}
+                    # Downloads that turned out to be minified, generated or not UTF-8, recorded without functions
+                    unparsed = set()
+                    checkpointed = time.monotonic()
+                    for download in as_completed(downloads):
+                        data = download.result()
+                        entry = downloads[download]
+                        content = reason = None
+                        if data is not None:
+                            try:
+                                content = data.decode("utf-8")
+                                reason = self.path_filter.check_content(content)
+                            except UnicodeDecodeError:
+                                reason = "not_utf8"
+                        if reason:
+                            unparsed.add(entry["path"])
+                            self._report_progress(files_fetched=1)
+                            self._skip(entry["path"], reason, len(data))
+                        elif content is not None:
+                            parsed[entry["path"]] = parsers.submit(parse_file, entry["path"], content)
+                            parsed[entry["path"]].add_done_callback(self._on_parsed)
+                            self._report_progress(files_fetched=1)
+                        if time.monotonic() - checkpointed > self.CHECKPOINT_INTERVAL:
+                            self._save_checkpoint(manifest, downloads, parsed)
+                            checkpointed = time.monotonic()
+
+                    # Merged in tree order, so later files win name clashes like they did before
+                    for entry in entries:
+                        known = previous.get(entry["path"])
+                        if known and known["sha"] == entry["sha"]:
+                            functions = known["functions"]
+                        elif entry["path"] in parsed:
+                            functions = parsed[entry["path"]].result()
+                        elif entry["path"] in unparsed:
+                            functions = {}
+                        else:
+                            continue
+                        files[entry["path"]] = {"sha": entry["sha"], "size": entry.get("size"), "functions": functions}
+                        self.functions_by_language[self.detect_path_language(entry["path"])].update(functions)
+
+            if len(files) < len(entries):
+                # Only files that failed to download are missing, the next listing must not come back as 304
+                manifest["etags"].pop("tree", None)
+            manifest["files"] = files
+            self.save_manifest(manifest)
+            self._count_functions()
+            return True
+
+        except Exception as e:
+            self.log.error(f"Error fetching repository: {str(e)}")
+            return False
+
+    def _save_checkpoint(self, manifest, downloads, parsed):
+        """
+        Record the files parsed so far, so a run that is interrupted doesn't fetch them again.
+        The tree ETag is left out since the checkpoint doesn't cover the whole tree.
+        """
+        files = dict(manifest["files"])
+        for entry in downloads.values():
+            future = parsed.get(entry["path"])
+            if future is not None and future.done() and future.exception() is None:
+                files[entry["path"]] = {"sha": entry["sha"], "size": entry.get("size"), "functions": future.result()}
+        etags = {name: etag for name, etag in manifest["etags"].items() if name != "tree"}
+        self.save_manifest({**manifest, "etags": etags, "files": files})
+
+    def process_archive(self, archive):
+        """
+        Extract functions from the supported members of a tar stream, in archive order.
+
+        Members are read sequentially from the stream and never written to disk.
+        GitHub nests every path under an "<owner>-<repo>-<sha>/" directory, which is dropped.
+        Members are parsed by the parser pool while the rest of the stream is read.
+        """
+        parsed = []
+        with self._parser_pool() as parsers:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                path = member.name.split("/", 1)[-1]
+                if posixpath.basename(path) == ".gitignore" and not self.path_filter.is_excluded(path):
+                    # git archive lists a directory's .gitignore before most of its files
+                    self.path_filter.add_gitignore(path, archive.extractfile(member).read().decode("utf-8", "replace"))
+                    continue
+                if not self.detect_path_language(path):
+                    continue
+                reason = self.path_filter.check(path, member.size)
+                if reason:
+                    self._skip(path, reason, member.size)
+                    continue
+                try:
+                    content = archive.extractfile(member).read().decode("utf-8")
+                except Exception as e:
+                    self.log.error(f"Error processing {path}: {str(e)}")
+                    continue
+                reason = self.path_filter.check_content(content)
+                if reason:
+                    self._report_progress(files_total=1, files_fetched=1)
+                    self._skip(path, reason, member.size)
+                    continue
+                parsed.append((path, parsers.submit(parse_file, path, content)))
+                parsed[-1][1].add_done_callback(self._on_parsed)
+                self._report_progress(files_total=1, files_fetched=1)
+
+            for path, functions in parsed:
+                self.functions_by_language[self.detect_path_language(path)].update(functions.result())
+        self._count_functions()
+
+    def fetch_repository_archive(self, source=None):
+        """
+        Fetch the whole repository as one tarball and extract functions from it while it streams in.
+
+        Args:
+            source: Local archive path or URL, defaults to the tarball of the default branch.
+        Returns:
+            True if the archive was read, False otherwise.
+        """
+        source = source or f"{self.api_url}/repos/{self.owner}/{self.repo_name}/tarball"
+        try:
+            if not source.startswith(("http://", "https://")):
+                with tarfile.open(source, mode="r|*") as archive:
+                    self.process_archive(archive)
+                return True
+
+            with self._create_session() as session:
+                with session.get(source, stream=True, timeout=self.REQUEST_TIMEOUT) as response:
+                    response.raise_for_status()
+                    # Undo any transfer encoding, tarfile takes care of the gzip layer itself
+                    response.raw.decode_content = True
+                    with tarfile.open(fileobj=response.raw, mode="r|*") as archive:
+                        self.process_archive(archive)
+            return True
+
+        except Exception as e:
+            self.log.error(f"Error fetching repository archive: {str(e)}")
+            return False
+
+    def fetch_repository_contents(self):
+        """Fetch files one directory at a time through the contents API"""
         try:
             repo = self.github.get_repo(f"{self.owner}/{self.repo_name}")
-            contents = repo.get_contents("")
+            contents = deque(self._load_listing_gitignore(repo.get_contents("")))
 
             while contents:
-                file_content = contents.pop(0)
+                file_content = contents.popleft()
                 if file_content.type == "dir":
-                    contents.extend(repo.get_contents(file_content.path))
-                else:
-                    extension = file_content.path.split(".")[-1].lower()
-                    language = self.detect_language(extension)
-
-                    if language:
-                        try:
-                            content = base64.b64decode(file_content.content).decode(
-                                "utf-8"
-                            )
-                            functions = self.extract_function_info(content, language)
-                            self.functions_by_language[language].update(functions)
-
-                        except Exception as e:
-                            self.log.error(
-                                f"Error processing {file_content.path}: {str(e)}"
-                            )
+                    # Excluded and ignored directories are never listed
+                    if self.path_filter.allows_directory(file_content.path):
+                        contents.extend(self._load_listing_gitignore(repo.get_contents(file_content.path)))
+                elif self.detect_path_language(file_content.path):
+                    reason = self.path_filter.check(file_content.path, file_content.size)
+                    if reason:
+                        self._skip(file_content.path, reason, file_content.size)
+                        continue
+                    self._report_progress(files_total=1)
+                    try:
+                        content = base64.b64decode(file_content.content).decode("utf-8")
+                    except Exception as e:
+                        self.log.error(f"Error processing {file_content.path}: {str(e)}")
+                        continue
+                    self._report_progress(files_fetched=1)
+                    reason = self.path_filter.check_content(content)
+                    if reason:
+                        self._skip(file_content.path, reason, file_content.size)
+                        continue
+                    self.process_file(file_content.path, content)
+                    self._report_progress(files_parsed=1)
 
+            self._count_functions()
             return True
 
         except Exception as e:
             self.log.error(f"Error fetching repository: {str(e)}")
             return False
 
+    def _load_listing_gitignore(self, listing):
+        """Add the .gitignore of a contents API directory listing to the path filter before its files are checked"""
+        for file_content in listing:
+            if file_content.type == "file" and file_content.name == ".gitignore":
+                try:
+                    text = base64.b64decode(file_content.content).decode("utf-8", "replace")
+                except Exception as e:
+                    self.log.error(f"Error reading {file_content.path}: {str(e)}")
+                    continue
+                self.path_filter.add_gitignore(file_content.path, text)
+        return listing
+
+    def save_functions_to_store(self):
+        """Save functions for each language in the memory-mapped store format read by the predictor"""
+        data_dir = self.get_data_dir()
+        self.ensure_directory_exists(data_dir)
+        saved_files = []
+
+        for language in self.SUPPORTED_LANGUAGES:
+            output_file = os.path.join(data_dir, f"{language}_functions.store")
+            try:
+                write_function_store(output_file, self.functions_by_language.get(language, {}))
+                saved_files.append(output_file)
+            except Exception as e:
+                self.log.error(f"Error saving {language} function store: {str(e)}")
+
+        return saved_files
+
     def save_functions_to_json(self):
         """Save functions for each language. Clear functions if none found."""
-        data_dir = self.get_absolute_path("data")
+        data_dir = self.get_data_dir()
         self.ensure_directory_exists(data_dir)
         saved_files = []
 
@@ -160,8 +592,7 @@ class FunctionExtractor:
             # If no functions found for this language, save empty dict
             if not self.functions_by_language.get(language):
                 try:
-                    with open(output_file, "w", encoding="utf-8") as f:
-                        json.dump({}, f, indent=4)
+                    self.write_json_atomically(output_file, {})
                     self.log.info(f"No {language} functions were found")
                     saved_files.append(output_file)
                 except Exception as e:
@@ -170,8 +601,9 @@ class FunctionExtractor:
 
             # Save functions if they exist
             try:
-                with open(output_file, "w", encoding="utf-8") as f:
-                    json.dump(self.functions_by_language[language], f, indent=4)
+                self.write_json_atomically(
+                    output_file, self.functions_by_language[language]
+                )
                 self.log.info(
                     f"Successfully saved {len(self.functions_by_language[language])} {language} functions"
                 )
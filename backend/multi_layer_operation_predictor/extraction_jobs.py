@@ -0,0 +1,262 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Optional, Tuple
+
+from multi_layer_operation_predictor.atomic_file import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# Repositories extracted at the same time
+JOB_WORKERS = int(os.getenv("EXTRACTION_JOB_WORKERS", "2"))
+# Finished jobs kept in the state file so their status can still be polled
+MAX_FINISHED_JOBS = 100
+# Seconds between state file writes caused by progress updates alone
+PROGRESS_PERSIST_INTERVAL = 2.0
+
+QUEUED = "QUEUED"
+RUNNING = "RUNNING"
+SUCCESS = "SUCCESS"
+FAILED = "FAILED"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+# Tokens of the queues of this process that haven't been stopped
+_live_tokens = set()
+
+
+def get_job_state_path():
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "extraction_jobs.json")
+
+
+def get_job_key(repo_url, user_id):
+    """
+    Jobs for URLs differing only in case or a trailing slash extract the same repository.
+    Every user's functions are saved separately, so jobs of different users are never merged.
+    """
+    return repo_url.strip().rstrip("/").lower(), user_id
+
+
+def is_owner_alive(owner):
+    """Whether the queue that claimed a job still runs, in this or another process on the host."""
+    if not owner:
+        return False
+    if owner["pid"] == os.getpid():
+        return owner["token"] in _live_tokens
+    try:
+        os.kill(owner["pid"], 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+@dataclass
+class ExtractionJob:
+    job_id: str
+    repo_url: str
+    email: str
+    # The authenticated user the functions are saved for, the email only finds their GitHub token
+    user_id: Optional[str] = None
+    status: str = QUEUED
+    progress: Dict[str, int] = field(default_factory=dict)
+    message: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    # {"pid", "token"} of the queue running the job
+    owner: Optional[Dict] = None
+
+    def to_response(self):
+        """The job as returned to clients, without the user it runs for."""
+        return {
+            "job_id": self.job_id,
+            "repo_url": self.repo_url,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+        }
+
+
+class ExtractionJobQueue:
+    """
+    Runs repository extractions on a bounded pool of background threads.
+
+    The JSON state file is the source of truth shared by every process of the app: jobs
+    are created, claimed, deduplicated and looked up in it under an exclusive file lock.
+    Each job records the queue that owns it, so a job only runs in one process and jobs
+    whose process stopped are claimed again by resume(). Submitting a repository the
+    user already has a queued or running job for, in any process, returns that job.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[ExtractionJob, Callable[[Dict[str, int]], None]], None],
+        state_path: Optional[str] = None,
+        max_workers: int = JOB_WORKERS,
+    ):
+        """
+        Args:
+            runner: Does the extraction of a job and raises if it fails. It is called with
+                    the job and a callback taking the latest progress counters.
+            state_path: JSON file holding the jobs, defaults to data/extraction_jobs.json.
+            max_workers: Number of jobs running at the same time.
+        """
+        self.runner = runner
+        self.state_path = state_path or get_job_state_path()
+        self.max_workers = max_workers
+        self.owner = {"pid": os.getpid(), "token": uuid.uuid4().hex}
+        _live_tokens.add(self.owner["token"])
+        # Jobs running in this process, their progress is newer than the state file's
+        self._running: Dict[str, ExtractionJob] = {}
+        self._lock = threading.Lock()
+        self._persisted_at: Dict[str, float] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="extraction-job")
+        return self._executor
+
+    @contextmanager
+    def _state(self):
+        """Yields the jobs of the state file by id, holding the thread and file locks."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+        with self._lock, open(f"{self.state_path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield self._load()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return {job["job_id"]: ExtractionJob(**job) for job in json.load(f)}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"Could not load extraction jobs from {self.state_path}: {str(e)}")
+            return {}
+
+    def _save(self, jobs):
+        """Writes the jobs to the state file, the caller holds the locks."""
+        finished = sorted(
+            (job for job in jobs.values() if job.status not in ACTIVE_STATUSES),
+            key=lambda job: job.updated_at,
+        )
+        for job in finished[:-MAX_FINISHED_JOBS]:
+            del jobs[job.job_id]
+
+        try:
+            with atomic_write(self.state_path) as f:
+                json.dump([asdict(job) for job in jobs.values()], f, indent=4)
+        except Exception as e:
+            logger.error(f"Could not save extraction jobs to {self.state_path}: {str(e)}")
+
+    def resume(self):
+        """Claims the unfinished jobs of processes that stopped and queues them again."""
+        with self._state() as jobs:
+            resumed = [
+                job for job in jobs.values()
+                if job.status in ACTIVE_STATUSES and not is_owner_alive(job.owner)
+            ]
+            for job in resumed:
+                job.status = QUEUED
+                job.owner = self.owner
+            if resumed:
+                self._save(jobs)
+        for job in resumed:
+            logger.info(f"Resuming extraction job {job.job_id} for {job.repo_url}")
+            self._get_executor().submit(self._run, job)
+
+    def submit(self, repo_url: str, email: str, user_id: str) -> Tuple[ExtractionJob, bool]:
+        """
+        Queues the extraction of a repository for a user.
+
+        Returns:
+            The job and whether it was created, False when the user's job for the repository
+            was already queued or running.
+        """
+        key = get_job_key(repo_url, user_id)
+        with self._state() as jobs:
+            for job in jobs.values():
+                if (
+                    job.status in ACTIVE_STATUSES
+                    and get_job_key(job.repo_url, job.user_id) == key
+                    and is_owner_alive(job.owner)
+                ):
+                    return self._running.get(job.job_id, job), False
+            job = ExtractionJob(
+                job_id=uuid.uuid4().hex, repo_url=repo_url, email=email, user_id=user_id, owner=self.owner
+            )
+            jobs[job.job_id] = job
+            self._save(jobs)
+        self._get_executor().submit(self._run, job)
+        return job, True
+
+    def get(self, job_id: str) -> Optional[ExtractionJob]:
+        """Returns a job of any process, None when it is unknown."""
+        with self._lock:
+            running = self._running.get(job_id)
+        if running is not None:
+            return running
+        return self._load().get(job_id)
+
+    def _update(self, job, **changes):
+        """Applies changes to a job this queue owns, they are lost if another queue claimed it since."""
+        with self._lock:
+            for name, value in changes.items():
+                setattr(job, name, value)
+            job.updated_at = time.time()
+            persist = "status" in changes or (
+                time.time() - self._persisted_at.get(job.job_id, 0.0) >= PROGRESS_PERSIST_INTERVAL
+            )
+        if not persist:
+            return True
+        with self._state() as jobs:
+            saved = jobs.get(job.job_id)
+            if saved is not None and saved.owner != self.owner:
+                logger.warning(f"Extraction job {job.job_id} was claimed by another process")
+                self._running.pop(job.job_id, None)
+                return False
+            jobs[job.job_id] = job
+            self._save(jobs)
+            self._persisted_at[job.job_id] = time.time()
+        return True
+
+    def _run(self, job):
+        with self._lock:
+            self._running[job.job_id] = job
+        try:
+            if not self._update(job, status=RUNNING, message=None):
+                return
+            logger.info(f"Extraction job {job.job_id} started for {job.repo_url}")
+            try:
+                self.runner(job, lambda progress: self._update(job, progress=progress))
+            except Exception as e:
+                logger.error(f"Extraction job {job.job_id} failed: {str(e)}", exc_info=True)
+                self._update(job, status=FAILED, message=str(e))
+                return
+            self._update(job, status=SUCCESS)
+            logger.info(f"Extraction job {job.job_id} finished for {job.repo_url}")
+        finally:
+            with self._lock:
+                self._running.pop(job.job_id, None)
+                self._persisted_at.pop(job.job_id, None)
+
+    def stop(self, wait=False):
+        """
+        Stops taking jobs. Unless waited for, jobs still queued or running are claimed by the
+        next queue that resumes.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            logger.info("Extraction job queue stopped")
+        _live_tokens.discard(self.owner["token"])
@@ -0,0 +1,91 @@
+import bisect
+from typing import Dict, List, NamedTuple
+
+from rapidfuzz import fuzz, process
+from rapidfuzz.utils import default_process
+
+SCORERS = {
+    "ratio": fuzz.ratio,
+    "WRatio": fuzz.WRatio,
+    "token_set": fuzz.token_set_ratio,
+}
+EXACT_SCORE = 100.0
+
+
+class FunctionMatch(NamedTuple):
+    name: str
+    code: str
+    score: float
+
+
+class FunctionMatcher:
+    """
+    Ranks function names against a searched name.
+
+    Names are normalized once with rapidfuzz's default processor (lowercase, punctuation
+    and underscores as spaces). Exact matches come first, then names starting with the
+    searched name, then the best fuzzy matches. When the exact and prefix matches already
+    fill top_k, the fuzzy scoring of every name is skipped.
+    """
+
+    def __init__(self, functions: Dict[str, str]):
+        self.functions = functions
+        self.names = list(functions)
+        self.processed = [default_process(name) for name in self.names]
+        self.exact: Dict[str, List[int]] = {}
+        for i, processed in enumerate(self.processed):
+            self.exact.setdefault(processed, []).append(i)
+        # Sorted processed names, the names starting with a prefix are a contiguous range
+        self.sorted_processed = sorted((processed, i) for i, processed in enumerate(self.processed))
+
+    def _prefix_matches(self, query):
+        position = bisect.bisect_left(self.sorted_processed, (query,))
+        while position < len(self.sorted_processed):
+            processed, i = self.sorted_processed[position]
+            if not processed.startswith(query):
+                break
+            yield i
+            position += 1
+
+    def match(self, name: str, top_k: int = 1, min_score: float = 0, scorer: str = "ratio") -> List[FunctionMatch]:
+        """
+        Returns up to top_k functions best matching name, best first.
+
+        Args:
+            name: The searched function name.
+            top_k: Number of matches to return.
+            min_score: Fuzzy matches scoring below this (0 to 100) are left out, those scoring 0 always are.
+            scorer: One of SCORERS.
+        """
+        score_function = SCORERS[scorer]
+        query = default_process(name)
+        if not query:
+            return []
+
+        # Exact names first, the original spelling before other spellings normalizing the same
+        ranked = sorted(self.exact.get(query, ()), key=lambda i: self.names[i] != name)
+        matches = [(i, EXACT_SCORE) for i in ranked[:top_k]]
+        seen = {i for i, _ in matches}
+
+        if len(matches) < top_k:
+            prefix = [i for i in self._prefix_matches(query) if i not in seen]
+            scored = process.extract(
+                query, [self.processed[i] for i in prefix], scorer=score_function, processor=None,
+                limit=top_k - len(matches), score_cutoff=min_score,
+            )
+            for _, score, position in scored:
+                if score > 0:
+                    matches.append((prefix[position], score))
+                    seen.add(prefix[position])
+
+        if len(matches) < top_k:
+            scored = process.extract(
+                query, self.processed, scorer=score_function, processor=None,
+                limit=top_k + len(seen), score_cutoff=min_score,
+            )
+            for _, score, i in scored:
+                if score > 0 and i not in seen and len(matches) < top_k:
+                    matches.append((i, score))
+                    seen.add(i)
+
+        return [FunctionMatch(self.names[i], self.functions[self.names[i]], score) for i, score in matches]
@@ -0,0 +1,376 @@
+import ast
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Single-pass function extraction shared by FunctionExtractor, server.py and parse_functions.
+#
+# Brace languages go through one tokenizer and a bracket stack: every character is consumed
+# by exactly one token and every token is handled in constant time, so scanning is linear in
+# the size of the file whatever it contains. None of the token patterns can backtrack past
+# the token they match, and unterminated strings or comments run to the end of the line or
+# file instead of failing. Regular expression literals are the exception: an unterminated
+# one fails at the end of its line, so no other one is tried on that line.
+
+LANGUAGES = ("python", "javascript", "typescript", "java", "php")
+
+Token = Tuple[str, str, int, int, bool]  # kind, text, start, end, preceded by a newline
+
+_COMMON_TOKENS = [
+    r"(?P<space>\s+)",
+    r"(?P<comment>//[^\n]*|/\*(?:[^*]|\*(?!/))*(?:\*/)?)",
+]
+_PUNCT = r"(?P<punct>=>|->|::|\.\.\.|[=!]==?|[<>]=|&&|\|\||\?\?|[-+*/%&|^]=|[^\s\w])"
+_WORDS = [
+    r"(?P<id>(?:[^\W\d]|\$)(?:\w|\$)*)",
+    r"(?P<num>\d(?:\w|\.\d)*)",
+]
+
+_TOKEN_PATTERNS = {
+    "javascript": _COMMON_TOKENS + [
+        r"""(?P<str>'(?:[^'\\\n]|\\[\s\S])*'?|"(?:[^"\\\n]|\\[\s\S])*"?)""",
+        r"(?P<template>`)",
+    ] + _WORDS + [_PUNCT],
+    "java": _COMMON_TOKENS + [
+        r'''(?P<str>"""(?:[^"\\]|\\[\s\S]|"(?!""))*(?:""")?|"(?:[^"\\\n]|\\.)*"?|'(?:[^'\\\n]|\\.)*'?)''',
+    ] + _WORDS + [_PUNCT],
+    "php": _COMMON_TOKENS + [
+        r"(?P<hash_comment>#[^\n]*)",
+        r"""(?P<str>'(?:[^'\\]|\\[\s\S])*'?|"(?:[^"\\]|\\[\s\S])*"?|`(?:[^`\\]|\\[\s\S])*`?)""",
+        r"""(?P<heredoc><<<[ \t]*(?P<quote>['"]?)(?P<label>[^\W\d]\w*)(?P=quote))""",
+        r"(?P<close_tag>\?>)",
+    ] + _WORDS + [_PUNCT],
+}
+_TOKEN_PATTERNS["typescript"] = _TOKEN_PATTERNS["javascript"]
+_TOKENIZERS = {language: re.compile("|".join(patterns)) for language, patterns in _TOKEN_PATTERNS.items()}
+
+_TEMPLATE_CHUNK = re.compile(r"(?:[^`\\$]|\\[\s\S]|\$(?!\{))*")
+_REGEX_LITERAL = re.compile(r"/(?![*/])(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*")
+_PHP_OPEN_TAG = re.compile(r"<\?(?:php\b|=)?", re.IGNORECASE)
+
+# Words after which a "/" starts a regular expression rather than a division
+_REGEX_KEYWORDS = {
+    "return", "typeof", "instanceof", "in", "of", "new", "delete", "void", "throw", "case", "do", "else",
+    "yield", "await",
+}
+# Names that are followed by "(" without declaring a function
+_NOT_FUNCTION_NAMES = {
+    "if", "for", "while", "switch", "catch", "with", "return", "typeof", "new", "delete", "void", "throw",
+    "function", "synchronized", "try", "do", "else", "elseif", "foreach", "super", "this", "await", "yield",
+    "sizeof", "match", "fn", "array", "list", "isset", "unset", "empty", "echo", "print", "declare", "use",
+    "require", "require_once", "include", "include_once", "assert",
+}
+# Words that can't precede the name of a declared method
+_NOT_DECLARATION_PREFIXES = {
+    "return", "typeof", "instanceof", "in", "of", "new", "delete", "throw", "case", "do", "else", "yield",
+    "await", "extends", "implements", "record", "class", "interface", "enum", "import", "package", "echo", "print",
+}
+_METHOD_PREFIX_PUNCT = {None, "{", "}", ";", ",", ">", "]", "*"}
+# Tokens allowed in TypeScript/PHP return types and Java throws clauses
+_ANNOTATION_PUNCT = {".", ",", "<", ">", "|", "&", "?", "[", "]", "(", ")", "=>", ":", "*"}
+_CLOSERS = {"(": ")", "[": "]", "{": "}"}
+# Tokens allowed in TypeScript type parameter lists, besides words and nested "<" and ">"
+_TYPE_PARAMETER_PUNCT = {".", ",", "|", "&", "[", "]", "=", "?", ":"}
+
+
+def _tokenize(source: str, language: str) -> Iterator[Token]:
+    tokenizer = _TOKENIZERS[language]
+    script = language in ("javascript", "typescript")
+    # True for "${" inside template literals, False for ordinary braces
+    braces: List[bool] = []
+    previous: Optional[Token] = None
+    newline = False
+    pos = 0
+    end = len(source)
+    # Where the line of the last unterminated regular expression literal ends
+    no_regex_until = 0
+
+    if language == "php":
+        # Everything before the first open tag is HTML
+        opening = _PHP_OPEN_TAG.search(source)
+        pos = opening.end() if opening else end
+
+    while pos < end:
+        char = source[pos]
+
+        if script and char == "/" and pos >= no_regex_until and source[pos + 1:pos + 2] not in ("/", "*") and (
+            previous is None
+            or (previous[0] == "punct" and previous[1] not in (")", "]", "}"))
+            or (previous[0] == "id" and previous[1] in _REGEX_KEYWORDS)
+        ):
+            match = _REGEX_LITERAL.match(source, pos)
+            if match:
+                previous = ("str", match.group(), pos, match.end(), newline)
+                yield previous
+                newline = False
+                pos = match.end()
+                continue
+            # Trying every later "/" of the line again would make one long line quadratic
+            line_end = source.find("\n", pos)
+            no_regex_until = end if line_end == -1 else line_end
+
+        if script and char == "}" and braces and braces[-1]:
+            # End of a "${...}" substitution, the template literal carries on
+            braces.pop()
+            char = "`"
+
+        if char == "`" and script:
+            start = pos
+            pos = _TEMPLATE_CHUNK.match(source, pos + 1).end()
+            if source.startswith("${", pos):
+                braces.append(True)
+                pos += 2
+            elif pos < end:
+                pos += 1
+            previous = ("str", source[start:pos], start, pos, newline)
+            yield previous
+            newline = False
+            continue
+
+        match = tokenizer.match(source, pos)
+        kind = match.lastgroup
+        text = match.group()
+        start, pos = pos, match.end()
+
+        if kind in ("space", "comment", "hash_comment"):
+            newline = newline or "\n" in text
+            continue
+        if kind == "heredoc":
+            closing = re.compile(r"^[ \t]*" + re.escape(match.group("label")) + r"\b", re.MULTILINE)
+            found = closing.search(source, pos)
+            pos = found.end() if found else end
+            kind, text = "str", source[start:pos]
+        elif kind == "close_tag":
+            # Back to HTML until the next open tag, the closing tag also ends a statement
+            opening = _PHP_OPEN_TAG.search(source, pos)
+            pos = opening.end() if opening else end
+            kind, text = "punct", ";"
+        elif kind == "punct" and script:
+            if text == "{":
+                braces.append(False)
+            elif text == "}" and braces:
+                braces.pop()
+
+        previous = (kind, text, start, pos, newline)
+        yield previous
+        newline = False
+
+
+def _find_brace_functions(source: str, language: str) -> List[Tuple[int, str, int]]:
+    """
+    Finds named functions in a brace language.
+
+    Returns:
+        (start, name, end) of every function, bodies included, in no particular order.
+    """
+    script = language in ("javascript", "typescript")
+    annotated = language in ("typescript", "php")
+    found = []
+
+    # Each frame: closing bracket, function whose parameters or body it holds, and the
+    # member_start and declaration of the enclosing bracket, restored when it closes
+    stack: List[list] = []
+    member_start = None
+    declaration = None  # (name, start) of the variable named by const/let/var
+    declaring = None  # start of a const/let/var whose name comes next
+    assign = None  # (name, start) of the left-hand side of the last "="
+    pending = None  # [candidate, depth, in_annotation] once its parameters are closed
+    arrow = None  # candidate whose "=>" was just read
+    expression = None  # [name, start, depth, end, has_token] of an arrow with an expression body
+    # [open "<" count, p1, p2, p3, member_start] while TypeScript type parameters after a name are read,
+    # then the same with the closing ">" token first, so a "(" right after it sees the name
+    type_parameters = None
+    after_type_parameters = None
+    p1 = p2 = p3 = None
+
+    for token in _tokenize(source, language):
+        kind, text, start, end, newline = token
+        punct = text if kind == "punct" else None
+        depth = len(stack)
+
+        if type_parameters is not None:
+            if punct == "<":
+                type_parameters[0] += 1
+            elif punct == ">":
+                type_parameters[0] -= 1
+                if not type_parameters[0]:
+                    after_type_parameters, type_parameters = [token] + type_parameters[1:], None
+            elif kind not in ("id", "str", "num") and punct not in _TYPE_PARAMETER_PUNCT:
+                type_parameters = None
+        elif punct == "<" and language == "typescript" and p1 is not None and (p1[0] == "id" or p1[1] == "="):
+            type_parameters = [1, p1, p2, p3, member_start]
+
+        if expression is not None and depth == expression[2]:
+            if punct in (";", ",", ")", "]", "}") or (newline and expression[4]):
+                found.append((expression[1], expression[0], expression[3]))
+                expression = None
+
+        if pending is not None and depth == pending[1]:
+            candidate, _, in_annotation = pending
+            if punct == "{" and candidate[2] != "arrow":
+                pending = None
+                stack.append(["}", candidate, member_start, declaration])
+                member_start = declaration = None
+                p1, p2, p3 = token, p1, p2
+                continue
+            if punct == "=>" and candidate[2] == "arrow":
+                pending = None
+                arrow = candidate
+                p1, p2, p3 = token, p1, p2
+                continue
+            if not in_annotation and (
+                (punct == ":" and annotated) or (text == "throws" and language == "java")
+            ):
+                pending[2] = True
+            elif not (in_annotation and (kind in ("id", "str", "num") or punct in _ANNOTATION_PUNCT)):
+                pending = None
+
+        if arrow is not None:
+            candidate, arrow = arrow, None
+            if punct == "{":
+                stack.append(["}", candidate, member_start, declaration])
+                member_start = declaration = None
+                p1, p2, p3 = token, p1, p2
+                continue
+            expression = [candidate[0], candidate[1], depth, end, False]
+
+        if punct in _CLOSERS:
+            candidate = None
+            if punct == "(" and after_type_parameters is not None and after_type_parameters[0] is p1:
+                # Generic function or method, decided by what precedes its type parameters
+                _, name, before, before_that, name_member_start = after_type_parameters
+                candidate = _parameters_of(language, script, name, before, before_that, name_member_start, assign)
+            elif punct == "(":
+                candidate = _parameters_of(language, script, p1, p2, p3, member_start, assign)
+            stack.append([_CLOSERS[punct], candidate, member_start, declaration])
+            member_start = declaration = declaring = None
+        elif punct in (")", "]", "}"):
+            if stack and stack[-1][0] == punct:
+                closer, candidate, member_start, declaration = stack.pop()
+                if candidate is not None:
+                    if closer == ")":
+                        pending = [candidate, len(stack), False]
+                    else:
+                        found.append((candidate[1], candidate[0], end))
+            if punct == "}":
+                member_start = None
+        elif punct in (";", ","):
+            member_start = declaration = declaring = None
+        else:
+            if member_start is None:
+                member_start = start
+            if script:
+                if kind == "id" and text in ("const", "let", "var"):
+                    declaring = start
+                elif kind == "id" and declaring is not None:
+                    declaration, declaring = (text, declaring), None
+                elif punct == "=":
+                    # The declared name also covers TypeScript annotations, as in "const f: T = ..."
+                    if declaration is not None:
+                        assign = declaration
+                    elif p1 is not None and p1[0] == "id":
+                        assign = (p1[1], p1[2])
+                    else:
+                        assign = None
+                    declaration = None
+                elif punct == "=>" and assign and p1 and p1[0] == "id" and _follows_assignment(p2, p3):
+                    # Single parameter arrow function without parentheses
+                    arrow = (assign[0], assign[1], "arrow")
+
+        if expression is not None:
+            expression[3] = end
+            expression[4] = True
+        p1, p2, p3 = token, p1, p2
+
+    if expression is not None:
+        found.append((expression[1], expression[0], expression[3]))
+    return found
+
+
+def _follows_assignment(p1, p2):
+    """True if p1 is "=" or "async" right after "=", the start of a function expression."""
+    if p1 is None:
+        return False
+    if p1[0] == "punct":
+        return p1[1] == "="
+    return p1[1] == "async" and p2 is not None and p2[1] == "="
+
+
+def _parameters_of(language, script, p1, p2, p3, member_start, assign):
+    """
+    Decides whether the "(" after p1, p2, p3 opens the parameters of a named function.
+
+    Returns:
+        A (name, start, kind) candidate, or None.
+    """
+    if p1 is None:
+        return None
+    if p1[0] == "id" and p1[1] == "function":
+        # Anonymous function expression, named by the variable it is assigned to
+        if script and assign and _follows_assignment(p2, p3):
+            return assign[0], assign[1], "function"
+        return None
+    if script and assign and p1[1] in ("=", "async") and _follows_assignment(p1, p2):
+        return assign[0], assign[1], "arrow"
+
+    if p1[0] != "id" or p1[1] in _NOT_FUNCTION_NAMES:
+        return None
+    name = p1[1]
+    if p2 is not None and p2[1] == "function":
+        if language == "php":
+            return name, member_start, "function"
+        return name, p3[2] if p3 is not None and p3[1] == "async" else p2[2], "function"
+    if p2 is not None and p2[1] == "*" and p3 is not None and p3[1] == "function":
+        return name, p3[2], "function"
+    if language == "php":
+        return None
+
+    # Method declarations, Java methods and constructors or class and object literal methods
+    prefix = None if p2 is None else p2[1]
+    if p2 is not None and p2[0] == "id":
+        if prefix in _NOT_DECLARATION_PREFIXES:
+            return None
+    elif prefix not in _METHOD_PREFIX_PUNCT:
+        return None
+    return name, member_start, "method"
+
+
+def _python_functions(source: str) -> Dict[str, str]:
+    """Functions of Python source, segments are cut with one pass over the line offsets."""
+    tree = ast.parse(source)
+    # ast only breaks lines on \r\n, \r and \n
+    line_starts = [0] + [match.end() for match in re.finditer(r"\r\n|\r|\n", source)]
+    line_starts.append(len(source))
+
+    def offset(line, column):
+        # Columns are UTF-8 byte offsets
+        line_start = line_starts[line - 1]
+        text = source[line_start:line_starts[line]]
+        return line_start + len(text.encode("utf-8")[:column].decode("utf-8", errors="ignore"))
+
+    functions = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef):
+            start = offset(node.lineno, node.col_offset)
+            functions[node.name] = source[start:offset(node.end_lineno, node.end_col_offset)]
+    return functions
+
+
+def extract_functions(source: str, language: str) -> Dict[str, str]:
+    """
+    Extracts the named functions of a source file.
+
+    Args:
+        source: Content of the file.
+        language: One of LANGUAGES.
+    Returns:
+        Dictionary of function name to function code. When a name is declared more than
+        once the last declaration in the file wins.
+    Raises:
+        SyntaxError: If Python source can't be parsed.
+        ValueError: If the language isn't supported.
+    """
+    if language == "python":
+        return _python_functions(source)
+    if language not in _TOKENIZERS:
+        raise ValueError(f"Unsupported language: {language}")
+    return {name: source[start:end] for start, name, end in sorted(_find_brace_functions(source, language))}
@@ -0,0 +1,133 @@
+import bisect
+import mmap
+import os
+import struct
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+from multi_layer_operation_predictor.atomic_file import atomic_write
+
+# Layout, all integers little-endian:
+#   header        magic, version, function count, names blob size, code blob size
+#   name offsets  (count + 1) uint64 offsets into the names blob
+#   code offsets  (count + 1) uint64 offsets into the code blob
+#   names blob    UTF-8 names sorted by their encoded bytes
+#   code blob     UTF-8 function bodies in the same order
+STORE_MAGIC = b"FNSTORE\0"
+STORE_VERSION = 1
+HEADER = struct.Struct("<8sIIQQ")
+OFFSET_DTYPE = np.dtype("<u8")
+
+
+def _offsets(chunks):
+    offsets = np.zeros(len(chunks) + 1, dtype=OFFSET_DTYPE)
+    np.cumsum([len(chunk) for chunk in chunks], out=offsets[1:])
+    return offsets
+
+
+def write_function_store(file_path, functions):
+    """
+    Writes functions to file_path in the compact store format.
+
+    The file is written next to its destination and moved into place, so processes
+    that still have the previous file mapped keep reading a consistent copy.
+
+    Args:
+        file_path: Destination of the store.
+        functions: Mapping of function name to function code.
+    """
+    items = sorted(
+        ((name.encode("utf-8"), code.encode("utf-8")) for name, code in functions.items()),
+        key=lambda item: item[0],
+    )
+    names = [name for name, _ in items]
+    codes = [code for _, code in items]
+    name_offsets = _offsets(names)
+    code_offsets = _offsets(codes)
+
+    with atomic_write(file_path, "wb") as f:
+        f.write(HEADER.pack(STORE_MAGIC, STORE_VERSION, len(items), int(name_offsets[-1]), int(code_offsets[-1])))
+        f.write(name_offsets.tobytes())
+        f.write(code_offsets.tobytes())
+        f.writelines(names)
+        f.writelines(codes)
+
+
+class _SortedNames(Sequence):
+    """Encoded names of a store, decoded from the mapping one at a time for binary search."""
+
+    def __init__(self, store):
+        self._store = store
+
+    def __getitem__(self, position):
+        return self._store._name_bytes(position)
+
+    def __len__(self):
+        return len(self._store)
+
+
+class FunctionStore(Mapping):
+    """
+    Read-only mapping of function name to code backed by a memory-mapped store file.
+
+    Workers mapping the same file share its pages through the OS page cache, and a
+    function body is only sliced out and decoded when it is looked up.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        with open(file_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count, names_size, code_size = HEADER.unpack_from(self._mmap, 0)
+        if magic != STORE_MAGIC or version != STORE_VERSION:
+            self._mmap.close()
+            raise ValueError(f"{file_path} is not a version {STORE_VERSION} function store")
+
+        self._count = count
+        position = HEADER.size
+        self._name_offsets = np.frombuffer(self._mmap, dtype=OFFSET_DTYPE, count=count + 1, offset=position)
+        position += self._name_offsets.nbytes
+        self._code_offsets = np.frombuffer(self._mmap, dtype=OFFSET_DTYPE, count=count + 1, offset=position)
+        position += self._code_offsets.nbytes
+        self._names_start = position
+        self._code_start = position + names_size
+        self._sorted_names = _SortedNames(self)
+
+    def _name_bytes(self, position):
+        start = self._names_start + int(self._name_offsets[position])
+        end = self._names_start + int(self._name_offsets[position + 1])
+        return self._mmap[start:end]
+
+    def _position(self, name):
+        if not isinstance(name, str):
+            return None
+        encoded = name.encode("utf-8")
+        position = bisect.bisect_left(self._sorted_names, encoded)
+        if position < self._count and self._sorted_names[position] == encoded:
+            return position
+        return None
+
+    def __getitem__(self, name):
+        position = self._position(name)
+        if position is None:
+            raise KeyError(name)
+        start = self._code_start + int(self._code_offsets[position])
+        end = self._code_start + int(self._code_offsets[position + 1])
+        return self._mmap[start:end].decode("utf-8")
+
+    def __contains__(self, name):
+        return self._position(name) is not None
+
+    def __iter__(self):
+        for position in range(self._count):
+            yield self._name_bytes(position).decode("utf-8")
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        # numpy views over the map have to go before it can be closed
+        self._name_offsets = self._code_offsets = None
+        self._mmap.close()
@@ -0,0 +1,170 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict, Set
+
+from multi_layer_operation_predictor.local_index import LocalFunctionIndex
+
+logger = logging.getLogger(__name__)
+
+# Changes are applied once no event arrived for DEBOUNCE_SECONDS, or MAX_DELAY_SECONDS after the first one
+DEBOUNCE_SECONDS = 0.5
+MAX_DELAY_SECONDS = 5.0
+# More changed files than this, e.g. after a git checkout, and the repository is walked once instead
+BURST_REFRESH_THRESHOLD = 200
+POLL_INTERVAL = 2.0
+
+
+class _EventHandler:
+    """Forwards the watchdog events of one repository to the watcher."""
+
+    def __init__(self, watcher, repo_path):
+        self.watcher = watcher
+        self.repo_path = repo_path
+
+    def dispatch(self, event):
+        if event.is_directory:
+            # A moved or deleted directory doesn't report the files inside it
+            if event.event_type in ("created", "deleted", "moved"):
+                self.watcher.schedule_refresh(self.repo_path)
+            return
+        paths = [event.src_path]
+        if getattr(event, "dest_path", None):
+            paths.append(event.dest_path)
+        self.watcher.schedule_files(self.repo_path, paths)
+
+
+class IndexWatcher:
+    """
+    Keeps a LocalFunctionIndex up to date while repositories change on disk.
+
+    With watchdog installed, file system events (inotify on Linux) name the changed files
+    and only those are parsed again. Events are debounced so a burst of them is applied
+    at once, and a very large burst refreshes the whole repository instead. Without
+    watchdog, the watched repositories are refreshed every poll_interval seconds. All of
+    it runs on background threads, lookups only read the in-memory function map.
+    """
+
+    def __init__(self, index: LocalFunctionIndex, use_watchdog=True, debounce=DEBOUNCE_SECONDS,
+                 max_delay=MAX_DELAY_SECONDS, poll_interval=POLL_INTERVAL):
+        """
+        Args:
+            index: The index to keep up to date.
+            use_watchdog: Whether to use file system events when watchdog is installed.
+            debounce: Seconds without events after which pending changes are applied.
+            max_delay: Seconds after the first pending event when changes are applied regardless.
+            poll_interval: Seconds between refreshes when polling.
+        """
+        self.index = index
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self._observer = None
+        if use_watchdog:
+            try:
+                from watchdog.observers import Observer
+                self._observer = Observer()
+                self._observer.daemon = True
+                self._observer.start()
+            except ImportError:
+                logger.warning("watchdog is not installed, polling repositories for changes instead")
+        self.mode = "events" if self._observer else "polling"
+
+        self._scheduled = set()
+        # Replaced rather than changed in place, so is_watching can read it without the lock
+        self._repo_paths = frozenset()
+        self._pending_files: Dict[str, Set[str]] = {}
+        self._pending_refresh: Set[str] = set()
+        self._first_event = None
+        self._last_event = None
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(
+            target=self._apply_events if self._observer else self._poll, name="index-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def watch(self, repo_path: str):
+        """Indexes a repository and starts watching it, nothing happens when it is already watched."""
+        repo_path = os.path.realpath(repo_path)
+        with self._condition:
+            if repo_path in self._scheduled:
+                return
+            self._scheduled.add(repo_path)
+        # Events are observed before the initial refresh, so changes made during it aren't missed. Scheduling walks
+        # the repository to add its directories, which mustn't block the threads delivering events meanwhile
+        if self._observer:
+            self._observer.schedule(_EventHandler(self, repo_path), repo_path, recursive=True)
+        self.index.refresh(repo_path)
+        with self._condition:
+            self._repo_paths = self._repo_paths | {repo_path}
+        logger.info(f"Watching {repo_path} for changes ({self.mode})")
+
+    def is_watching(self, repo_path: str) -> bool:
+        """Whether a repository is indexed and watched, doesn't wait for repositories being added."""
+        return os.path.realpath(repo_path) in self._repo_paths
+
+    def schedule_files(self, repo_path, file_paths):
+        """Queues changed files to be indexed again once the events settle."""
+        with self._condition:
+            self._pending_files.setdefault(repo_path, set()).update(file_paths)
+            self._event_received()
+
+    def schedule_refresh(self, repo_path):
+        """Queues a walk of the whole repository once the events settle."""
+        with self._condition:
+            self._pending_refresh.add(repo_path)
+            self._event_received()
+
+    def _event_received(self):
+        self._last_event = time.monotonic()
+        if self._first_event is None:
+            self._first_event = self._last_event
+        self._condition.notify()
+
+    def _apply_events(self):
+        while True:
+            with self._condition:
+                while not self._stopped and self._first_event is None:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                now = time.monotonic()
+                apply_at = min(self._last_event + self.debounce, self._first_event + self.max_delay)
+                if now < apply_at:
+                    self._condition.wait(apply_at - now)
+                    continue
+                pending_files, self._pending_files = self._pending_files, {}
+                pending_refresh, self._pending_refresh = self._pending_refresh, set()
+                self._first_event = self._last_event = None
+
+            for repo_path in pending_refresh | set(pending_files):
+                file_paths = pending_files.get(repo_path, ())
+                try:
+                    if repo_path in pending_refresh or len(file_paths) > BURST_REFRESH_THRESHOLD:
+                        self.index.refresh(repo_path)
+                    else:
+                        self.index.update_files(repo_path, file_paths)
+                except Exception:
+                    logger.exception(f"Failed to update the function index of {repo_path}")
+
+    def _poll(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._stopped, self.poll_interval)
+                if self._stopped:
+                    return
+            for repo_path in self._repo_paths:
+                try:
+                    self.index.refresh(repo_path)
+                except Exception:
+                    logger.exception(f"Failed to refresh the function index of {repo_path}")
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._observer:
+            self._observer.stop()
+        self._thread.join(timeout=5)
@@ -0,0 +1,290 @@
+import logging
+import os
+import sqlite3
+import threading
+from concurrent.futures import Executor
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+from multi_layer_operation_predictor.function_scanner import extract_functions
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    repo_path TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (repo_path, file_path)
+);
+CREATE TABLE IF NOT EXISTS functions (
+    repo_path TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    code TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS functions_by_file ON functions (repo_path, file_path);
+"""
+
+# Fewer changed files than this are parsed on the calling thread even when a parse executor is set
+PROCESS_POOL_MIN_FILES = 32
+
+# Maps a file extension to the function parsing the file and the language passed to it
+Extractors = Dict[str, Tuple[Callable[[str, str], Dict[str, str]], str]]
+
+
+def extract_file_functions(file_path: str, language: str) -> Dict[str, str]:
+    """Parses one file, a module level function so parser processes can run it."""
+    functions = {}
+    try:
+        with open(file_path, "r") as f:
+            source = f.read()
+        functions = extract_functions(source, language)
+        for function_name in functions:
+            logger.debug("Found %s function: %s", language, function_name)
+    except Exception as e:
+        logger.error("Error parsing %s file %s: %s", language, file_path, e)
+    return functions
+
+
+def get_default_index_path():
+    return os.getenv("FUNCTION_INDEX_PATH") or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "data", "function_index.sqlite3"
+    )
+
+
+class RepoFunctions:
+    """
+    The functions of one repository in memory, by name and by file.
+
+    Like the SQLite query they are loaded from, a name defined in several files resolves
+    to the definition in the last file path, so replacing one file only revisits the
+    names that file defines.
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str, str, str]] = ()):
+        self.functions: Dict[str, str] = {}
+        self.files: Dict[str, Dict[str, str]] = {}
+        self.definers: Dict[str, Set[str]] = {}
+        for file_path, name, code in rows:
+            self.files.setdefault(file_path, {})[name] = code
+            self.definers.setdefault(name, set()).add(file_path)
+        for name, file_paths in self.definers.items():
+            self.functions[name] = self.files[max(file_paths)][name]
+
+    def replace_file(self, file_path: str, functions: Optional[Dict[str, str]]):
+        """Replaces the functions of one file, None removes the file."""
+        old_functions = self.files.pop(file_path, {})
+        if functions:
+            self.files[file_path] = functions
+        for name in old_functions.keys() - (functions or {}).keys():
+            definers = self.definers[name]
+            definers.discard(file_path)
+            if definers:
+                self.functions[name] = self.files[max(definers)][name]
+            else:
+                del self.definers[name]
+                del self.functions[name]
+        for name, code in (functions or {}).items():
+            definers = self.definers.setdefault(name, set())
+            definers.add(file_path)
+            self.functions[name] = self.files[max(definers)][name]
+
+
+class LocalFunctionIndex:
+    """
+    Functions of local repositories, kept in SQLite so they survive restarts.
+
+    refresh() walks a repository and only parses the files whose mtime or size changed
+    since they were indexed, and drops the ones that were deleted. update_files() does the
+    same for a few known paths without walking. The functions of each repository are also
+    kept in memory, loaded once and then patched in place for the files that changed.
+    """
+
+    def __init__(self, db_path: str, extractors: Extractors, parse_executor: Optional[Executor] = None):
+        """
+        Args:
+            db_path: SQLite database file, ":memory:" keeps the index in memory only.
+            extractors: Extension to (parse function, language) mapping deciding which files are indexed.
+            parse_executor: Runs the parse functions when many files changed, e.g. a ProcessPoolExecutor
+                since parsing holds the GIL. The parse functions must be picklable for a process pool.
+        """
+        self.db_path = db_path
+        self.extractors = extractors
+        self.parse_executor = parse_executor
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._repos: Dict[str, RepoFunctions] = {}
+        # Incremented whenever the indexed functions change, lets callers cache what they derive from them
+        self.version = 0
+
+    def _walk(self, repo_path):
+        """Yields (file path relative to the repository, absolute path) of every indexable file."""
+        for root, _, files in os.walk(repo_path):
+            for file in files:
+                if os.path.splitext(file)[1] in self.extractors:
+                    file_path = os.path.join(root, file)
+                    yield os.path.relpath(file_path, repo_path), file_path
+
+    def refresh(self, repo_path: str) -> int:
+        """
+        Brings the index of a repository up to date with the files on disk.
+
+        Returns:
+            The number of files parsed again or removed from the index.
+        """
+        repo_path = os.path.realpath(repo_path)
+        with self._lock:
+            indexed = {
+                file_path: (mtime_ns, size)
+                for file_path, mtime_ns, size in self._connection.execute(
+                    "SELECT file_path, mtime_ns, size FROM files WHERE repo_path = ?", (repo_path,)
+                )
+            }
+
+        changed = []
+        seen = set()
+        for relative_path, file_path in self._walk(repo_path):
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            seen.add(relative_path)
+            if indexed.get(relative_path) != (stat.st_mtime_ns, stat.st_size):
+                changed.append((relative_path, file_path, stat))
+        removed = [file_path for file_path in indexed if file_path not in seen]
+
+        # Parsing happens outside the lock so lookups of other repositories aren't held up
+        parsed = self._parse(changed)
+        if parsed or removed:
+            self._store(repo_path, parsed, removed)
+            logger.info(f"Indexed {len(parsed)} changed and removed {len(removed)} files of {repo_path}")
+        return len(parsed) + len(removed)
+
+    def update_files(self, repo_path: str, file_paths: Iterable[str]) -> int:
+        """
+        Re-indexes a few files of a repository, e.g. the ones a file watcher saw change,
+        without walking the repository.
+
+        Args:
+            repo_path: Repository directory.
+            file_paths: Absolute paths inside the repository, deleted files are removed from the index.
+
+        Returns:
+            The number of files parsed again or removed from the index.
+        """
+        repo_path = os.path.realpath(repo_path)
+        with self._lock:
+            indexed = {
+                file_path: (mtime_ns, size)
+                for file_path, mtime_ns, size in self._connection.execute(
+                    "SELECT file_path, mtime_ns, size FROM files WHERE repo_path = ?", (repo_path,)
+                )
+            }
+
+        changed = []
+        removed = []
+        for file_path in set(file_paths):
+            relative_path = os.path.relpath(os.path.realpath(file_path), repo_path)
+            file_path = os.path.join(repo_path, relative_path)
+            if relative_path.startswith(os.pardir) or os.path.splitext(file_path)[1] not in self.extractors:
+                continue
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                if relative_path in indexed:
+                    removed.append(relative_path)
+                continue
+            if indexed.get(relative_path) != (stat.st_mtime_ns, stat.st_size):
+                changed.append((relative_path, file_path, stat))
+
+        parsed = self._parse(changed)
+        if parsed or removed:
+            self._store(repo_path, parsed, removed)
+            logger.info(f"Updated {len(parsed)} and removed {len(removed)} files of {repo_path}")
+        return len(parsed) + len(removed)
+
+    def _parse(self, changed):
+        """Returns (relative path, stat, functions) of every changed file."""
+        tasks = []
+        for relative_path, file_path, stat in changed:
+            extractor, language = self.extractors[os.path.splitext(file_path)[1]]
+            tasks.append((relative_path, stat, extractor, file_path, language))
+        if self.parse_executor is None or len(tasks) < PROCESS_POOL_MIN_FILES:
+            return [
+                (relative_path, stat, extractor(file_path, language))
+                for relative_path, stat, extractor, file_path, language in tasks
+            ]
+        futures = [
+            (relative_path, stat, self.parse_executor.submit(extractor, file_path, language))
+            for relative_path, stat, extractor, file_path, language in tasks
+        ]
+        return [(relative_path, stat, future.result()) for relative_path, stat, future in futures]
+
+    def _store(self, repo_path, parsed, removed):
+        with self._lock, self._connection:
+            for relative_path in [*removed, *(relative_path for relative_path, _, _ in parsed)]:
+                self._connection.execute(
+                    "DELETE FROM functions WHERE repo_path = ? AND file_path = ?", (repo_path, relative_path)
+                )
+                self._connection.execute(
+                    "DELETE FROM files WHERE repo_path = ? AND file_path = ?", (repo_path, relative_path)
+                )
+            for relative_path, stat, functions in parsed:
+                self._connection.execute(
+                    "INSERT INTO files (repo_path, file_path, mtime_ns, size) VALUES (?, ?, ?, ?)",
+                    (repo_path, relative_path, stat.st_mtime_ns, stat.st_size),
+                )
+                self._connection.executemany(
+                    "INSERT INTO functions (repo_path, file_path, name, code) VALUES (?, ?, ?, ?)",
+                    [(repo_path, relative_path, name, code) for name, code in functions.items()],
+                )
+
+            self.version += 1
+            repo = self._repos.get(repo_path)
+            if repo is not None:
+                for relative_path in removed:
+                    repo.replace_file(relative_path, None)
+                for relative_path, _, functions in parsed:
+                    repo.replace_file(relative_path, functions)
+
+    def _get_repo(self, repo_path):
+        """Returns the in-memory functions of a repository, loading them on first use. Hold the lock."""
+        repo = self._repos.get(repo_path)
+        if repo is None:
+            repo = RepoFunctions(self._connection.execute(
+                "SELECT file_path, name, code FROM functions WHERE repo_path = ? ORDER BY file_path, rowid",
+                (repo_path,),
+            ))
+            self._repos[repo_path] = repo
+        return repo
+
+    def get_repo_functions(self, repo_path: str) -> Dict[str, str]:
+        """Returns a copy of the indexed functions of one repository, without looking at the files on disk."""
+        repo_path = os.path.realpath(repo_path)
+        with self._lock:
+            return dict(self._get_repo(repo_path).functions)
+
+    def get_functions(self, repo_paths: Iterable[str], refresh: bool = True) -> Dict[str, str]:
+        """
+        Returns the functions of every repository, the later repositories winning name clashes.
+
+        Args:
+            repo_paths: Repository directories.
+            refresh: Whether to pick up changed files first.
+        """
+        all_functions = {}
+        for repo_path in repo_paths:
+            if refresh:
+                self.refresh(repo_path)
+            with self._lock:
+                all_functions.update(self._get_repo(os.path.realpath(repo_path)).functions)
+        return all_functions
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
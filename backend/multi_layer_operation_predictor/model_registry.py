@@ -0,0 +1,124 @@
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ResidentModel:
+    """A loaded (knn, vectorizer) pair and the function set it was built from."""
+
+    signature: Any
+    knn_model: Any
+    vectorizer: Any
+
+
+class ModelRegistry:
+    """
+    Process-wide holder of the ML model for each language.
+
+    Requests only ever read the resident model. Loading an artifact from disk or
+    training a new one happens on a background thread, and the finished model is
+    swapped in with a single assignment so readers see either the old or the new pair.
+    With max_models, the least recently used models are dropped beyond that many and
+    built again when next used.
+    """
+
+    def __init__(self, max_workers: int = 1, max_models: Optional[int] = None):
+        self.max_models = max_models
+        self._models: Dict[str, ResidentModel] = OrderedDict()
+        self._pending: Dict[str, Any] = {}
+        self._failed: Dict[str, Any] = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="ml-model-builder"
+        )
+
+    def get(self, language: str, operations, build: Callable) -> tuple:
+        """
+        Returns the resident (knn, vectorizer) pair without blocking.
+
+        Schedules a background build when no model is resident for the language or
+        when the resident one was built from a different function set.
+
+        Args:
+            language: The programming language of the operations.
+            operations: The OperationIndex the model should be built from.
+            build: Callable taking (language, operations, resident) and returning (knn, vectorizer).
+        Returns:
+            The resident (knn, vectorizer) pair, or (None, None) while the first build runs.
+        """
+        with self._lock:
+            resident = self._models.get(language)
+            if resident is not None:
+                self._models.move_to_end(language)
+        if resident is None or resident.signature != operations.signature:
+            self.schedule(language, operations, build)
+        if resident is None:
+            return None, None
+        return resident.knn_model, resident.vectorizer
+
+    def schedule(self, language: str, operations, build: Callable):
+        """Queues a background build unless one for the same function set is already queued."""
+        signature = operations.signature
+        with self._lock:
+            if self._pending.get(language, object()) == signature:
+                return self._futures.get(language)
+            if self._failed.get(language, object()) == signature:
+                return None
+            self._pending[language] = signature
+            future = self._executor.submit(self._build, language, operations, build)
+            self._futures[language] = future
+            return future
+
+    def _build(self, language: str, operations, build: Callable):
+        signature = operations.signature
+        try:
+            knn_model, vectorizer = build(language, operations, self._models.get(language))
+        except Exception as e:
+            logger.error(f"Building the {language} ML model failed: {str(e)}", exc_info=True)
+            with self._lock:
+                if self._pending.get(language) == signature:
+                    self._failed[language] = signature
+                    del self._pending[language]
+            return
+
+        with self._lock:
+            if language not in self._pending:
+                # Discarded while it was built, nothing uses the key anymore
+                return
+            self._models[language] = ResidentModel(signature, knn_model, vectorizer)
+            self._models.move_to_end(language)
+            self._failed.pop(language, None)
+            if self._pending.get(language) == signature:
+                del self._pending[language]
+            while self.max_models is not None and len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+        logger.info(f"{language} ML model is resident")
+
+    def wait(self, language: str, timeout: Optional[float] = None) -> bool:
+        """Blocks until the latest build queued for a language has finished."""
+        future = self._futures.get(language)
+        if future is None:
+            return language in self._models
+        future.result(timeout=timeout)
+        return language in self._models
+
+    def is_resident(self, language: str) -> bool:
+        return language in self._models
+
+    def discard(self, language):
+        """
+        Drops the resident model of one key, e.g. when its operation index was evicted.
+        A build of the key still running is not made resident when it finishes.
+        """
+        with self._lock:
+            self._models.pop(language, None)
+            self._pending.pop(language, None)
+            self._futures.pop(language, None)
+            self._failed.pop(language, None)
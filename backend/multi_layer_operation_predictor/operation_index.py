@@ -0,0 +1,290 @@
+import hashlib
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict, defaultdict
+from collections.abc import Mapping
+from concurrent.futures import Future
+
+NGRAM_SIZE = 3
+
+
+def get_ngrams(text, size=NGRAM_SIZE):
+    """Returns the set of character n-grams of text."""
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def split_identifier(text):
+    """Splits camelCase, snake_case and hyphen-case identifiers into lower-case words."""
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text)
+    text = re.sub(r"([A-Z]+)([A-Z][a-z])", r"\1 \2", text)
+    return re.sub(r"[\W_]+", " ", text).strip().lower()
+
+
+def get_function_set_hash(operation_names):
+    """Returns a content hash of a set of operation names, independent of their order."""
+    digest = hashlib.sha256()
+    for operation_name in sorted(operation_names):
+        digest.update(operation_name.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class OperationIndex(Mapping):
+    """
+    In-memory view over the functions of one language.
+
+    Every matching stage (alias, substring, fuzzy and ML) reads from the same index,
+    so anything derived from the operation names only has to be computed once per load.
+    """
+
+    def __init__(self, operations, signature=None, aliases=None):
+        self.operations = operations
+        self.names = list(operations)
+        self.signature = signature
+        self._function_set_hash = None
+        self._build_alias_index(aliases or {})
+        self._build_ngram_index()
+        self.memory_size = self._estimate_memory_size()
+
+    def _build_alias_index(self, aliases):
+        # An operation's own name wins over an alias of another operation that
+        # normalizes to the same key, among aliases the first one loaded wins.
+        self._aliases = {}
+        for name in self.names:
+            self._aliases.setdefault(split_identifier(name), name)
+        for alias, name in aliases.items():
+            if name in self.operations:
+                self._aliases.setdefault(split_identifier(alias), name)
+
+    def find_alias(self, query):
+        """Returns the operation query is a known alias of, in a single hash lookup."""
+        return self._aliases.get(split_identifier(query))
+
+    @property
+    def function_set_hash(self):
+        """Content hash of the operation names, used to key the ML model artifacts."""
+        if self._function_set_hash is None:
+            self._function_set_hash = get_function_set_hash(self.names)
+        return self._function_set_hash
+
+    def _build_ngram_index(self):
+        # Names are ranked shortest first so the first verified candidate is the best one,
+        # and every posting list is filled in rank order which keeps it sorted.
+        self._ranked_names = sorted(self.names, key=lambda name: (len(name), name))
+        postings = defaultdict(list)
+        for rank, name in enumerate(self._ranked_names):
+            for ngram in get_ngrams(name):
+                postings[ngram].append(rank)
+        self._ngram_postings = dict(postings)
+
+    def _estimate_memory_size(self):
+        """
+        Approximate bytes held by the index, used by OperationIndexCache's memory budget.
+
+        Function bodies only count when they were loaded into a dict, a FunctionStore
+        keeps them in its memory map which the OS can page out.
+        """
+        size = sum(sys.getsizeof(name) for name in self.names)
+        size += sys.getsizeof(self.names) + sys.getsizeof(self._ranked_names)
+        size += sys.getsizeof(self._aliases) + sum(sys.getsizeof(alias) for alias in self._aliases)
+        size += sys.getsizeof(self._ngram_postings)
+        # Every posting holds a pointer and, past the small int cache, an int object
+        size += sum(sys.getsizeof(postings) + 28 * len(postings) for postings in self._ngram_postings.values())
+        if isinstance(self.operations, dict):
+            size += sys.getsizeof(self.operations) + sum(sys.getsizeof(code) for code in self.operations.values())
+        return size
+
+    def find_substring(self, query):
+        """Returns the shortest operation name that contains query, ties broken alphabetically."""
+        return self.search_substring(query)[0]
+
+    def search_substring(self, query):
+        """
+        Looks up the shortest operation name that contains query, ties broken alphabetically.
+
+        Candidates come from intersecting the posting lists of the query's trigrams and
+        are then verified, so only names sharing every trigram are ever compared.
+
+        Returns:
+            A (name or None, number of candidate names compared) pair.
+        """
+        ngrams = get_ngrams(query)
+        if not ngrams:
+            # Queries shorter than an n-gram cannot use the index
+            for rank, name in enumerate(self._ranked_names):
+                if query in name:
+                    return name, rank + 1
+            return None, len(self._ranked_names)
+
+        posting_lists = []
+        for ngram in ngrams:
+            posting_list = self._ngram_postings.get(ngram)
+            if not posting_list:
+                return None, 0
+            posting_lists.append(posting_list)
+        posting_lists.sort(key=len)
+
+        candidates = set(posting_lists[0])
+        for posting_list in posting_lists[1:]:
+            candidates.intersection_update(posting_list)
+            if not candidates:
+                return None, 0
+
+        for compared, rank in enumerate(sorted(candidates), start=1):
+            name = self._ranked_names[rank]
+            if query in name:
+                return name, compared
+        return None, len(candidates)
+
+    def __getitem__(self, operation_name):
+        return self.operations[operation_name]
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+
+def as_operation_index(operations):
+    """Wraps a plain operations dict so the stages accept either a dict or an index."""
+    if isinstance(operations, OperationIndex):
+        return operations
+    return OperationIndex(operations)
+
+
+def get_file_signature(file_path):
+    """Returns the (mtime, size) pair used to detect a rewritten data file, or None if it is missing."""
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_cache_key(language, tenant=None):
+    """Key of a language's index and model in the process-wide caches, scoped to a tenant if given."""
+    return language if tenant is None else (tenant, language)
+
+
+class OperationIndexCache:
+    """
+    Keeps one OperationIndex per language and tenant and reloads it only when its data file changes.
+
+    With a max_bytes budget the least recently used indexes are dropped once the indexes
+    together take more memory than that, and are loaded from disk again when next used.
+    Indexes are loaded outside the cache lock, so a tenant's reload never blocks lookups
+    of other tenants, and concurrent lookups of an index being loaded wait for that load.
+    """
+
+    def __init__(self, max_bytes=None, on_evict=None):
+        """
+        Args:
+            max_bytes: Memory budget of the cached indexes, unlimited when None.
+            on_evict: Callable taking the cache key of an evicted index.
+        """
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self._indexes = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        # Loads in flight by cache key, as (signature, future of the index)
+        self._loading = {}
+
+    def get(self, language, file_path, loader, alias_path=None, alias_loader=None, tenant=None):
+        """
+        Returns the cached index for a language, reloading it through `loader` when needed.
+
+        Args:
+            language: The programming language of the operations.
+            file_path: The data file the operations are loaded from.
+            loader: Callable taking the language and returning the operations dict.
+            alias_path: Optional file the aliases are loaded from, a change to it reloads the index too.
+            alias_loader: Callable taking the language and returning an alias to operation name dict.
+            tenant: Key of the user's repository the operations belong to, None for the shared index.
+        Returns:
+            The OperationIndex for the language.
+        """
+        signature = get_file_signature(file_path)
+        if signature is None:
+            # Nothing on disk to key a cache entry on, let the loader decide what to return
+            return self._load(language, None, loader, alias_loader)
+        if alias_path is not None:
+            signature = (signature, get_file_signature(alias_path))
+
+        key = get_cache_key(language, tenant)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None and index.signature == signature:
+                self._indexes.move_to_end(key)
+                return index
+            loading = self._loading.get(key)
+            waiting = loading is not None and loading[0] == signature
+            if waiting:
+                future = loading[1]
+            else:
+                future = Future()
+                self._loading[key] = (signature, future)
+        if waiting:
+            return future.result()
+
+        try:
+            index = self._load(language, signature, loader, alias_loader)
+        except BaseException as e:
+            with self._lock:
+                if self._loading.get(key, (None, None))[1] is future:
+                    del self._loading[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            # A load of a newer signature that started meanwhile owns the cache entry
+            evicted = []
+            if self._loading.get(key, (None, None))[1] is future:
+                del self._loading[key]
+                self._discard(key)
+                self._indexes[key] = index
+                self._size += index.memory_size
+                evicted = self._evict()
+        future.set_result(index)
+
+        for evicted_key in evicted:
+            self.on_evict(evicted_key)
+        return index
+
+    def _load(self, language, signature, loader, alias_loader):
+        aliases = alias_loader(language) if alias_loader else None
+        return OperationIndex(loader(language), signature, aliases)
+
+    def _discard(self, key):
+        index = self._indexes.pop(key, None)
+        if index is not None:
+            self._size -= index.memory_size
+
+    def _evict(self):
+        """Drops least recently used indexes until the budget holds, never the one just used."""
+        evicted = []
+        while self.max_bytes is not None and self._size > self.max_bytes and len(self._indexes) > 1:
+            key, index = self._indexes.popitem(last=False)
+            self._size -= index.memory_size
+            evicted.append(key)
+        return evicted if self.on_evict else []
+
+    @property
+    def memory_size(self):
+        """Approximate bytes held by the cached indexes."""
+        return self._size
+
+    def __contains__(self, key):
+        return key in self._indexes
+
+    def invalidate(self, language=None, tenant=None):
+        """Drops the cached index for a language, or every index when no language is given."""
+        with self._lock:
+            if language is None:
+                self._indexes.clear()
+                self._size = 0
+            else:
+                self._discard(get_cache_key(language, tenant))
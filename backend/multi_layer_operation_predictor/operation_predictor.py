@@ -1,18 +1,66 @@
 from functools import lru_cache
 import json
+import logging
 from enum import Enum
 import os
 import re
-from fuzzywuzzy import fuzz
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.neighbors import KNeighborsClassifier
-import joblib
-from nltk.stem import WordNetLemmatizer
-import nltk
+import threading
+import time
+from rapidfuzz import fuzz, process
+from multi_layer_operation_predictor.operation_index import (
+    OperationIndexCache,
+    as_operation_index,
+    get_cache_key,
+    get_function_set_hash,
+    split_identifier,
+)
+from multi_layer_operation_predictor.model_registry import ModelRegistry
+from multi_layer_operation_predictor.similarity_search import CosineNeighbors
+from multi_layer_operation_predictor.function_store import FunctionStore
+from multi_layer_operation_predictor.tenants import get_tenant_path
+from multi_layer_operation_predictor.telemetry import (
+    PredictionResult,
+    StageTrace,
+    record_prediction,
+    record_prediction_error,
+)
 
-nltk.download('wordnet')
+# nltk, sklearn and joblib are imported where they are first used so that importing this
+# module stays cheap and never touches the network; see IMPORT_TIME_BUDGET.
+
+logger = logging.getLogger(__name__)
+
+# Memory the cached operation indexes of every language and tenant may take together
+INDEX_MEMORY_BUDGET = int(os.getenv("OPERATION_INDEX_MEMORY_BUDGET_MB") or 512) * 1024 * 1024
+# ML models of every language and tenant kept in memory at once
+MAX_RESIDENT_MODELS = int(os.getenv("MAX_RESIDENT_ML_MODELS") or 32)
+
+# Operation indexes and ML models shared by every request, keyed by language or by tenant and language.
+# A tenant's model is dropped along with its index and both are loaded from disk again when next used.
+_model_registry = ModelRegistry(max_models=MAX_RESIDENT_MODELS)
+_operation_indexes = OperationIndexCache(max_bytes=INDEX_MEMORY_BUDGET, on_evict=_model_registry.discard)
+
+FUZZY_SCORE_CUTOFF = 70
+# Minimum cosine similarity for the ML stage to accept a match, overridable through the environment
+ML_SIMILARITY_THRESHOLD = float(os.getenv("ML_SIMILARITY_THRESHOLD") or 0.5)
+# Upper bound on query x name scores held in memory at once by the batched fuzzy stage
+FUZZY_BATCH_CELLS = 4_000_000
+# How the ML stage tokenizes names: "word" splits on whitespace-like boundaries only,
+# "identifier" splits camelCase/snake_case and compares character n-grams
+ML_ANALYZER_MODE = os.getenv("ML_ANALYZER_MODE") or "identifier"
+ML_ANALYZER_SETTINGS = {
+    "word": {"analyzer": "word"},
+    "identifier": {"analyzer": "char_wb", "ngram_range": (2, 4), "sublinear_tf": True},
+}
+# Seconds a cold `import multi_layer_operation_predictor.operation_predictor` may take, checked by the unit tests
+IMPORT_TIME_BUDGET = 0.5
+# Bumped whenever the layout of the saved model artifacts changes
+MODEL_SCHEMA_VERSION = 1
+# Share of the function set that may change through incremental updates before the model is refit
+INCREMENTAL_UPDATE_RATIO = 0.1
 
 class MatchMethod(Enum):
+    ALIAS = "alias"
     FUZZY = "fuzzy"
     SUBSTRING = "substring"
     ML = "ml"
@@ -22,19 +70,20 @@ def get_absolute_path(relative_path):
     abs_path=os.path.dirname(os.path.abspath(__file__))
     return os.path.join(abs_path, relative_path)
 
-def get_model_path(language):
-    """Returns the path to the KNN model file based on language."""
-    return get_absolute_path(f'model/{language}_knn_model.h5')
+def get_model_path(language, tenant=None):
+    """Returns the path to the KNN model file based on language and tenant."""
+    return get_tenant_path(get_absolute_path('model'), tenant, f'{language}_knn_model.h5')
 
-def load_functions(language):
-    lang_dir = get_absolute_path(f"data/{language}")
-    file_path = os.path.join(lang_dir, 'functions.json')
-    
-    if os.path.exists(file_path):
-        with open(file_path, 'r') as file:
-            return json.load(file)
-    else:
-        raise FileNotFoundError(f"Function definitions for language '{language}' not found.")
+def get_function_store_path(language, tenant=None):
+    """Returns the path to the compact function store file based on language and tenant."""
+    return get_tenant_path(get_absolute_path('data'), tenant, f'{language}_functions.store')
+
+def get_functions_path(language, tenant=None):
+    """Returns the path to the function definitions file based on language, preferring the compact store."""
+    store_path = get_function_store_path(language, tenant)
+    if os.path.exists(store_path):
+        return store_path
+    return get_tenant_path(get_absolute_path('data'), tenant, f'{language}_functions.json')
 
 def clean_function_name(function_name, language):
     """
@@ -59,92 +108,452 @@ def clean_function_name(function_name, language):
         function_name = re.sub(pattern, "", function_name)
     return function_name.strip()
 
+def get_nltk_data_dirs():
+    """Returns the directories searched for the WordNet corpus, the bundled one last."""
+    directories = [os.getenv("NLTK_DATA_DIR"), get_absolute_path('nltk_data')]
+    return [directory for directory in directories if directory]
+
+def load_lemmatizer():
+    """
+    Loads the WordNet lemmatizer from a local corpus, never downloading it.
+
+    Returns:
+        The lemmatizer, or None when no corpus is available in which case words are kept as they are.
+    """
+    import nltk
+    from nltk.stem.wordnet import WordNetLemmatizer
+
+    for directory in reversed(get_nltk_data_dirs()):
+        if directory not in nltk.data.path:
+            nltk.data.path.insert(0, directory)
+    try:
+        nltk.data.find('corpora/wordnet')
+    except LookupError:
+        logger.warning(
+            "WordNet corpus not found in %s, lemmatization is disabled. Run `make nltk-data` to bundle it.",
+            nltk.data.path,
+        )
+        return None
+
+    lemmatizer = WordNetLemmatizer()
+    # The corpus is read lazily by nltk, load it now rather than on the first request
+    lemmatizer.lemmatize("warmup")
+    return lemmatizer
+
+_lemmatizer = None
+_lemmatizer_loaded = False
+_lemmatizer_lock = threading.Lock()
+
+def get_lemmatizer():
+    """Returns the shared lemmatizer, loading it the first time it is needed."""
+    global _lemmatizer, _lemmatizer_loaded
+    if not _lemmatizer_loaded:
+        with _lemmatizer_lock:
+            if not _lemmatizer_loaded:
+                _lemmatizer = load_lemmatizer()
+                _lemmatizer_loaded = True
+    return _lemmatizer
+
 @lru_cache(maxsize=1000)
 def preprocess_text(text):
     """Preprocesses the text by converting to lowercase and lemmatizing."""
-    lemmatizer = WordNetLemmatizer()
+    lemmatizer = get_lemmatizer()
     words = text.lower().split()
+    if lemmatizer is None:
+        return " ".join(words)
     lemmatized_words = [lemmatizer.lemmatize(word) for word in words]
     return " ".join(lemmatized_words)
 
-def load_functions(language):
-    """Loads functions from a JSON file based on the language."""
-    file_name = f'{language}_functions.json' 
-    file_path = get_absolute_path(f'data/{file_name}')
+def load_functions(language, tenant=None):
+    """Loads functions from the memory-mapped store or the JSON file based on the language."""
+    file_path = get_functions_path(language, tenant)
+    if tenant is not None and not os.path.exists(file_path):
+        # Nothing was extracted for this repository in this language
+        return {}
+    if file_path.endswith('.store'):
+        return FunctionStore(file_path)
     with open(file_path, 'r') as file:
         return json.load(file)
 
-def find_closest_operation_fuzzy(user_input, operations):
-    """Finds the closest operation name using fuzzy matching."""
-    best_match = None
-    best_score = 0
-    for operation_name in operations:
-        score = fuzz.ratio(user_input, operation_name)
-        if score > best_score:
-            best_score = score
-            best_match = operation_name
-    return best_match if best_score >= 70 else None, MatchMethod.FUZZY
-
-def find_closest_operation_substring(user_input, operations):
-    """Finds the closest operation name using substring matching."""
-    for operation_name in operations:
-        if user_input in operation_name:
-            return operation_name, MatchMethod.SUBSTRING
-    return None, MatchMethod.SUBSTRING
-
-def train_ml_model(operations, language):
-    """Trains a KNN model on operation names."""
+def get_aliases_path(language, tenant=None):
+    """Returns the path to the parse_functions output holding the input examples of each operation."""
+    return get_tenant_path(get_absolute_path('data'), tenant, f'{language}_operations_data.json')
+
+def load_aliases(language, tenant=None):
+    """
+    Loads the input examples generated by files_to_json.parse_functions as aliases.
+
+    Returns:
+        A dict of alias to operation name, empty when no examples were generated for the language.
+    """
+    aliases_path = get_aliases_path(language, tenant)
+    if not os.path.exists(aliases_path):
+        return {}
+    with open(aliases_path, 'r') as file:
+        function_details = json.load(file)
+
+    aliases = {}
+    for details in function_details:
+        operation_name = details.get("operation")
+        if not operation_name:
+            continue
+        for input_example in details.get("input_examples", []):
+            aliases.setdefault(input_example, operation_name)
+    return aliases
+
+def get_operation_index(language, tenant=None):
+    """Returns the in-memory operation index for a language, reloading it only when its files change."""
+    if tenant is None:
+        return _operation_indexes.get(
+            language,
+            get_functions_path(language),
+            load_functions,
+            alias_path=get_aliases_path(language),
+            alias_loader=load_aliases,
+        )
+    return _operation_indexes.get(
+        language,
+        get_functions_path(language, tenant),
+        lambda language: load_functions(language, tenant),
+        alias_path=get_aliases_path(language, tenant),
+        alias_loader=lambda language: load_aliases(language, tenant),
+        tenant=tenant,
+    )
+
+def find_operation_by_alias(user_input, operations, trace=None):
+    """Finds the operation the input is a known name variant or input example of."""
+    operation_name = as_operation_index(operations).find_alias(user_input)
+    if trace is not None:
+        trace.candidates = 1 if operation_name else 0
+        trace.score = 100 if operation_name else None
+    return operation_name, MatchMethod.ALIAS
+
+def find_closest_operation_fuzzy(user_input, operations, trace=None):
+    """Finds the closest operation name using fuzzy matching, scored in one batch over the name array."""
+    operations = as_operation_index(operations)
+    match = process.extractOne(
+        user_input, operations.names, scorer=fuzz.ratio, score_cutoff=FUZZY_SCORE_CUTOFF
+    )
+    if trace is not None:
+        trace.candidates = len(operations.names)
+        trace.score = match[1] if match else None
+    return match[0] if match else None, MatchMethod.FUZZY
+
+def find_closest_operations_fuzzy(user_inputs, operations):
+    """Batched find_closest_operation_fuzzy: scores every input against every name with one cdist per chunk."""
+    operations = as_operation_index(operations)
+    if not user_inputs or not operations.names:
+        return [None] * len(user_inputs)
+
+    matches = []
+    chunk_size = max(1, FUZZY_BATCH_CELLS // len(operations.names))
+    for start in range(0, len(user_inputs), chunk_size):
+        scores = process.cdist(
+            user_inputs[start:start + chunk_size],
+            operations.names,
+            scorer=fuzz.ratio,
+            score_cutoff=FUZZY_SCORE_CUTOFF,
+            workers=-1,
+        )
+        # argmax keeps the first of equally scored names, like extractOne
+        best = scores.argmax(axis=1)
+        for row, column in enumerate(best):
+            matches.append(operations.names[column] if scores[row, column] >= FUZZY_SCORE_CUTOFF else None)
+    return matches
+
+def find_closest_operation_substring(user_input, operations, trace=None):
+    """Finds the shortest operation name containing the input, using the trigram index."""
+    operation_name, compared = as_operation_index(operations).search_substring(user_input)
+    if trace is not None:
+        trace.candidates = compared
+        # How much of the matched name the input covers
+        trace.score = 100 * len(user_input) / len(operation_name) if operation_name else None
+    return operation_name, MatchMethod.SUBSTRING
+
+def get_vectorizer_params(mode=None):
+    """Returns the vectorizer parameters for an analyzer mode, saved with every model artifact."""
+    mode = mode or ML_ANALYZER_MODE
+    if mode not in ML_ANALYZER_SETTINGS:
+        raise ValueError(f"Unknown ML analyzer mode '{mode}'")
+    return {"mode": mode, **ML_ANALYZER_SETTINGS[mode]}
+
+def create_vectorizer(vectorizer_params):
+    """Creates the TF-IDF vectorizer described by vectorizer_params."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    settings = {key: value for key, value in vectorizer_params.items() if key != "mode"}
+    if vectorizer_params["mode"] == "identifier":
+        settings["preprocessor"] = split_identifier
+    return TfidfVectorizer(**settings)
+
+def save_ml_artifact(
+    language, knn_model, vectorizer, vectorizer_params, function_set_hash, incremental_changes=0, tenant=None
+):
+    """Saves the model together with the schema version and the hash of the names it was built from."""
+    import joblib
+
+    model_path = get_model_path(language, tenant)
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    joblib.dump(
+        {
+            "schema_version": MODEL_SCHEMA_VERSION,
+            "function_set_hash": function_set_hash,
+            "vectorizer_params": vectorizer_params,
+            "incremental_changes": incremental_changes,
+            "knn_model": knn_model,
+            "vectorizer": vectorizer,
+        },
+        model_path,
+    )
+
+def train_ml_model(operations, language, tenant=None):
+    """Fits the TF-IDF vectorizer and the cosine nearest-neighbour index on operation names."""
     operation_names = list(operations.keys())
-    vectorizer = TfidfVectorizer()
+    vectorizer_params = get_vectorizer_params()
+    vectorizer = create_vectorizer(vectorizer_params)
     X = vectorizer.fit_transform(operation_names)
-    knn_model = KNeighborsClassifier(n_neighbors=3)
+    knn_model = CosineNeighbors(n_neighbors=3)
     knn_model.fit(X, operation_names)
-    model_path = get_model_path(language)
-    joblib.dump((knn_model, vectorizer), model_path)
+    save_ml_artifact(
+        language, knn_model, vectorizer, vectorizer_params, get_function_set_hash(operation_names), tenant=tenant
+    )
     return knn_model, vectorizer
 
-def load_ml_model(language):
-    """Loads the trained KNN model and vectorizer."""
-    model_path = get_model_path(language)
-    if os.path.exists(model_path):
-        return joblib.load(model_path)
-    else:
-        return None, None
-
-def predict_operation_name_ml(user_input, knn_model, vectorizer):
-    """Predicts the operation name using the trained KNN model."""
-    input_vector = vectorizer.transform([user_input])
-    probabilities = knn_model.predict_proba(input_vector)[0]
-    max_prob = max(probabilities)
-    """If the maximum probability is less than 0.5, return an empty string."""
-    if max_prob < 0.5:
-        return "", MatchMethod.ML
-    return knn_model.predict(input_vector)[0], MatchMethod.ML
-
-def get_operation_definition(user_input, language):
-    operations = load_functions(language)
-    cleaned_input = clean_function_name(user_input,language)
+def update_ml_model(artifact, operations, language, tenant=None):
+    """
+    Brings a saved model up to date with a few added or removed functions without refitting.
+
+    The vectorizer keeps its vocabulary and weights, only the changed rows of the
+    similarity index are transformed. Once the accumulated changes exceed
+    INCREMENTAL_UPDATE_RATIO of the function set the model has to be refit instead.
+
+    Returns:
+        The updated (knn, vectorizer) pair, or None when a full refit is needed.
+    """
+    knn_model, vectorizer = artifact["knn_model"], artifact["vectorizer"]
+    fitted_names = set(knn_model.labels_)
+    added = [operation_name for operation_name in operations if operation_name not in fitted_names]
+    removed = fitted_names.difference(operations)
+    incremental_changes = artifact["incremental_changes"] + len(added) + len(removed)
+    if incremental_changes > len(operations) * INCREMENTAL_UPDATE_RATIO:
+        return None
+
+    X_added = vectorizer.transform(added) if added else None
+    knn_model = knn_model.updated(X_added, added, removed)
+    save_ml_artifact(
+        language,
+        knn_model,
+        vectorizer,
+        artifact["vectorizer_params"],
+        as_operation_index(operations).function_set_hash,
+        incremental_changes,
+        tenant,
+    )
+    return knn_model, vectorizer
+
+def load_ml_artifact(language, tenant=None):
+    """Loads the saved model artifact, or None when there is none or it uses another schema version."""
+    import joblib
+
+    model_path = get_model_path(language, tenant)
+    if not os.path.exists(model_path):
+        return None
+    artifact = joblib.load(model_path)
+    # Artifacts from other schema versions, including the older tuple format, are retrained
+    if not isinstance(artifact, dict) or artifact.get("schema_version") != MODEL_SCHEMA_VERSION:
+        return None
+    return artifact
+
+def build_ml_model(language, operations, resident, tenant=None):
+    """
+    Returns a model for the current function set, doing as little work as possible.
+
+    The resident model is kept when the names did not change, a saved artifact is
+    reused when its hash matches, a small change is applied incrementally and
+    anything else is refit from scratch.
+    """
+    operations = as_operation_index(operations)
+    function_set_hash = operations.function_set_hash
+    if resident is not None and get_function_set_hash(resident.knn_model.labels_) == function_set_hash:
+        return resident.knn_model, resident.vectorizer
+
+    artifact = load_ml_artifact(language, tenant)
+    if artifact is None or artifact["vectorizer_params"] != get_vectorizer_params():
+        return train_ml_model(operations, language, tenant)
+    if artifact["function_set_hash"] == function_set_hash:
+        return artifact["knn_model"], artifact["vectorizer"]
+    return update_ml_model(artifact, operations, language, tenant) or train_ml_model(operations, language, tenant)
+
+def get_ml_model(language, operations, tenant=None):
+    """Returns the resident KNN model and vectorizer; loading and training happen in the background."""
+    if tenant is None:
+        return _model_registry.get(language, operations, build_ml_model)
+    return _model_registry.get(
+        get_cache_key(language, tenant),
+        operations,
+        lambda _, operations, resident: build_ml_model(language, operations, resident, tenant),
+    )
+
+def warm_operation_predictor():
+    """Loads the lemmatizer and every language's ML model in the background so no request waits for them."""
+    threading.Thread(target=get_lemmatizer, name="lemmatizer-loader", daemon=True).start()
+    warm_ml_models()
+
+def warm_ml_models():
+    """Starts loading the ML model of every language that has function definitions on disk."""
+    languages = {
+        file_name.rsplit('_functions.', 1)[0]
+        for file_name in os.listdir(get_absolute_path('data'))
+        if file_name.endswith(('_functions.json', '_functions.store'))
+    }
+    for language in sorted(languages):
+        get_ml_model(language, get_operation_index(language))
+
+def search_operation_names_ml(user_inputs, knn_model, vectorizer, top_k=3):
+    """Returns the top_k (operation name, cosine similarity) candidates for each input, best first."""
+    input_vectors = vectorizer.transform(user_inputs)
+    return knn_model.search(input_vectors, top_k)
+
+def predict_operation_name_ml(user_input, knn_model, vectorizer, threshold=ML_SIMILARITY_THRESHOLD, trace=None):
+    """Predicts the operation name as the most similar name, if it is similar enough."""
+    candidates = search_operation_names_ml([user_input], knn_model, vectorizer, top_k=1)[0]
+    if trace is not None:
+        trace.candidates = len(knn_model.labels_)
+        trace.score = 100 * candidates[0][1] if candidates else None
+    if candidates and candidates[0][1] >= threshold:
+        return candidates[0][0], MatchMethod.ML
+    return "", MatchMethod.ML
+
+def predict_operation_names_ml(user_inputs, knn_model, vectorizer, threshold=ML_SIMILARITY_THRESHOLD):
+    """Batched predict_operation_name_ml: one transform and one similarity search for every input."""
+    predictions = []
+    for candidates in search_operation_names_ml(user_inputs, knn_model, vectorizer, top_k=1):
+        if candidates and candidates[0][1] >= threshold:
+            predictions.append(candidates[0][0])
+        else:
+            predictions.append("")
+    return predictions
+
+def run_stage(result, method, stage, *args):
+    """Runs one matching stage and appends its latency, candidate count and score to the result."""
+    trace = StageTrace(method.value)
+    started = time.perf_counter()
+    try:
+        closest_match, _ = stage(*args, trace=trace)
+    finally:
+        trace.latency = time.perf_counter() - started
+        result.stages.append(trace)
+    trace.operation_name = closest_match or None
+    return closest_match
+
+def resolve_prediction(result, operations, closest_match, trace):
+    """Fills in the result from the stage that resolved the query."""
+    result.definition = operations[closest_match]
+    result.operation_name = closest_match
+    result.method = trace.method
+    result.score = trace.score
+
+def get_operation_prediction(user_input, language, tenant=None):
+    """
+    Resolves user_input like get_operation_definition and reports how it got there.
+
+    With a tenant, the functions extracted from that user's repository are searched
+    instead of the shared ones.
+
+    A completed result is handed to every hook registered with telemetry.add_prediction_hook,
+    a query that raises, e.g. for a language without functions, is only counted as an error.
+
+    Returns:
+        A PredictionResult with the resolving stage, its score and a trace of every stage that ran.
+    """
+    result = PredictionResult(user_input, language)
+    started = time.perf_counter()
+    try:
+        run_prediction(result, tenant)
+    except Exception as e:
+        record_prediction_error(result, e)
+        raise
+    result.latency = time.perf_counter() - started
+    record_prediction(result)
+    return result
+
+def run_prediction(result, tenant=None):
+    """Runs the matching stages for result.user_input until one resolves it."""
+    operations = get_operation_index(result.language, tenant)
+    cleaned_input = clean_function_name(result.user_input, result.language)
     preprocessed_input = preprocess_text(cleaned_input)
 
-    # First, try exact match
-    closest_match, method = find_closest_operation_substring(preprocessed_input, operations)
-    if closest_match:
-        return operations[closest_match]
-        
-    # Next, try fuzzy matching
-    closest_match, method = find_closest_operation_fuzzy(preprocessed_input, operations)
-    if closest_match:
-        return operations[closest_match]
-    # Finally, try ML model
-    knn_model, vectorizer = load_ml_model(language)
+    # First, try a known alias, then substring match, then fuzzy matching.
+    # Aliases are looked up before lemmatization, which would turn "numbers" into "number".
+    for method, stage, query in (
+        (MatchMethod.ALIAS, find_operation_by_alias, cleaned_input),
+        (MatchMethod.SUBSTRING, find_closest_operation_substring, preprocessed_input),
+        (MatchMethod.FUZZY, find_closest_operation_fuzzy, preprocessed_input),
+    ):
+        closest_match = run_stage(result, method, stage, query, operations)
+        if closest_match:
+            resolve_prediction(result, operations, closest_match, result.stages[-1])
+            return
+
+    # Finally, try ML model, skipped until the background build has made one resident
+    knn_model, vectorizer = get_ml_model(result.language, operations, tenant)
     if not knn_model:
-        knn_model, vectorizer = train_ml_model(operations, language)
+        return
 
     try:
-        closest_match, method = predict_operation_name_ml(preprocessed_input, knn_model, vectorizer)
-        if closest_match:
-            return operations[closest_match]
+        closest_match = run_stage(
+            result, MatchMethod.ML, predict_operation_name_ml, preprocessed_input, knn_model, vectorizer
+        )
     except Exception as e:
-        return ""
-    
-    return ""
+        result.stages[-1].method = MatchMethod.ML_ERROR.value
+        return
+    if closest_match in operations:
+        resolve_prediction(result, operations, closest_match, result.stages[-1])
+
+def get_operation_definition(user_input, language, tenant=None):
+    return get_operation_prediction(user_input, language, tenant).definition
+
+def get_operation_definitions(user_inputs, language, tenant=None):
+    """
+    Resolves many inputs at once, e.g. every identifier visible in the editor.
+
+    Each stage runs once over all inputs it still has to resolve instead of once per input.
+
+    Args:
+        user_inputs: The inputs to resolve.
+        language: The programming language of the operations.
+        tenant: Key of the user's repository to search, the shared functions when None.
+    Returns:
+        The definition for each input in the same order, "" where nothing matched.
+    """
+    operations = get_operation_index(language, tenant)
+    cleaned_inputs = [clean_function_name(user_input, language) for user_input in user_inputs]
+    queries = [preprocess_text(cleaned_input) for cleaned_input in cleaned_inputs]
+    # Viewports repeat identifiers, resolve each distinct query once
+    matches = dict.fromkeys(queries)
+
+    for cleaned_input, query in zip(cleaned_inputs, queries):
+        if not matches[query]:
+            matches[query] = find_operation_by_alias(cleaned_input, operations)[0]
+    for query in matches:
+        if not matches[query]:
+            matches[query] = find_closest_operation_substring(query, operations)[0]
+
+    pending = [query for query, match in matches.items() if not match]
+    for query, match in zip(pending, find_closest_operations_fuzzy(pending, operations)):
+        matches[query] = match
+
+    pending = [query for query, match in matches.items() if not match]
+    if pending:
+        knn_model, vectorizer = get_ml_model(language, operations, tenant)
+        if knn_model:
+            try:
+                for query, match in zip(pending, predict_operation_names_ml(pending, knn_model, vectorizer)):
+                    matches[query] = match
+            except Exception as e:
+                logger.error(f"Batched {language} ML prediction failed: {str(e)}", exc_info=True)
+
+    return [
+        operations[matches[query]] if matches[query] in operations else ""
+        for query in queries
+    ]
@@ -0,0 +1,197 @@
+import logging
+import posixpath
+import re
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# Dependencies and build output, always skipped, EXTRACTION_EXCLUDE_GLOBS adds to them
+DEFAULT_EXCLUDE_GLOBS = (
+    "**/node_modules/**",
+    "**/bower_components/**",
+    "**/vendor/**",
+    "**/dist/**",
+    "**/build/**",
+    "**/target/**",
+    "**/coverage/**",
+    "**/__pycache__/**",
+    "**/venv/**",
+    "**/.venv/**",
+    "**/.git/**",
+)
+MINIFIED_GLOBS = ("*.min.js", "*-min.js", "*.bundle.js", "*.chunk.js")
+GENERATED_GLOBS = ("*_pb2.py", "*_pb2_grpc.py")
+# Markers generators put at the top of their output, searched in the first GENERATED_MARKER_LINES lines
+GENERATED_MARKERS = ("@generated", "DO NOT EDIT", "Code generated by")
+GENERATED_MARKER_LINES = 5
+# Files longer than MINIFIED_MIN_SIZE whose lines average more than this many characters are minified
+MINIFIED_LINE_LENGTH = 300
+MINIFIED_MIN_SIZE = 1000
+
+
+def glob_to_regex(pattern):
+    """
+    Translates a glob into a regular expression over "/" separated paths.
+
+    "*" and "?" stay within one path segment and "**" spans any number of them. Like
+    in .gitignore, a pattern without a "/" matches the file name in any directory.
+    """
+    anchored = "/" in pattern.rstrip("/")
+    pattern = pattern.lstrip("/")
+    parts = [] if anchored else ["(?:.*/)?"]
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2:]:
+            end = pattern.index("]", i + 2)
+            characters = pattern[i + 1:end]
+            if characters.startswith("!"):
+                characters = "^" + characters[1:]
+            parts.append(f"[{characters.replace(chr(92), chr(92) * 2)}]")
+            i = end + 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return re.compile("".join(parts))
+
+
+class GitignoreRule:
+    """One pattern line of a .gitignore file."""
+
+    def __init__(self, line):
+        self.negated = line.startswith("!")
+        pattern = line[1:] if self.negated else line
+        if pattern.startswith("\\"):
+            pattern = pattern[1:]
+        self.directory_only = pattern.endswith("/")
+        self.regex = glob_to_regex(pattern.rstrip("/"))
+
+    def matches(self, path, is_directory):
+        if self.directory_only and not is_directory:
+            return False
+        return self.regex.fullmatch(path) is not None
+
+
+def parse_gitignore(text):
+    """Returns the rules of a .gitignore file in the order they apply, later ones win."""
+    rules = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if line and not line.startswith("#"):
+            rules.append(GitignoreRule(line))
+    return rules
+
+
+class PathFilter:
+    """
+    Decides which repository files are worth downloading and parsing.
+
+    Paths are checked before anything is fetched: the default and configured exclude
+    globs, the repository's .gitignore files, the include globs, names of minified or
+    generated files and the file size. What was skipped is counted by reason.
+    """
+
+    def __init__(self, include_globs=(), exclude_globs=(), max_file_size=None):
+        """
+        Args:
+            include_globs: When given, only files matching one of them are extracted.
+            exclude_globs: Globs skipped on top of DEFAULT_EXCLUDE_GLOBS.
+            max_file_size: Files larger than this many bytes are skipped, no limit when None.
+        """
+        self.include = [glob_to_regex(glob) for glob in include_globs]
+        self.exclude = [glob_to_regex(glob) for glob in (*DEFAULT_EXCLUDE_GLOBS, *exclude_globs)]
+        self.minified = [glob_to_regex(glob) for glob in MINIFIED_GLOBS]
+        self.generated = [glob_to_regex(glob) for glob in GENERATED_GLOBS]
+        self.max_file_size = max_file_size
+        self.gitignores = {}
+        self._gitignore_order = []
+        self.skipped_files = Counter()
+        self.skipped_bytes = 0
+
+    def add_gitignore(self, path, text):
+        """Adds the rules of the .gitignore file at path, they apply to its directory."""
+        self.gitignores[posixpath.dirname(path)] = parse_gitignore(text)
+        # Parents first, so the rules of deeper files win
+        self._gitignore_order = sorted(self.gitignores, key=lambda directory: directory.count("/") + bool(directory))
+
+    def is_ignored(self, path, is_directory=False):
+        """
+        Applies the .gitignore files, the deeper ones after their parents. Like git, a
+        file can't be re-included once one of its directories is ignored.
+        """
+        if not self.gitignores:
+            return False
+        parts = path.split("/")
+        for depth in range(1, len(parts) + 1):
+            candidate_is_directory = is_directory or depth < len(parts)
+            if self._gitignore_matches("/".join(parts[:depth]), candidate_is_directory):
+                return True
+        return False
+
+    def _gitignore_matches(self, path, is_directory):
+        ignored = False
+        for directory in self._gitignore_order:
+            if directory and not path.startswith(directory + "/"):
+                continue
+            relative_path = path[len(directory) + 1:] if directory else path
+            for rule in self.gitignores[directory]:
+                if rule.matches(relative_path, is_directory):
+                    ignored = not rule.negated
+        return ignored
+
+    def allows_directory(self, path):
+        """Whether anything inside the directory could be extracted, used to prune walks."""
+        return not self.is_excluded(path + "/") and not self.is_ignored(path, True)
+
+    def is_excluded(self, path):
+        return any(regex.fullmatch(path) for regex in self.exclude)
+
+    def check(self, path, size=None):
+        """Returns why the file at path should be skipped, or None to extract it."""
+        if self.is_excluded(path):
+            return "excluded"
+        if self.is_ignored(path):
+            return "gitignore"
+        if self.include and not any(regex.fullmatch(path) for regex in self.include):
+            return "not_included"
+        if any(regex.fullmatch(path) for regex in self.minified):
+            return "minified"
+        if any(regex.fullmatch(path) for regex in self.generated):
+            return "generated"
+        if self.max_file_size is not None and size is not None and size > self.max_file_size:
+            return "too_large"
+        return None
+
+    def check_content(self, content):
+        """Returns why a downloaded file should not be parsed, or None to parse it."""
+        head = content.split("\n", GENERATED_MARKER_LINES)[:GENERATED_MARKER_LINES]
+        if any(marker in line for line in head for marker in GENERATED_MARKERS):
+            return "generated"
+        if len(content) > MINIFIED_MIN_SIZE and len(content) / (content.count("\n") + 1) > MINIFIED_LINE_LENGTH:
+            return "minified"
+        return None
+
+    def skip(self, path, reason, size=None):
+        """Counts a skipped file."""
+        logger.debug(f"Skipping {path}: {reason}")
+        self.skipped_files[reason] += 1
+        self.skipped_bytes += size or 0
+
+    def summary(self):
+        """Number of files and bytes skipped, and the files skipped for each reason."""
+        return {
+            "files": sum(self.skipped_files.values()),
+            "bytes": self.skipped_bytes,
+            "reasons": dict(self.skipped_files),
+        }
@@ -0,0 +1,99 @@
+import numpy as np
+
+# Upper bound on query x row similarities held densely in memory at once by kneighbors
+BATCH_CELLS = 4_000_000
+
+
+def normalize(X):
+    """L2-normalizes the rows of a sparse matrix, sklearn is only imported once a model is used."""
+    from sklearn.preprocessing import normalize as sklearn_normalize
+
+    return sklearn_normalize(X)
+
+
+class CosineNeighbors:
+    """
+    Top-k nearest-neighbour search over TF-IDF rows scored by cosine similarity.
+
+    Rows are L2-normalized once when fitting, so scoring a query is a single sparse
+    dot product against the whole matrix and the scores are true cosine similarities.
+    """
+
+    def __init__(self, n_neighbors=3):
+        self.n_neighbors = n_neighbors
+
+    def fit(self, X, labels):
+        self.matrix_ = normalize(X).tocsr()
+        self.labels_ = np.asarray(labels, dtype=object)
+        return self
+
+    def updated(self, X_added, labels_added, labels_removed):
+        """
+        Returns a copy with some rows removed and others appended, leaving this instance untouched.
+
+        Args:
+            X_added: Sparse matrix of the vectors to append, one row per added label.
+            labels_added: Labels of the appended rows.
+            labels_removed: Labels whose rows are dropped.
+        Returns:
+            The updated CosineNeighbors.
+        """
+        keep = ~np.isin(self.labels_, list(labels_removed))
+        update = CosineNeighbors(self.n_neighbors)
+        matrix = self.matrix_[keep]
+        labels = self.labels_[keep]
+        if len(labels_added):
+            from scipy.sparse import vstack
+
+            matrix = vstack([matrix, normalize(X_added)]).tocsr()
+            labels = np.concatenate([labels, np.asarray(labels_added, dtype=object)])
+        update.matrix_ = matrix
+        update.labels_ = labels
+        return update
+
+    def kneighbors(self, X, n_neighbors=None):
+        """
+        Finds the most similar rows for every query row.
+
+        Args:
+            X: Sparse matrix of query vectors, one row per query.
+            n_neighbors: Number of neighbours to return, defaults to the fitted value.
+        Returns:
+            A (similarities, indices) pair of arrays shaped (queries, k), best match first.
+        """
+        k = min(n_neighbors or self.n_neighbors, self.matrix_.shape[0])
+        if k == 0:
+            empty = np.empty((X.shape[0], 0))
+            return empty, empty.astype(int)
+
+        # Queries are scored in chunks so the dense similarities stay under BATCH_CELLS
+        queries = normalize(X).tocsr()
+        chunk_size = max(1, BATCH_CELLS // self.matrix_.shape[0])
+        chunks = [
+            self._top_k((queries[start:start + chunk_size] @ self.matrix_.T).toarray(), k)
+            for start in range(0, queries.shape[0], chunk_size)
+        ]
+        if not chunks:
+            return np.empty((0, k)), np.empty((0, k), dtype=int)
+        return np.vstack([chunk[0] for chunk in chunks]), np.vstack([chunk[1] for chunk in chunks])
+
+    @staticmethod
+    def _top_k(similarities, k):
+        """Returns the k best (similarities, indices) of every row, best first."""
+        # argpartition finds the top k in linear time, only those k get sorted
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        top_similarities = np.take_along_axis(similarities, top, axis=1)
+        # Equal similarities keep the order the rows were fitted in
+        order = np.lexsort((top, -top_similarities), axis=1)
+        return (
+            np.take_along_axis(top_similarities, order, axis=1),
+            np.take_along_axis(top, order, axis=1),
+        )
+
+    def search(self, X, n_neighbors=None):
+        """Returns the (label, similarity) candidates for every query row, best match first."""
+        similarities, indices = self.kneighbors(X, n_neighbors)
+        return [
+            [(self.labels_[index], float(similarity)) for similarity, index in zip(row_similarities, row_indices)]
+            for row_similarities, row_indices in zip(similarities, indices)
+        ]
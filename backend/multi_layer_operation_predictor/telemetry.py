@@ -0,0 +1,185 @@
+import bisect
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from multi_layer_operation_predictor.function_scanner import LANGUAGES
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+CANDIDATE_BUCKETS = (1, 10, 100, 1000, 10000, 100000)
+SCORE_BUCKETS = (10, 20, 30, 40, 50, 60, 70, 80, 90, 100)
+# Label of the languages a PredictorMetrics doesn't keep a series for
+OTHER_LANGUAGE = "other"
+
+
+def escape_label_value(value):
+    """Escapes a label value for the Prometheus text exposition format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+@dataclass
+class StageTrace:
+    """What one matching stage did for a query. Scores are on a 0-100 scale for every stage."""
+
+    method: str
+    latency: float = 0.0
+    candidates: int = 0
+    score: Optional[float] = None
+    operation_name: Optional[str] = None
+
+
+@dataclass
+class PredictionResult:
+    """Outcome of get_operation_definition along with how it was reached."""
+
+    user_input: str
+    language: str
+    definition: str = ""
+    operation_name: Optional[str] = None
+    method: Optional[str] = None
+    score: Optional[float] = None
+    latency: float = 0.0
+    stages: List[StageTrace] = field(default_factory=list)
+
+
+class Histogram:
+    """Cumulative histogram in the Prometheus sense, buckets are upper bounds."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.total}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class PredictorMetrics:
+    """Aggregates prediction results into counters and histograms that can be scraped."""
+
+    def __init__(self, languages: Optional[Iterable[str]] = None):
+        """
+        Args:
+            languages: Languages counted under their own label, the others are counted as
+                       OTHER_LANGUAGE so client input can't add series. Every language when None.
+        """
+        self.languages = frozenset(languages) if languages is not None else None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.resolutions: Dict[Tuple[str, str], int] = {}
+            self.errors: Dict[Tuple[str, str], int] = {}
+            self.stage_latency: Dict[str, Histogram] = {}
+            self.stage_candidates: Dict[str, Histogram] = {}
+            self.stage_scores: Dict[str, Histogram] = {}
+            self.request_latency = Histogram(LATENCY_BUCKETS)
+
+    def _language_label(self, language):
+        if self.languages is not None and language not in self.languages:
+            return OTHER_LANGUAGE
+        return language
+
+    def __call__(self, result: PredictionResult):
+        key = (self._language_label(result.language), result.method or "none")
+        with self._lock:
+            self.resolutions[key] = self.resolutions.get(key, 0) + 1
+            self.request_latency.observe(result.latency)
+            for stage in result.stages:
+                self.stage_latency.setdefault(stage.method, Histogram(LATENCY_BUCKETS)).observe(stage.latency)
+                self.stage_candidates.setdefault(stage.method, Histogram(CANDIDATE_BUCKETS)).observe(stage.candidates)
+                if stage.score is not None:
+                    self.stage_scores.setdefault(stage.method, Histogram(SCORE_BUCKETS)).observe(stage.score)
+
+    def record_error(self, result: PredictionResult, error: Exception):
+        """Counts a query that raised instead of resolving, by language and exception type."""
+        key = (self._language_label(result.language), type(error).__name__)
+        with self._lock:
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def render(self) -> str:
+        """Returns the metrics in the Prometheus text exposition format."""
+        with self._lock:
+            lines = [
+                "# HELP operation_predictor_resolutions_total Queries by language and the stage that resolved them.",
+                "# TYPE operation_predictor_resolutions_total counter",
+            ]
+            for (language, method), count in sorted(self.resolutions.items()):
+                lines.append(
+                    "operation_predictor_resolutions_total"
+                    f'{{language="{escape_label_value(language)}",method="{escape_label_value(method)}"}} {count}'
+                )
+
+            lines += [
+                "# HELP operation_predictor_errors_total Queries that raised instead of resolving, by language.",
+                "# TYPE operation_predictor_errors_total counter",
+            ]
+            for (language, error), count in sorted(self.errors.items()):
+                lines.append(
+                    "operation_predictor_errors_total"
+                    f'{{language="{escape_label_value(language)}",error="{escape_label_value(error)}"}} {count}'
+                )
+
+            lines += [
+                "# HELP operation_predictor_request_seconds Time spent in get_operation_definition.",
+                "# TYPE operation_predictor_request_seconds histogram",
+            ]
+            lines += self.request_latency.render("operation_predictor_request_seconds", 'stage="all"')
+
+            for name, help_text, histograms in (
+                ("operation_predictor_stage_seconds", "Time spent in each matching stage.", self.stage_latency),
+                ("operation_predictor_stage_candidates", "Operation names each stage compared.", self.stage_candidates),
+                ("operation_predictor_stage_score", "Best score (0-100) each stage found.", self.stage_scores),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for method, histogram in sorted(histograms.items()):
+                    lines += histogram.render(name, f'stage="{escape_label_value(method)}"')
+        return "\n".join(lines) + "\n"
+
+
+_hooks: List[Callable[[PredictionResult], None]] = []
+metrics = PredictorMetrics(languages=LANGUAGES)
+
+
+def add_prediction_hook(hook: Callable[[PredictionResult], None]):
+    """Registers a callable that receives every PredictionResult."""
+    _hooks.append(hook)
+
+
+def remove_prediction_hook(hook: Callable[[PredictionResult], None]):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def record_prediction(result: PredictionResult):
+    """Hands a result to every registered hook, a failing hook never fails the prediction."""
+    for hook in list(_hooks):
+        try:
+            hook(result)
+        except Exception as e:
+            logger.error(f"Prediction hook {hook!r} failed: {str(e)}")
+
+
+def record_prediction_error(result: PredictionResult, error: Exception):
+    """Counts a prediction that raised, the hooks only receive predictions that completed."""
+    metrics.record_error(result, error)
+
+
+add_prediction_hook(metrics)
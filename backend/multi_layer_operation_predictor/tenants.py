@@ -0,0 +1,39 @@
+import hashlib
+import os
+import re
+
+# Directory under data/ and model/ holding one subdirectory per tenant
+TENANTS_DIR = "tenants"
+
+
+def get_tenant_key(user, repo_url):
+    """
+    Returns the key the function indexes and models of a user's repository are stored under.
+
+    The user is hashed so email addresses don't end up in file names, and the key only
+    contains characters that are safe in a path.
+
+    Raises:
+        ValueError: When repo_url doesn't end in an owner and a repository name.
+    """
+    parts = repo_url.strip().rstrip("/").split("/") if isinstance(repo_url, str) else []
+    if len(parts) < 2 or not parts[-2] or not parts[-1]:
+        raise ValueError(f"Invalid repository URL: {repo_url}")
+    owner, repo = parts[-2:]
+    if repo.endswith(".git"):
+        repo = repo[:-len(".git")]
+    user_hash = hashlib.sha256(user.strip().lower().encode("utf-8")).hexdigest()[:16]
+    repo_name = re.sub(r"[^A-Za-z0-9._-]", "_", f"{owner}__{repo}".lower())
+    return f"{repo_name}__{user_hash}"
+
+
+def get_tenant_dir(base_dir, tenant):
+    """Returns the tenant's directory in base_dir, or base_dir itself without a tenant."""
+    if tenant is None:
+        return base_dir
+    return os.path.join(base_dir, TENANTS_DIR, tenant)
+
+
+def get_tenant_path(base_dir, tenant, file_name):
+    """Returns where file_name lives in base_dir for a tenant, or directly in base_dir without one."""
+    return os.path.join(get_tenant_dir(base_dir, tenant), file_name)
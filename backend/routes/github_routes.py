@@ -4,6 +4,8 @@ from db.sqlalchemy_orm import get_github_token
 from helpers.encryption_helper import encrypt_token, decrypt_token
 from helpers.request_helper import decode_code
 from multi_layer_operation_predictor.extract_functions_from_repo import FunctionExtractor
+from multi_layer_operation_predictor.extraction_jobs import ExtractionJobQueue
+from multi_layer_operation_predictor.tenants import get_tenant_key
 import os
 import logging
 
@@ -70,8 +72,38 @@ def get_github_token_route():
         logger.error(f"GitHub API request failed: {str(e)}", exc_info=True)
         return jsonify({"status": "FAILED"}), 500
 
+def run_extraction_job(job, progress_callback):
+    """Extract and save the functions of a queued job's repository, raising when it fails"""
+    if not job.user_id:
+        raise ValueError("The job was queued without a user, extract the repository again")
+    # The token is looked up when the job runs so a resumed job uses the current one
+    token_obj = get_github_token(job.email)
+    if not token_obj:
+        raise ValueError("No valid token found")
+
+    try:
+        access_token = decrypt_token(token_obj.access_token)
+    except Exception as e:
+        raise ValueError("Token decryption failed") from e
+
+    extractor = FunctionExtractor(
+        job.repo_url,
+        access_token,
+        progress_callback=progress_callback,
+        tenant=get_tenant_key(job.user_id, job.repo_url),
+    )
+
+    logger.info(f"Fetching repository: {job.repo_url}")
+    if not extractor.fetch_repository():
+        raise RuntimeError("Failed to fetch repository")
+    extractor.save_functions_to_json()
+    extractor.save_functions_to_store()
+    logger.info(f"Successfully extracted and saved functions of {job.repo_url}")
+
+extraction_jobs = ExtractionJobQueue(run_extraction_job)
+
 def extract_repo_functions():
-    """Handle repository function extraction"""
+    """Queue a repository function extraction, returning the job to poll"""
     data = request.get_json()
     repo_url = data.get("repo_url")
     email = data.get("email")
@@ -79,37 +111,37 @@ def extract_repo_functions():
     if not repo_url or not email:
         logger.warning("Missing required fields for repo extraction")
         return jsonify({"status": "FAILED"}), 400
-        
+
     try:
-        logger.info(f"Starting repository function extraction for {repo_url}")
-        # Get token from database
-        token_obj = get_github_token(email)
+        get_tenant_key(request.user["sub"], repo_url)
+    except ValueError as e:
+        return jsonify({"status": "FAILED", "message": str(e)}), 400
         
-        if not token_obj:
+    try:
+        # Check the token up front so a missing one fails the request instead of the job
+        if not get_github_token(email):
             logger.error(f"No valid token found for email: {email}")
             return jsonify({"status": "FAILED", "message": "No valid token found"}), 401
-            
-        # Decrypt the token
-        try:
-            access_token = decrypt_token(token_obj.access_token)
-            logger.info("Successfully decrypted GitHub token")
-        except Exception as e:
-            logger.error(f"Token decryption failed: {str(e)}")
-            return jsonify({"status": "FAILED", "message": "Token decryption failed"}), 401
-        
-        # Initialize function extractor
-        extractor = FunctionExtractor(repo_url, access_token)
-        
-        # Fetch and process repository
-        logger.info(f"Fetching repository: {repo_url}")
-        if extractor.fetch_repository():
-            saved_files = extractor.save_functions_to_json()
-            logger.info("Successfully extracted and saved repository functions")
-            return jsonify({"status": "SUCCESS"}), 200
+
+        job, created = extraction_jobs.submit(repo_url, email, request.user["sub"])
+        if created:
+            logger.info(f"Queued repository function extraction {job.job_id} for {repo_url}")
         else:
-            logger.error(f"Failed to fetch repository: {repo_url}")
-            return jsonify({"status": "FAILED", "message": "Failed to fetch repository"}), 400
+            logger.info(f"Extraction of {repo_url} already in progress as {job.job_id}")
+        return jsonify(job.to_response()), 202
             
     except Exception as e:
-        logger.error(f"Repository function extraction failed: {str(e)}", exc_info=True)
+        logger.error(f"Queueing repository function extraction failed: {str(e)}", exc_info=True)
         return jsonify({"status": "FAILED", "message": str(e)}), 500 
+
+def get_extraction_status():
+    """Return the status and progress of a repository function extraction job"""
+    job_id = request.args.get("job_id")
+    if not job_id:
+        return jsonify({"status": "FAILED", "message": "job_id is required"}), 400
+
+    job = extraction_jobs.get(job_id)
+    # Other users' jobs are reported as unknown
+    if job is None or job.user_id != request.user["sub"]:
+        return jsonify({"status": "FAILED", "message": "Unknown job"}), 404
+    return jsonify(job.to_response()), 200
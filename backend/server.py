@@ -1,13 +1,15 @@
-import ast
+import asyncio
 import logging
 import os
-import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from fastapi import FastAPI
-from pydantic import BaseModel
-from typing import Dict, List, Optional
-from rapidfuzz import fuzz
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional
 from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from multi_layer_operation_predictor.function_matcher import FunctionMatcher
+from multi_layer_operation_predictor.index_watcher import POLL_INTERVAL, IndexWatcher
+from multi_layer_operation_predictor.local_index import LocalFunctionIndex, extract_file_functions, get_default_index_path
 
 app = FastAPI()
 app.add_middleware(
@@ -23,103 +25,116 @@ logger = logging.getLogger(__name__)
 class FunctionRequest(BaseModel):
     function_name: str
     repo_paths: Optional[List[str]] = None
+    top_k: int = Field(1, ge=1, le=50)
+    min_score: float = Field(0, ge=0, le=100)
+    scorer: Literal["ratio", "WRatio", "token_set"] = "ratio"
 
 default_repo_paths = [
    "/home/pst/Syncup"
 ]
 
-def extract_python_functions(file_path: str, language: str) -> Dict[str, str]:
-    functions = {}
-    try:
-        with open(file_path, "r") as f:
-            source = f.read()
-        tree = ast.parse(source)
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                functions[node.name] = ast.get_source_segment(source, node)
-                logger.debug("Found %s function: %s", language, node.name)
-    except Exception as e:
-        logger.error("Error parsing %s file %s: %s", language, file_path, e)
-    return functions
-
-def extract_js_ts_functions(file_path: str, language: str) -> Dict[str, str]:
-    functions = {}
-    try:
-        with open(file_path, "r") as f:
-            source = f.read()
-        matches = re.finditer(
-            r"(export\s+(const|async\s+function|function)\s+|const\s+|let\s+)?(\w+)\s*=\s*(async\s*)?\(?[^\{]*?\)\s*=>\s*|\bfunction\s+(\w+)\s*\(.*?\)\s*{",
-            source,
-            re.DOTALL,
-        )
-        for match in matches:
-            function_name = match.group(3) or match.group(5)
-            function_code = match.group(0)
-            start = match.start(0)
-            open_brace_index = source.find('{', start)
-            if open_brace_index != -1:
-                brace_count = 1
-                end_index = open_brace_index + 1
-                while end_index < len(source) and brace_count > 0:
-                    if source[end_index] == '{':
-                        brace_count += 1
-                    elif source[end_index] == '}':
-                        brace_count -= 1
-                    end_index += 1
-                if brace_count == 0:
-                    function_code = source[match.start():end_index]
-                    if function_name:
-                        functions[function_name] = function_code
-                        logger.debug("Found %s function: %s", language, function_name)
-    except Exception as e:
-        logger.error("Error parsing %s file %s: %s", language, file_path, e)
-    return functions
-
 extractors = {
-    ".py": (extract_python_functions, "Python"),
-    ".js": (extract_js_ts_functions, "JavaScript"),
-    ".jsx": (extract_js_ts_functions, "JavaScript"),
-    ".ts": (extract_js_ts_functions, "TypeScript"),
-    ".tsx": (extract_js_ts_functions, "TypeScript"),
+    ".py": (extract_file_functions, "python"),
+    ".js": (extract_file_functions, "javascript"),
+    ".jsx": (extract_file_functions, "javascript"),
+    ".ts": (extract_file_functions, "typescript"),
+    ".tsx": (extract_file_functions, "typescript"),
 }
 
-def extract_functions_from_repo(repo_paths: List[str]) -> Dict[str, str]:
-    all_functions = {}
-    for repo_path in repo_paths:
-        for root, _, files in os.walk(repo_path):
-            for file in files:
-                file_extension = os.path.splitext(file)[1]
-                file_path = os.path.join(root, file)
-                extractor, language = extractors.get(file_extension, (None, None))
-                if extractor:
-                    functions = extractor(file_path, language)
-                    all_functions.update(functions)
-    return all_functions
-
-def find_best_matching_function(target_name, functions):
-    best_match = None
-    best_score = 0
-    for name, code in functions.items():
-        score = fuzz.ratio(target_name, name)
-        if score > best_score:
-            best_score = score
-            best_match = (name, code)
-    print(best_match)
-    return best_match
+# Repository walks and matching run on SCAN_WORKERS threads, at most MAX_CONCURRENT_SCANS walks at a time, and
+# the changed files are parsed by PARSE_WORKERS processes, so the event loop keeps serving other requests
+SCAN_WORKERS = int(os.getenv("FUNCTION_INDEX_SCAN_WORKERS", "4"))
+MAX_CONCURRENT_SCANS = int(os.getenv("FUNCTION_INDEX_MAX_CONCURRENT_SCANS", "2"))
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "0")) or os.cpu_count() or 1
+scan_executor = ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix="function-index")
+parse_executor = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+scan_slots = asyncio.Semaphore(MAX_CONCURRENT_SCANS)
+# Scans running per repository, requests for a repository already being scanned wait for that scan
+scans_in_flight: Dict[str, asyncio.Future] = {}
+
+# Persisted in SQLite, so a restart only re-parses the files that changed meanwhile
+function_index = LocalFunctionIndex(get_default_index_path(), extractors, parse_executor=parse_executor)
+
+# In watch mode the index follows file changes on background threads and lookups never walk the repositories
+index_watcher = IndexWatcher(
+    function_index, poll_interval=float(os.getenv("FUNCTION_INDEX_POLL_INTERVAL") or POLL_INTERVAL)
+) if os.getenv("FUNCTION_INDEX_WATCH", "").lower() in ("1", "true", "yes") else None
+
+@app.on_event("startup")
+def watch_default_repositories():
+    if index_watcher:
+        for repo_path in default_repo_paths:
+            if os.path.isdir(repo_path):
+                index_watcher.watch(repo_path)
+            else:
+                logger.warning("Not watching missing repository %s", repo_path)
+
+@app.on_event("shutdown")
+def stop_index_workers():
+    if index_watcher:
+        index_watcher.stop()
+    scan_executor.shutdown(wait=False, cancel_futures=True)
+    parse_executor.shutdown(wait=False, cancel_futures=True)
+
+def refresh_repository(repo_path: str):
+    if index_watcher is None:
+        function_index.refresh(repo_path)
+    elif os.path.isdir(repo_path):
+        # Only the first lookup of a repository indexes it, later changes arrive through the watcher
+        index_watcher.watch(repo_path)
+
+async def _scan_repository(repo_path: str):
+    async with scan_slots:
+        await asyncio.get_running_loop().run_in_executor(scan_executor, refresh_repository, repo_path)
+
+async def scan_repository(repo_path: str):
+    """Brings the index of a repository up to date off the event loop, sharing a scan already running."""
+    repo_path = os.path.realpath(repo_path)
+    if index_watcher and index_watcher.is_watching(repo_path):
+        return
+    scan = scans_in_flight.get(repo_path)
+    if scan is None:
+        scan = asyncio.ensure_future(_scan_repository(repo_path))
+        scans_in_flight[repo_path] = scan
+        scan.add_done_callback(lambda _: scans_in_flight.pop(repo_path, None))
+    # A request that goes away doesn't cancel the scan the other requests wait for
+    await asyncio.shield(scan)
+
+# The matcher of the last searched repositories, rebuilt only when the index changed since
+matcher_cache = {}
+
+def get_function_matcher(repo_paths: List[str]) -> FunctionMatcher:
+    """Returns the matcher over the indexed functions of the repositories, scan them first."""
+    # Read before the functions, so a change made meanwhile rebuilds the matcher on the next search
+    key = (tuple(repo_paths), function_index.version)
+    matcher = matcher_cache.get(key)
+    if matcher is None:
+        matcher = FunctionMatcher(function_index.get_functions(repo_paths, refresh=False))
+        matcher_cache.clear()
+        matcher_cache[key] = matcher
+    return matcher
+
+def find_matches(request: FunctionRequest, repo_paths: List[str]):
+    return get_function_matcher(repo_paths).match(
+        request.function_name, top_k=request.top_k, min_score=request.min_score, scorer=request.scorer
+    )
 
 @app.post("/find-function/")
 async def find_function(request: FunctionRequest):
     repo_paths = request.repo_paths or default_repo_paths 
     logger.info("Searching for function: %s in repos: %s", request.function_name, repo_paths)  
 
-    repo_functions = extract_functions_from_repo(repo_paths)
-    matched_function = find_best_matching_function(request.function_name, repo_functions)
+    await asyncio.gather(*(scan_repository(repo_path) for repo_path in repo_paths))
+    matches = await asyncio.get_running_loop().run_in_executor(scan_executor, find_matches, request, repo_paths)
 
-    if matched_function:
-        logger.info("Match found: %s", matched_function[0])  
+    if matches:
+        logger.info("Match found: %s", matches[0].name)  
         return {
-            "function_name": matched_function[0],
-            "code": matched_function[1],
+            "function_name": matches[0].name,
+            "code": matches[0].code,
+            "matches": [
+                {"function_name": match.name, "code": match.code, "score": match.score} for match in matches
+            ],
         }
     else:
         logger.warning("No matching function found for %s", request.function_name)  
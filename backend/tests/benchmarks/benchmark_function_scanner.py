@@ -0,0 +1,105 @@
+"""
+Times function extraction on realistic and pathological sources at growing sizes.
+
+    poetry run python tests/benchmarks/benchmark_function_scanner.py [--legacy]
+
+With --legacy the regular expressions the extractors used before the scanner are timed
+too, each case in a child process that is killed after --timeout seconds.
+"""
+import argparse
+import multiprocessing
+import re
+import sys
+import os
+import time
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from multi_layer_operation_predictor.function_scanner import extract_functions
+
+SIZES = (25_000, 50_000, 100_000, 200_000)
+
+CASES = {
+    "realistic": lambda n: (
+        "export function load(id) {\n  return fetch(`/items/${id}`).then(r => r.json());\n}\n"
+        "const sum = (a, b) => a + b;\n"
+        "class Store {\n  save(item) { if (item) { this.items.push({ ...item }); } }\n}\n"
+    ) * (n // 170),
+    "minified bundle": lambda n: "function a(b){return b+1}var c=function(d){return{e:d}};" * (n // 56),
+    "unclosed body": lambda n: "function f() {" + "x;" * (n // 2),
+    "deep nesting": lambda n: "function f() " + "{" * (n // 2) + "}" * (n // 2),
+    "open parentheses": lambda n: "f(" * (n // 2),
+    "long whitespace": lambda n: "public void" + " " * n + "f",
+    "unterminated strings": lambda n: "'a\n" * (n // 3),
+    "unterminated regex classes": lambda n: "(/[" * (n // 3),
+    "open type parameters": lambda n: "f<" * (n // 2),
+}
+
+LEGACY_PATTERNS = {
+    "javascript": [
+        r"function\s+(\w+)\s*\([^)]*\)\s*\{(?:[^{}]|\{(?:[^{}]|\{[^{}]*\})*\})*\}",
+        r"(?:const|let|var)\s+(\w+)\s*=\s*function\s*\([^)]*\)\s*\{(?:[^{}]|\{(?:[^{}]|\{[^{}]*\})*\})*\}",
+        r"(?:const|let|var)\s+(\w+)\s*=\s*\([^)]*\)\s*=>\s*\{(?:[^{}]|\{(?:[^{}]|\{[^{}]*\})*\})*\}",
+        r"(?:const|let|var)\s+(\w+)\s*=\s*\([^)]*\)\s*=>\s*(?:[^;{\n]+)",
+        r"(\w+)\s*=\s*\([^)]*\)\s*=>\s*\{(?:[^{}]|\{(?:[^{}]|\{[^{}]*\})*\})*\}",
+    ],
+    "java": [
+        r"((?:public|private|protected)?\s*(?:static)?\s*\w+\s+\w+\s*\([^)]*\)\s*\{(?:[^{}]|\{(?:[^{}]|\{[^{}]*\})*\})*\})",
+    ],
+    "php": [
+        r"(?:public|private|protected)?\s*function\s+(\w+)\s*\([^)]*\)\s*\{(?:[^{}]|\{(?:[^{}]|\{[^{}]*\})*\})*\}",
+    ],
+}
+
+
+def legacy_extract(source, language):
+    for pattern in LEGACY_PATTERNS[language]:
+        for _ in re.finditer(pattern, source):
+            pass
+
+
+def timed(function, source, language):
+    started = time.perf_counter()
+    function(source, language)
+    return time.perf_counter() - started
+
+
+def timed_with_timeout(function, source, language, timeout):
+    with multiprocessing.Pool(1) as pool:
+        result = pool.apply_async(timed, (function, source, language))
+        try:
+            return result.get(timeout)
+        except multiprocessing.TimeoutError:
+            return None
+
+
+def format_seconds(seconds):
+    return "timeout" if seconds is None else f"{seconds * 1000:.1f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--legacy", action="store_true", help="also time the previous regular expressions")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds allowed per legacy case")
+    args = parser.parse_args()
+
+    print(f"{'language':<12}{'case':<22}" + "".join(f"{size:>12,}" for size in SIZES) + f"{'ratio':>8}")
+    for language in ("javascript", "java", "php"):
+        for case, make in CASES.items():
+            sources = [make(size) for size in SIZES]
+            if language == "php":
+                sources = ["<?php " + source for source in sources]
+
+            times = [timed(extract_functions, source, language) for source in sources]
+            # Doubling the input should roughly double the time of a linear scan
+            ratio = times[-1] / max(times[-2], 1e-9)
+            print(f"{language:<12}{case:<22}" + "".join(f"{format_seconds(t):>12}" for t in times) + f"{ratio:>8.1f}")
+
+            if args.legacy:
+                legacy = [timed_with_timeout(legacy_extract, source, language, args.timeout) for source in sources]
+                print(f"{'':<12}{'  legacy regexes':<22}" + "".join(f"{format_seconds(t):>12}" for t in legacy))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import unittest
+from unittest.mock import patch
+import threading
+import sys
+import os
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+# The module refuses to import without a key, no request reaches Groq in these tests
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+try:
+    from groqclould.contextual_response import ContextualModels
+except ImportError:
+    # langchain and chromadb are only installed with the full application
+    ContextualModels = None
+
+MODELS = ("embedding model", "rag llm")
+
+
+@unittest.skipIf(ContextualModels is None, "langchain is not installed")
+@patch('groqclould.contextual_response.initialize_models', return_value=MODELS)
+class TestContextualModels(unittest.TestCase):
+
+    def test_models_load_on_first_get(self, initialize_models):
+        models = ContextualModels()
+        self.assertFalse(models.status()["resident"])
+        initialize_models.assert_not_called()
+
+        self.assertEqual(models.get(), MODELS)
+        self.assertEqual(models.get(), MODELS)
+        initialize_models.assert_called_once_with()
+
+        status = models.status()
+        self.assertTrue(status["resident"])
+        self.assertIsNotNone(status["load_seconds"])
+        self.assertIsNone(status["error"])
+
+    def test_concurrent_gets_load_once(self, initialize_models):
+        models = ContextualModels()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(models.get())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(results, [MODELS] * 8)
+        initialize_models.assert_called_once_with()
+
+    def test_failed_load_is_reported_and_retried(self, initialize_models):
+        initialize_models.side_effect = [RuntimeError("model download failed"), MODELS]
+        models = ContextualModels()
+
+        with self.assertRaises(RuntimeError):
+            models.get()
+        self.assertEqual(models.status()["error"], "model download failed")
+        self.assertFalse(models.status()["resident"])
+
+        self.assertEqual(models.get(), MODELS)
+        self.assertIsNone(models.status()["error"])
+
+    def test_warm_loads_in_background(self, initialize_models):
+        loaded = threading.Event()
+        release = threading.Event()
+
+        def initialize():
+            loaded.set()
+            release.wait(5)
+            return MODELS
+
+        initialize_models.side_effect = initialize
+        models = ContextualModels()
+        models.warm()
+
+        # warm() returns while the models are still loading
+        self.assertTrue(loaded.wait(5))
+        self.assertFalse(models.status()["resident"])
+        release.set()
+        self.assertEqual(models.get(), MODELS)
+        initialize_models.assert_called_once_with()
+
+    def test_failed_warm_does_not_raise(self, initialize_models):
+        failed = threading.Event()
+
+        def initialize():
+            failed.set()
+            raise RuntimeError("no network")
+
+        initialize_models.side_effect = initialize
+        models = ContextualModels()
+        models.warm()
+
+        self.assertTrue(failed.wait(5))
+        for _ in range(100):
+            if models.status()["error"]:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(models.status()["error"], "no network")
+
+
+if __name__ == '__main__':
+    unittest.main()
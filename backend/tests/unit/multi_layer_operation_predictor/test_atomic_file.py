@@ -0,0 +1,52 @@
+import unittest
+import tempfile
+import sys
+import os
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from multi_layer_operation_predictor.atomic_file import atomic_write
+
+
+class TestAtomicWrite(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, "functions.json")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_replaces_file(self):
+        with open(self.file_path, "w") as f:
+            f.write("old")
+        with atomic_write(self.file_path) as f:
+            f.write("näme")
+            # The destination keeps its previous content until the block finishes
+            with open(self.file_path) as current:
+                self.assertEqual(current.read(), "old")
+        with open(self.file_path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "näme")
+        self.assertEqual(os.listdir(self.temp_dir.name), ["functions.json"])
+
+    def test_binary(self):
+        with atomic_write(self.file_path, "wb") as f:
+            f.write(b"\x00\x01")
+        with open(self.file_path, "rb") as f:
+            self.assertEqual(f.read(), b"\x00\x01")
+
+    def test_failure_keeps_previous_file(self):
+        with open(self.file_path, "w") as f:
+            f.write("old")
+        with self.assertRaises(ValueError):
+            with atomic_write(self.file_path) as f:
+                f.write("partial")
+                raise ValueError("Serialization failed")
+        with open(self.file_path) as f:
+            self.assertEqual(f.read(), "old")
+        self.assertEqual(os.listdir(self.temp_dir.name), ["functions.json"])
+
+
+if __name__ == '__main__':
+    unittest.main()
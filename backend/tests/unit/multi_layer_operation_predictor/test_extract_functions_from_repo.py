@@ -0,0 +1,376 @@
+import unittest
+from unittest.mock import patch
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+import base64
+import hashlib
+import io
+import json
+import tarfile
+import tempfile
+import threading
+import sys
+import os
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from multi_layer_operation_predictor.extract_functions_from_repo import FunctionExtractor, get_parser_pool, parse_file
+
+MOCKED_FILES = {
+    "math_utils.py": "def add_numbers(a, b):\n    return a + b\n",
+    "src/strings.py": "def reverse_string(s):\n    return s[::-1]\n",
+    "src/web/app.js": "function greet(name) {\n    return 'Hello ' + name;\n}",
+    "README.md": "# Fake repository",
+    "broken.py": "def never_served():\n    pass\n",
+}
+
+
+PRUNED_FILES = {
+    ".gitignore": "# build output\ngenerated/\n*.local.py\n!keep.local.py\n",
+    "node_modules/lib/index.js": "function vendored() { return 1; }",
+    "docs/example.py": "def documented():\n    pass\n",
+    "generated/models.py": "def generated_model():\n    pass\n",
+    "settings.local.py": "def local_setting():\n    pass\n",
+    "static/app.min.js": "function a(){return 1}",
+    "src/messages_pb2.py": "def message():\n    pass\n",
+    "src/huge.py": "def huge():\n" + "    x = 1\n" * 300,
+    "src/long_lines.js": "var data = [" + "1," * 800 + "];\nfunction bundled() { return data; }",
+}
+
+
+def build_tarball(files):
+    """Gzipped tarball laid out like the ones GitHub serves"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        directory = tarfile.TarInfo("owner-repo-abc123/src")
+        directory.type = tarfile.DIRTYPE
+        archive.addfile(directory)
+        for path, content in files.items():
+            data = content.encode("utf-8")
+            member = tarfile.TarInfo(f"owner-repo-abc123/{path}")
+            member.size = len(data)
+            archive.addfile(member, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def as_bytes(content):
+    return content if isinstance(content, bytes) else content.encode("utf-8")
+
+
+def blob_sha(content):
+    return hashlib.sha1(as_bytes(content)).hexdigest()
+
+
+class FakeGitHub(BaseHTTPRequestHandler):
+    """Serves the repository, recursive tree, blob and tarball endpoints for MOCKED_FILES"""
+
+    files = MOCKED_FILES
+    truncated = False
+    missing = {"broken.py"}
+    received = []
+    not_modified = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        type(self).received.append((url.path, url.query, self.headers.get("Authorization")))
+        if url.path == "/repos/owner/repo":
+            return self.send_json({"default_branch": "main"})
+        if url.path == "/repos/owner/repo/git/trees/main" and url.query == "recursive=1":
+            tree = [{"path": "src", "type": "tree", "sha": "tree-src"}]
+            tree += [
+                {"path": path, "type": "blob", "sha": blob_sha(content), "size": len(as_bytes(content))}
+                for path, content in self.files.items()
+            ]
+            return self.send_json({"tree": tree, "truncated": self.truncated})
+        if url.path == "/repos/owner/repo/tarball":
+            body = build_tarball(self.files)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            return self.wfile.write(body)
+        prefix = "/repos/owner/repo/git/blobs/"
+        if url.path.startswith(prefix):
+            for path, content in self.files.items():
+                if blob_sha(content) == url.path[len(prefix):] and path not in self.missing:
+                    encoded = base64.b64encode(as_bytes(content)).decode("ascii")
+                    return self.send_json({"content": encoded, "encoding": "base64"})
+        self.send_json({"message": "Not Found"}, status=404)
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode("utf-8")
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            type(self).not_modified.append(urlparse(self.path).path)
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeGitHubTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGitHub)
+        cls.api_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+
+class TestTreeIngestion(FakeGitHubTestCase):
+
+    def setUp(self):
+        FakeGitHub.received = []
+        FakeGitHub.truncated = False
+        FakeGitHub.files = dict(MOCKED_FILES)
+        FakeGitHub.missing = {"broken.py"}
+        FakeGitHub.not_modified = []
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.extractor = self.create_extractor()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def create_extractor(self):
+        return FunctionExtractor(
+            "https://github.com/owner/repo", "secret", api_url=self.api_url, max_workers=4,
+            manifest_dir=self.temp_dir.name,
+        )
+
+    def blob_requests(self):
+        return [path for path, _, _ in FakeGitHub.received if "/git/blobs/" in path]
+
+    def test_fetches_supported_blobs_from_tree(self):
+        self.assertTrue(self.extractor.fetch_repository())
+
+        self.assertEqual(self.extractor.functions_by_language["python"], {
+            "add_numbers": MOCKED_FILES["math_utils.py"].strip(),
+            "reverse_string": MOCKED_FILES["src/strings.py"].strip(),
+        })
+        self.assertEqual(list(self.extractor.functions_by_language["javascript"]), ["greet"])
+
+        paths = [path for path, _, _ in FakeGitHub.received]
+        self.assertEqual(paths.count("/repos/owner/repo/git/trees/main"), 1)
+        # Unsupported extensions are never downloaded
+        self.assertNotIn(f"/repos/owner/repo/git/blobs/{blob_sha(MOCKED_FILES['README.md'])}", paths)
+        self.assertEqual(len([path for path in paths if "/git/blobs/" in path]), 4)
+        self.assertTrue(all(auth == "token secret" for _, _, auth in FakeGitHub.received))
+
+    def test_parses_in_worker_processes(self):
+        extractor = FunctionExtractor(
+            "https://github.com/owner/repo", api_url=self.api_url, manifest_dir=self.temp_dir.name, parse_workers=2
+        )
+        with patch.object(FunctionExtractor, "PROCESS_POOL_MIN_FILES", 0):
+            self.assertTrue(extractor.fetch_repository())
+
+        self.assertEqual(extractor.functions_by_language["python"], {
+            "add_numbers": MOCKED_FILES["math_utils.py"].strip(),
+            "reverse_string": MOCKED_FILES["src/strings.py"].strip(),
+        })
+        self.assertEqual(list(extractor.functions_by_language["javascript"]), ["greet"])
+
+    def test_extractions_share_one_parser_pool(self):
+        pool = get_parser_pool(2)
+        self.assertIs(get_parser_pool(2), pool)
+        # Workers are started by the fork server, not forked from this threaded process
+        self.assertNotEqual(pool.submit(os.getppid).result(timeout=30), os.getpid())
+
+        extractors = [
+            FunctionExtractor("https://github.com/owner/repo", api_url=self.api_url, parse_workers=2,
+                              manifest_dir=os.path.join(self.temp_dir.name, str(i)))
+            for i in range(2)
+        ]
+        with patch.object(FunctionExtractor, "PROCESS_POOL_MIN_FILES", 0), \
+                patch("multi_layer_operation_predictor.extract_functions_from_repo.ProcessPoolExecutor") as create:
+            threads = [threading.Thread(target=extractor.fetch_repository) for extractor in extractors]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(30)
+        create.assert_not_called()
+        for extractor in extractors:
+            self.assertEqual(list(extractor.functions_by_language["javascript"]), ["greet"])
+
+    def test_reports_progress(self):
+        reported = []
+        extractor = FunctionExtractor(
+            "https://github.com/owner/repo", api_url=self.api_url, manifest_dir=self.temp_dir.name,
+            progress_callback=reported.append,
+        )
+        self.assertTrue(extractor.fetch_repository())
+
+        # broken.py is counted but can't be fetched
+        self.assertEqual(reported[-1], {
+            "files_total": 4, "files_unchanged": 0, "files_fetched": 3, "files_parsed": 3, "functions_found": 3,
+            "files_skipped": 0, "bytes_skipped": 0,
+        })
+        self.assertEqual(reported[-1], extractor.progress)
+        self.assertGreater(len(reported), 2)
+
+    def test_pruned_files_are_never_fetched(self):
+        FakeGitHub.files.update(PRUNED_FILES)
+        reported = []
+        extractor = FunctionExtractor(
+            "https://github.com/owner/repo", api_url=self.api_url, manifest_dir=self.temp_dir.name,
+            exclude_globs=["docs/**"], max_file_size=2000, progress_callback=reported.append,
+        )
+        self.assertTrue(extractor.fetch_repository())
+
+        self.assertEqual(set(extractor.functions_by_language["python"]), {"add_numbers", "reverse_string"})
+        self.assertEqual(list(extractor.functions_by_language["javascript"]), ["greet"])
+        fetched = {blob for blob in self.blob_requests()}
+        for path in PRUNED_FILES:
+            if path not in (".gitignore", "src/long_lines.js"):
+                self.assertNotIn(f"/repos/owner/repo/git/blobs/{blob_sha(PRUNED_FILES[path])}", fetched, path)
+
+        self.assertEqual(extractor.path_filter.summary()["reasons"], {
+            "excluded": 2, "gitignore": 2, "minified": 2, "generated": 1, "too_large": 1,
+        })
+        self.assertEqual(reported[-1]["files_skipped"], 8)
+        self.assertEqual(reported[-1]["bytes_skipped"], sum(
+            len(content) for path, content in PRUNED_FILES.items() if path != ".gitignore"
+        ))
+
+        # Files skipped for their content are remembered and not downloaded again
+        FakeGitHub.received = []
+        FakeGitHub.not_modified = []
+        extractor = FunctionExtractor(
+            "https://github.com/owner/repo", api_url=self.api_url, manifest_dir=self.temp_dir.name,
+            exclude_globs=["docs/**"], max_file_size=2000,
+        )
+        self.assertTrue(extractor.fetch_repository())
+        self.assertEqual(self.blob_requests(), [f"/repos/owner/repo/git/blobs/{blob_sha(MOCKED_FILES['broken.py'])}"])
+
+    def test_undecodable_files_are_recorded(self):
+        FakeGitHub.missing = set()
+        FakeGitHub.files["latin1.py"] = "def café():\n    pass\n".encode("latin-1")
+        self.assertTrue(self.extractor.fetch_repository())
+        self.assertEqual(self.extractor.path_filter.summary()["reasons"], {"not_utf8": 1})
+        self.assertEqual(
+            set(self.extractor.functions_by_language["python"]), {"add_numbers", "reverse_string", "never_served"}
+        )
+
+        # Recorded without functions, so the tree stays cached and nothing is fetched again
+        FakeGitHub.received = []
+        FakeGitHub.not_modified = []
+        extractor = self.create_extractor()
+        self.assertTrue(extractor.fetch_repository())
+        self.assertEqual(self.blob_requests(), [])
+        self.assertEqual(FakeGitHub.not_modified, ["/repos/owner/repo", "/repos/owner/repo/git/trees/main"])
+
+    def test_parse_file(self):
+        self.assertEqual(parse_file("a/b.py", MOCKED_FILES["math_utils.py"]), {
+            "add_numbers": MOCKED_FILES["math_utils.py"].strip(),
+        })
+        self.assertEqual(parse_file("a/b.py", "def broken(:"), {})
+
+    def test_truncated_tree_falls_back_to_contents_walk(self):
+        FakeGitHub.truncated = True
+        with patch.object(FunctionExtractor, "fetch_repository_contents", return_value=True) as walk:
+            self.assertTrue(self.extractor.fetch_repository())
+        walk.assert_called_once_with()
+        self.assertFalse(any("/git/blobs/" in path for path, _, _ in FakeGitHub.received))
+
+    def test_unknown_repository_fails(self):
+        extractor = FunctionExtractor(
+            "https://github.com/owner/missing", api_url=self.api_url, manifest_dir=self.temp_dir.name
+        )
+        self.assertFalse(extractor.fetch_repository())
+
+    def test_unchanged_repository_fetches_nothing(self):
+        FakeGitHub.missing = set()
+        self.assertTrue(self.extractor.fetch_repository())
+        first = self.extractor.functions_by_language
+
+        FakeGitHub.received = []
+        extractor = self.create_extractor()
+        self.assertTrue(extractor.fetch_repository())
+
+        self.assertEqual(extractor.functions_by_language, first)
+        self.assertEqual(self.blob_requests(), [])
+        self.assertEqual(FakeGitHub.not_modified, ["/repos/owner/repo", "/repos/owner/repo/git/trees/main"])
+
+    def test_only_changed_blobs_are_fetched(self):
+        self.assertTrue(self.extractor.fetch_repository())
+
+        FakeGitHub.received = []
+        FakeGitHub.files["src/strings.py"] = "def upper_string(s):\n    return s.upper()\n"
+        del FakeGitHub.files["math_utils.py"]
+        extractor = self.create_extractor()
+        self.assertTrue(extractor.fetch_repository())
+
+        self.assertEqual(set(extractor.functions_by_language["python"]), {"upper_string"})
+        self.assertEqual(list(extractor.functions_by_language["javascript"]), ["greet"])
+        # The changed file, and broken.py which could not be fetched the first time
+        self.assertEqual(sorted(self.blob_requests()), sorted([
+            f"/repos/owner/repo/git/blobs/{blob_sha(FakeGitHub.files['src/strings.py'])}",
+            f"/repos/owner/repo/git/blobs/{blob_sha(MOCKED_FILES['broken.py'])}",
+        ]))
+
+
+class TestArchiveIngestion(FakeGitHubTestCase):
+
+    def setUp(self):
+        FakeGitHub.received = []
+        self.extractor = FunctionExtractor(
+            "https://github.com/owner/repo", "secret", api_url=self.api_url, ingestion_mode="archive"
+        )
+        self.expected_python = {
+            "add_numbers": MOCKED_FILES["math_utils.py"].strip(),
+            "reverse_string": MOCKED_FILES["src/strings.py"].strip(),
+            "never_served": MOCKED_FILES["broken.py"].strip(),
+        }
+
+    def test_streams_tarball_over_http(self):
+        self.assertTrue(self.extractor.fetch_repository())
+
+        self.assertEqual(self.extractor.functions_by_language["python"], self.expected_python)
+        self.assertEqual(list(self.extractor.functions_by_language["javascript"]), ["greet"])
+        # One request for the whole repository
+        self.assertEqual([path for path, _, _ in FakeGitHub.received], ["/repos/owner/repo/tarball"])
+
+    def test_reads_local_archive(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            archive_path = os.path.join(temp_dir, "repo.tar.gz")
+            with open(archive_path, "wb") as f:
+                f.write(build_tarball(MOCKED_FILES))
+            self.assertTrue(self.extractor.fetch_repository_archive(archive_path))
+        self.assertEqual(self.extractor.functions_by_language["python"], self.expected_python)
+        self.assertEqual(FakeGitHub.received, [])
+
+    def test_skips_pruned_members(self):
+        extractor = FunctionExtractor(
+            "https://github.com/owner/repo", ingestion_mode="archive", exclude_globs=["docs/**"], max_file_size=2000,
+        )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            archive_path = os.path.join(temp_dir, "repo.tar.gz")
+            with open(archive_path, "wb") as f:
+                f.write(build_tarball({**PRUNED_FILES, **MOCKED_FILES}))
+            self.assertTrue(extractor.fetch_repository_archive(archive_path))
+
+        self.assertEqual(extractor.functions_by_language["python"], self.expected_python)
+        self.assertEqual(list(extractor.functions_by_language["javascript"]), ["greet"])
+        self.assertEqual(extractor.progress["files_skipped"], 8)
+
+    def test_unknown_repository_fails(self):
+        extractor = FunctionExtractor("https://github.com/owner/missing", api_url=self.api_url, ingestion_mode="archive")
+        self.assertFalse(extractor.fetch_repository())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import unittest
+import json
+import tempfile
+import threading
+import sys
+import os
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from multi_layer_operation_predictor.extraction_jobs import ExtractionJobQueue, FAILED, QUEUED, RUNNING, SUCCESS
+
+REPO_URL = "https://github.com/owner/repo"
+
+
+class BlockingRunner:
+    """Runner that reports progress and then waits until released"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.jobs = []
+
+    def __call__(self, job, progress_callback):
+        self.jobs.append(job.job_id)
+        progress_callback({"files_total": 2, "files_parsed": 1})
+        self.started.set()
+        self.release.wait(5)
+        if self.error:
+            raise self.error
+
+
+class TestExtractionJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.state_path = os.path.join(self.temp_dir.name, "jobs.json")
+        self.queues = []
+
+    def tearDown(self):
+        for queue in self.queues:
+            queue.stop(wait=True)
+        self.temp_dir.cleanup()
+
+    def create_queue(self, runner):
+        queue = ExtractionJobQueue(runner, state_path=self.state_path, max_workers=1)
+        self.queues.append(queue)
+        return queue
+
+    def wait_for(self, queue, job_id, status):
+        for _ in range(500):
+            if queue.get(job_id).status == status:
+                return
+            threading.Event().wait(0.01)
+        self.fail(f"Job {job_id} never reached {status}")
+
+    def test_runs_job_and_reports_progress(self):
+        runner = BlockingRunner()
+        queue = self.create_queue(runner)
+        job, created = queue.submit(REPO_URL, "user@example.com", "user_1")
+        self.assertTrue(created)
+
+        self.assertTrue(runner.started.wait(5))
+        self.assertEqual(queue.get(job.job_id).status, RUNNING)
+        self.assertEqual(queue.get(job.job_id).progress, {"files_total": 2, "files_parsed": 1})
+
+        runner.release.set()
+        self.wait_for(queue, job.job_id, SUCCESS)
+        self.assertNotIn("email", job.to_response())
+        self.assertNotIn("user_id", job.to_response())
+        self.assertIsNone(queue.get("unknown"))
+
+    def test_same_repository_is_deduplicated(self):
+        runner = BlockingRunner()
+        queue = self.create_queue(runner)
+        job, _ = queue.submit(REPO_URL, "user@example.com", "user_1")
+        duplicate, created = queue.submit(REPO_URL.upper() + "/", "User@example.com", "user_1")
+        self.assertFalse(created)
+        self.assertEqual(duplicate.job_id, job.job_id)
+
+        # Another repository waits for the single worker
+        other, created = queue.submit("https://github.com/owner/other", "user@example.com", "user_1")
+        self.assertTrue(created)
+        self.assertEqual(other.status, QUEUED)
+
+        # Functions are saved per user, so another user's extraction is a job of its own
+        other_user, created = queue.submit(REPO_URL, "other@example.com", "user_2")
+        self.assertTrue(created)
+
+        runner.release.set()
+        self.wait_for(queue, other_user.job_id, SUCCESS)
+        self.assertEqual(runner.jobs, [job.job_id, other.job_id, other_user.job_id])
+
+        # Once finished, the repository can be extracted again
+        again, created = queue.submit(REPO_URL, "user@example.com", "user_1")
+        self.assertTrue(created)
+        self.assertNotEqual(again.job_id, job.job_id)
+
+    def test_failure_is_recorded(self):
+        runner = BlockingRunner(error=RuntimeError("Failed to fetch repository"))
+        runner.release.set()
+        queue = self.create_queue(runner)
+        job, _ = queue.submit(REPO_URL, "user@example.com", "user_1")
+
+        self.wait_for(queue, job.job_id, FAILED)
+        self.assertEqual(queue.get(job.job_id).message, "Failed to fetch repository")
+
+    def test_unfinished_jobs_are_resumed(self):
+        runner = BlockingRunner()
+        queue = self.create_queue(runner)
+        job, _ = queue.submit(REPO_URL, "user@example.com", "user_1")
+        self.assertTrue(runner.started.wait(5))
+
+        with open(self.state_path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        self.assertEqual([(saved_job["job_id"], saved_job["status"]) for saved_job in saved], [(job.job_id, RUNNING)])
+
+        # A queue still running keeps its jobs
+        other = self.create_queue(BlockingRunner())
+        other.resume()
+        self.assertEqual(other.get(job.job_id).owner, queue.owner)
+
+        # Once the process stopped, a new one claims the job and runs it again
+        queue.stop()
+        resumed_runner = BlockingRunner()
+        resumed_runner.release.set()
+        resumed = self.create_queue(resumed_runner)
+        resumed.resume()
+        self.wait_for(resumed, job.job_id, SUCCESS)
+        self.assertEqual(resumed_runner.jobs, [job.job_id])
+        self.assertEqual(resumed.get(job.job_id).repo_url, REPO_URL)
+
+        # The stopped queue's late result doesn't overwrite the new owner's
+        runner.release.set()
+        queue.stop(wait=True)
+        self.assertEqual(resumed.get(job.job_id).owner, resumed.owner)
+
+    def test_processes_share_jobs(self):
+        runner = BlockingRunner()
+        first = self.create_queue(runner)
+        second = self.create_queue(BlockingRunner())
+        job, _ = first.submit(REPO_URL, "user@example.com", "user_1")
+        self.assertTrue(runner.started.wait(5))
+
+        # The other process finds the job and doesn't start a second one
+        duplicate, created = second.submit(REPO_URL, "user@example.com", "user_1")
+        self.assertFalse(created)
+        self.assertEqual(duplicate.job_id, job.job_id)
+        self.assertEqual(second.get(job.job_id).status, RUNNING)
+
+        runner.release.set()
+        self.wait_for(second, job.job_id, SUCCESS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from multi_layer_operation_predictor import function_matcher
+from multi_layer_operation_predictor.function_matcher import FunctionMatcher
+
+FUNCTIONS = {
+    "get_user": "def get_user(): pass",
+    "getUser": "function getUser() {}",
+    "get_user_by_id": "def get_user_by_id(user_id): pass",
+    "get_users": "def get_users(): pass",
+    "delete_user": "def delete_user(user_id): pass",
+    "render_page": "def render_page(): pass",
+}
+
+
+class TestFunctionMatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.matcher = FunctionMatcher(FUNCTIONS)
+
+    def test_exact_match_first(self):
+        matches = self.matcher.match("getUser", top_k=2)
+        self.assertEqual([match.name for match in matches], ["getUser", "get_user"])
+        self.assertEqual(matches[0].code, "function getUser() {}")
+        self.assertEqual(matches[0].score, 100)
+        # Case and separators are normalized away
+        self.assertEqual(self.matcher.match("Render-Page")[0].name, "render_page")
+
+    def test_top_k_ranks_prefix_then_fuzzy_matches(self):
+        matches = self.matcher.match("get_user", top_k=5)
+        self.assertEqual([match.name for match in matches], [
+            "get_user", "get_users", "get_user_by_id", "getUser", "delete_user",
+        ])
+        self.assertEqual(matches[0].score, 100)
+        # Fuzzy matches come after the prefix matches, best first
+        self.assertGreaterEqual(matches[3].score, matches[4].score)
+
+    def test_fast_path_skips_fuzzy_scoring(self):
+        with patch.object(function_matcher.process, "extract", wraps=function_matcher.process.extract) as extract:
+            matches = self.matcher.match("get_user", top_k=3)
+        self.assertEqual([match.name for match in matches], ["get_user", "get_users", "get_user_by_id"])
+        # Only the two names starting with the searched one were scored
+        extract.assert_called_once()
+        self.assertEqual(sorted(extract.call_args.args[1]), ["get user by id", "get users"])
+
+    def test_min_score_and_scorer(self):
+        self.assertEqual(self.matcher.match("xyz_unrelated", top_k=3, min_score=60), [])
+        # Nothing in common is no match, even without a min_score
+        self.assertEqual(self.matcher.match("zzzz", top_k=3), [])
+        matches = self.matcher.match("user get", top_k=1, scorer="token_set")
+        self.assertEqual(matches[0].score, 100)
+        self.assertIn(matches[0].name, ("get_user", "getUser"))
+        with self.assertRaises(KeyError):
+            self.matcher.match("get_user", scorer="unknown")
+
+    def test_empty_name(self):
+        self.assertEqual(self.matcher.match("__"), [])
+        self.assertEqual(FunctionMatcher({}).match("get_user", top_k=5), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
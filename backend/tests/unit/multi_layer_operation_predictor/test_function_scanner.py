@@ -0,0 +1,154 @@
+import unittest
+import time
+import sys
+import os
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from multi_layer_operation_predictor.function_scanner import extract_functions
+
+JAVASCRIPT_SOURCE = r'''
+// function commentedOut() { }
+/* function blockComment() { } */
+export async function fetchUser(id) {
+  const url = `/users/${id}/{not a brace}`;
+  if (id) { return fetch(url).then(r => r.json()); }
+}
+const add = (a, b) => a + b;
+let multiply = function (a, b) { return a * b; };
+var subtract = async (a, b) => {
+  const pattern = /[}{]/g;
+  return a - b;
+};
+const square = x => x * x
+class Widget {
+  handleClick = () => { this.count++; };
+  render() { return "}"; }
+}
+foo(bar, function () { nothing(); });
+'''
+
+JAVA_SOURCE = r'''
+public class Calculator {
+    @Override
+    public static <T> List<T> collect(final Map<String, T> values) throws IOException {
+        String text = "}";
+        char brace = '{';
+        if (values.isEmpty()) { return null; }
+        return new ArrayList<>(values.values());
+    }
+    Calculator(int x) { this.x = x; }
+    abstract void nothing();
+    Runnable task = new Runnable() { public void run() { go(); } };
+}
+'''
+
+PHP_SOURCE = r'''<p>Don't { panic</p>
+<?php
+# function hashComment() {}
+class Greeter {
+    public static function create(array $names): ?self {
+        $text = <<<EOT
+        } not code {
+        EOT;
+        return new self("{$names[0]}");
+    }
+}
+function greet($name) { if ($name) { echo "}"; } }
+?>
+<p>it's html again</p>
+<?php function farewell() { return 1; }
+'''
+
+
+class TestFunctionScanner(unittest.TestCase):
+
+    def test_javascript(self):
+        functions = extract_functions(JAVASCRIPT_SOURCE, "javascript")
+        self.assertEqual(list(functions), [
+            "fetchUser", "add", "multiply", "subtract", "square", "handleClick", "render",
+        ])
+        self.assertTrue(functions["fetchUser"].startswith("async function fetchUser(id) {"))
+        self.assertTrue(functions["fetchUser"].endswith("r.json()); }\n}"))
+        self.assertEqual(functions["add"], "const add = (a, b) => a + b")
+        self.assertEqual(functions["multiply"], "let multiply = function (a, b) { return a * b; }")
+        self.assertTrue(functions["subtract"].endswith("return a - b;\n}"))
+        self.assertEqual(functions["square"], "const square = x => x * x")
+        self.assertEqual(functions["handleClick"], "handleClick = () => { this.count++; }")
+        self.assertEqual(functions["render"], 'render() { return "}"; }')
+
+    def test_unterminated_regex_only_affects_its_line(self):
+        source = "const broken = (/[ / x;\nfunction clean() { return /[}]/.test(s); }\n"
+        functions = extract_functions(source, "javascript")
+        self.assertEqual(functions["clean"], "function clean() { return /[}]/.test(s); }")
+
+    def test_typescript_annotations(self):
+        source = "const handler: Handler = async (event: Event): Promise<void> => { await go(); };\n" \
+                 "function total(items: Item[]): number { return items.length; }\n" \
+                 "declare function missing(): void;\n"
+        functions = extract_functions(source, "typescript")
+        self.assertEqual(list(functions), ["handler", "total"])
+        self.assertEqual(functions["total"], "function total(items: Item[]): number { return items.length; }")
+
+    def test_typescript_generics(self):
+        source = "function identity<T>(x: T): T { return x; }\n" \
+                 "class Store {\n" \
+                 "  public async bar<T, U extends Array<Map<string, T>>>(x: T): Promise<U> { return load(x); }\n" \
+                 "  compare(a: number, b: number) { if (a < b && b > (a)) { return 1; } }\n" \
+                 "}\n" \
+                 "const pick = <K extends keyof T>(key: K) => key;\n"
+        functions = extract_functions(source, "typescript")
+        self.assertEqual(list(functions), ["identity", "bar", "compare", "pick"])
+        self.assertEqual(functions["identity"], "function identity<T>(x: T): T { return x; }")
+        self.assertTrue(functions["bar"].startswith("public async bar<T, U extends Array<Map<string, T>>>(x: T)"))
+        self.assertTrue(functions["bar"].endswith("{ return load(x); }"))
+        self.assertEqual(functions["pick"], "const pick = <K extends keyof T>(key: K) => key")
+
+    def test_java(self):
+        functions = extract_functions(JAVA_SOURCE, "java")
+        self.assertEqual(list(functions), ["collect", "Calculator", "run"])
+        self.assertTrue(functions["collect"].startswith("@Override\n    public static <T> List<T> collect("))
+        self.assertTrue(functions["collect"].endswith("values.values());\n    }"))
+        self.assertEqual(functions["run"], "public void run() { go(); }")
+
+    def test_php(self):
+        functions = extract_functions(PHP_SOURCE, "php")
+        self.assertEqual(list(functions), ["create", "greet", "farewell"])
+        self.assertTrue(functions["create"].startswith("public static function create(array $names): ?self {"))
+        self.assertEqual(functions["greet"], 'function greet($name) { if ($name) { echo "}"; } }')
+
+    def test_python(self):
+        source = "def outer():\n    def inner(x):\n        return 'é' + x\n    return inner\n"
+        self.assertEqual(extract_functions(source, "python"), {
+            "outer": source.rstrip("\n"),
+            "inner": "def inner(x):\n        return 'é' + x",
+        })
+        with self.assertRaises(SyntaxError):
+            extract_functions("def broken(:", "python")
+
+    def test_unsupported_language(self):
+        with self.assertRaises(ValueError):
+            extract_functions("fn main() {}", "rust")
+
+    def test_pathological_inputs_scan_in_linear_time(self):
+        size = 200_000
+        inputs = {
+            "unclosed body": "function f() {" + "x;" * (size // 2),
+            "deep nesting": "function f() " + "{" * size + "}" * size,
+            "open parentheses": "f(" * (size // 2),
+            "unterminated strings": "'a\n" * (size // 3),
+            "unterminated regex classes": "(/[" * (size // 3),
+            "open type parameters": "f<" * (size // 2),
+            "minified bundle": "function a(b){return b+1}var c=function(d){return{e:d}};" * (size // 50),
+        }
+        for language in ("javascript", "typescript", "java", "php"):
+            for name, source in inputs.items():
+                started = time.perf_counter()
+                extract_functions("<?php " + source if language == "php" else source, language)
+                # The previous regular expressions took minutes on most of these
+                self.assertLess(time.perf_counter() - started, 10, f"{language}: {name}")
+
+
+if __name__ == '__main__':
+    unittest.main()
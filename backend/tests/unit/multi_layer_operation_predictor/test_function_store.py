@@ -0,0 +1,102 @@
+import unittest
+from unittest.mock import patch
+import tempfile
+import threading
+import sys
+import os
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from multi_layer_operation_predictor.function_store import FunctionStore, write_function_store
+from multi_layer_operation_predictor.operation_predictor import (
+    find_closest_operation_substring,
+    find_closest_operation_fuzzy,
+    load_functions,
+)
+
+MOCKED_OPERATIONS = {
+    "multiply_numbers": "def multiply_numbers(a, b):\n    return a * b",
+    "add_numbers": "def add_numbers(a, b):\n    return a + b",
+    "área": "def área(r):\n    return 3.14 * r * r",
+    "empty": "",
+}
+
+
+class TestFunctionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, "python_functions.store")
+        write_function_store(self.file_path, MOCKED_OPERATIONS)
+        self.store = FunctionStore(self.file_path)
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_round_trip(self):
+        self.assertEqual(len(self.store), len(MOCKED_OPERATIONS))
+        self.assertEqual(dict(self.store), MOCKED_OPERATIONS)
+        self.assertEqual(self.store["área"], MOCKED_OPERATIONS["área"])
+        self.assertEqual(self.store["empty"], "")
+
+    def test_names_are_sorted(self):
+        self.assertEqual(list(self.store), sorted(MOCKED_OPERATIONS, key=lambda name: name.encode("utf-8")))
+
+    def test_missing_names(self):
+        self.assertNotIn("subtract_numbers", self.store)
+        self.assertNotIn(None, self.store)
+        with self.assertRaises(KeyError):
+            self.store["subtract_numbers"]
+
+    def test_empty_store(self):
+        empty_path = os.path.join(self.temp_dir.name, "empty.store")
+        write_function_store(empty_path, {})
+        store = FunctionStore(empty_path)
+        self.assertEqual(len(store), 0)
+        self.assertNotIn("add_numbers", store)
+        store.close()
+
+    def test_concurrent_writers(self):
+        errors = []
+
+        def write(suffix):
+            try:
+                for _ in range(20):
+                    write_function_store(self.file_path, {f"function_{suffix}": "def f(): pass"})
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(os.listdir(self.temp_dir.name), ["python_functions.store"])
+        store = FunctionStore(self.file_path)
+        self.assertEqual(len(store), 1)
+        store.close()
+
+    def test_rejects_other_files(self):
+        other_path = os.path.join(self.temp_dir.name, "functions.json")
+        with open(other_path, "w") as file:
+            file.write("{" + " " * 64 + "}")
+        with self.assertRaises(ValueError):
+            FunctionStore(other_path)
+
+    def test_stages_read_from_store(self):
+        self.assertEqual(find_closest_operation_substring("add", self.store)[0], "add_numbers")
+        self.assertEqual(find_closest_operation_fuzzy("multiply_numbrs", self.store)[0], "multiply_numbers")
+
+    def test_load_functions_prefers_store(self):
+        with patch('multi_layer_operation_predictor.operation_predictor.get_function_store_path', return_value=self.file_path):
+            functions = load_functions("python")
+        self.assertIsInstance(functions, FunctionStore)
+        self.assertEqual(dict(functions), MOCKED_OPERATIONS)
+        functions.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
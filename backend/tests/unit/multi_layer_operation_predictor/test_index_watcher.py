@@ -0,0 +1,156 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import tempfile
+import threading
+import types
+import sys
+import os
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from multi_layer_operation_predictor import index_watcher
+from multi_layer_operation_predictor.function_scanner import extract_functions
+from multi_layer_operation_predictor.index_watcher import IndexWatcher
+from multi_layer_operation_predictor.local_index import LocalFunctionIndex
+
+
+def parse_file(file_path, language):
+    with open(file_path, "r") as f:
+        return extract_functions(f.read(), language)
+
+
+class FakeObserver:
+    """Stands in for watchdog's Observer, the test delivers the events itself"""
+
+    def __init__(self):
+        self.handlers = []
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def schedule(self, handler, path, recursive):
+        self.handlers.append((handler, path))
+
+
+def event(src_path, event_type="modified", is_directory=False, dest_path=None):
+    return types.SimpleNamespace(src_path=src_path, event_type=event_type, is_directory=is_directory,
+                                 dest_path=dest_path)
+
+
+class TestIndexWatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.repo_path = os.path.realpath(self.temp_dir.name)
+        self.watchers = []
+
+    def tearDown(self):
+        for watcher in self.watchers:
+            watcher.stop()
+        self.temp_dir.cleanup()
+
+    def create_watcher(self, index, **kwargs):
+        watcher = IndexWatcher(index, **kwargs)
+        self.watchers.append(watcher)
+        return watcher
+
+    def create_event_watcher(self, index, **kwargs):
+        watchdog = types.ModuleType("watchdog")
+        observers = types.ModuleType("watchdog.observers")
+        observers.Observer = FakeObserver
+        with patch.dict(sys.modules, {"watchdog": watchdog, "watchdog.observers": observers}):
+            return self.create_watcher(index, **kwargs)
+
+    def wait_for(self, condition):
+        for _ in range(500):
+            if condition():
+                return
+            threading.Event().wait(0.01)
+        self.fail("Condition never became true")
+
+    def test_events_are_debounced(self):
+        index = MagicMock()
+        watcher = self.create_event_watcher(index, debounce=0.2)
+        self.assertEqual(watcher.mode, "events")
+        watcher.watch(self.repo_path)
+        index.refresh.assert_called_once_with(self.repo_path)
+        self.assertTrue(watcher.is_watching(self.repo_path))
+        index.reset_mock()
+
+        handler, path = watcher._observer.handlers[0]
+        self.assertEqual(path, self.repo_path)
+        for _ in range(3):
+            handler.dispatch(event(os.path.join(self.repo_path, "a.py")))
+        handler.dispatch(event(os.path.join(self.repo_path, "b.py"), "moved", dest_path=os.path.join(self.repo_path, "c.py")))
+
+        self.wait_for(lambda: index.update_files.called)
+        index.update_files.assert_called_once()
+        repo_path, file_paths = index.update_files.call_args.args
+        self.assertEqual(repo_path, self.repo_path)
+        self.assertEqual(sorted(os.path.basename(file_path) for file_path in file_paths), ["a.py", "b.py", "c.py"])
+        index.refresh.assert_not_called()
+
+    def test_is_watching_does_not_wait_for_schedule(self):
+        index = MagicMock()
+        watcher = self.create_event_watcher(index)
+        scheduling = threading.Event()
+        release = threading.Event()
+        schedule = watcher._observer.schedule
+
+        def slow_schedule(handler, path, recursive):
+            scheduling.set()
+            release.wait(5)
+            schedule(handler, path, recursive)
+
+        watcher._observer.schedule = slow_schedule
+        thread = threading.Thread(target=watcher.watch, args=(self.repo_path,))
+        thread.start()
+        try:
+            self.assertTrue(scheduling.wait(5))
+            # Neither lookups nor events wait for the repository to be scheduled
+            self.assertFalse(watcher.is_watching(self.repo_path))
+            watcher.schedule_files(self.repo_path, [os.path.join(self.repo_path, "a.py")])
+        finally:
+            release.set()
+            thread.join(5)
+        self.assertTrue(watcher.is_watching(self.repo_path))
+
+    def test_burst_refreshes_repository(self):
+        index = MagicMock()
+        watcher = self.create_event_watcher(index, debounce=0.1)
+        watcher.watch(self.repo_path)
+        index.reset_mock()
+        handler, _ = watcher._observer.handlers[0]
+
+        with patch.object(index_watcher, "BURST_REFRESH_THRESHOLD", 2):
+            for name in ("a.py", "b.py", "c.py"):
+                handler.dispatch(event(os.path.join(self.repo_path, name)))
+            self.wait_for(lambda: index.refresh.called)
+        index.update_files.assert_not_called()
+
+        # A moved directory doesn't name its files
+        handler.dispatch(event(os.path.join(self.repo_path, "src"), "moved", is_directory=True))
+        self.wait_for(lambda: index.refresh.call_count == 2)
+
+    def test_polling_without_watchdog(self):
+        index = LocalFunctionIndex(":memory:", {".py": (parse_file, "python")})
+        with patch.dict(sys.modules, {"watchdog.observers": None}):
+            watcher = self.create_watcher(index, poll_interval=0.05)
+        self.assertEqual(watcher.mode, "polling")
+
+        with open(os.path.join(self.repo_path, "math_utils.py"), "w") as f:
+            f.write("def add_numbers(a, b):\n    return a + b\n")
+        watcher.watch(self.repo_path)
+        self.assertEqual(set(index.get_functions([self.repo_path], refresh=False)), {"add_numbers"})
+
+        with open(os.path.join(self.repo_path, "more.py"), "w") as f:
+            f.write("def subtract_numbers(a, b):\n    return a - b\n")
+        self.wait_for(lambda: "subtract_numbers" in index.get_functions([self.repo_path], refresh=False))
+
+
+if __name__ == '__main__':
+    unittest.main()
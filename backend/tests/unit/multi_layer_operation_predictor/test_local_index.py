@@ -0,0 +1,148 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from concurrent.futures import ProcessPoolExecutor
+import tempfile
+import sys
+import os
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from multi_layer_operation_predictor.function_scanner import extract_functions
+from multi_layer_operation_predictor import local_index
+from multi_layer_operation_predictor.local_index import LocalFunctionIndex, extract_file_functions
+
+
+def parse_file(file_path, language):
+    with open(file_path, "r") as f:
+        return extract_functions(f.read(), language)
+
+
+class TestLocalFunctionIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.repo_path = os.path.join(self.temp_dir.name, "repo")
+        self.db_path = os.path.join(self.temp_dir.name, "index", "functions.sqlite3")
+        self.parser = MagicMock(side_effect=parse_file)
+        self.extractors = {".py": (self.parser, "python"), ".js": (self.parser, "javascript")}
+        self.write("math_utils.py", "def add_numbers(a, b):\n    return a + b\n")
+        self.write("web/app.js", "function greet(name) { return name; }")
+        self.write("README.md", "# not indexed")
+        self.indexes = []
+
+    def tearDown(self):
+        for index in self.indexes:
+            index.close()
+        self.temp_dir.cleanup()
+
+    def write(self, relative_path, content, mtime_offset=0):
+        file_path = os.path.join(self.repo_path, relative_path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            f.write(content)
+        if mtime_offset:
+            stat = os.stat(file_path)
+            os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + mtime_offset))
+
+    def create_index(self):
+        index = LocalFunctionIndex(self.db_path, self.extractors)
+        self.indexes.append(index)
+        return index
+
+    def test_builds_index_once(self):
+        index = self.create_index()
+        functions = index.get_functions([self.repo_path])
+        self.assertEqual(set(functions), {"add_numbers", "greet"})
+        self.assertEqual(self.parser.call_count, 2)
+
+        self.assertEqual(index.get_functions([self.repo_path]), functions)
+        self.assertEqual(self.parser.call_count, 2)
+
+    def test_only_changed_files_are_parsed(self):
+        index = self.create_index()
+        index.get_functions([self.repo_path])
+        self.parser.reset_mock()
+
+        self.write("math_utils.py", "def multiply_numbers(a, b):\n    return a * b\n", mtime_offset=1_000_000_000)
+        self.write("new.py", "def divide_numbers(a, b):\n    return a / b\n")
+        os.remove(os.path.join(self.repo_path, "web", "app.js"))
+
+        self.assertEqual(index.refresh(self.repo_path), 3)
+        self.assertEqual(sorted(call.args[0] for call in self.parser.call_args_list), [
+            os.path.join(self.repo_path, "math_utils.py"),
+            os.path.join(self.repo_path, "new.py"),
+        ])
+        self.assertEqual(set(index.get_repo_functions(self.repo_path)), {"multiply_numbers", "divide_numbers"})
+
+    def test_index_survives_restart(self):
+        self.create_index().get_functions([self.repo_path])
+        self.indexes.pop().close()
+        self.parser.reset_mock()
+
+        restarted = self.create_index()
+        self.assertEqual(restarted.refresh(self.repo_path), 0)
+        self.parser.assert_not_called()
+        self.assertEqual(set(restarted.get_repo_functions(self.repo_path)), {"add_numbers", "greet"})
+
+    def test_update_files_patches_functions_in_place(self):
+        index = self.create_index()
+        index.get_functions([self.repo_path])
+        self.write("web/more.js", "function greet(other) { return other; }")
+        self.assertEqual(index.refresh(self.repo_path), 1)
+        # The definition in the last file path wins, as when loading from SQLite
+        self.assertEqual(index.get_repo_functions(self.repo_path)["greet"], "function greet(other) { return other; }")
+        self.parser.reset_mock()
+
+        os.remove(os.path.join(self.repo_path, "web", "more.js"))
+        self.write("math_utils.py", "def subtract_numbers(a, b):\n    return a - b\n", mtime_offset=1_000_000_000)
+        self.write("ignored.py", "def ignored():\n    pass\n")
+        changed = index.update_files(self.repo_path, [
+            os.path.join(self.repo_path, "web", "more.js"),
+            os.path.join(self.repo_path, "math_utils.py"),
+            os.path.join(self.repo_path, "web", "app.js"),
+            os.path.join(self.repo_path, "README.md"),
+        ])
+
+        self.assertEqual(changed, 2)
+        self.parser.assert_called_once_with(os.path.join(self.repo_path, "math_utils.py"), "python")
+        functions = index.get_repo_functions(self.repo_path)
+        self.assertEqual(set(functions), {"subtract_numbers", "greet"})
+        self.assertEqual(functions["greet"], "function greet(name) { return name; }")
+        # The in-memory functions match what a restarted index loads
+        self.indexes.pop().close()
+        self.assertEqual(self.create_index().get_repo_functions(self.repo_path), functions)
+
+    def test_parse_executor(self):
+        for i in range(3):
+            self.write(f"pkg/module_{i}.py", f"def function_{i}():\n    return {i}\n")
+        extractors = {".py": (extract_file_functions, "python"), ".js": (extract_file_functions, "javascript")}
+        with ProcessPoolExecutor(max_workers=2) as parse_executor, \
+                patch.object(local_index, "PROCESS_POOL_MIN_FILES", 2):
+            index = LocalFunctionIndex(self.db_path, extractors, parse_executor=parse_executor)
+            self.indexes.append(index)
+            self.assertEqual(index.refresh(self.repo_path), 5)
+
+            # A single changed file is parsed on the calling thread
+            parse_executor.submit = MagicMock(side_effect=AssertionError("Parsed in the executor"))
+            self.write("pkg/module_0.py", "def renamed():\n    pass\n", mtime_offset=1_000_000_000)
+            self.assertEqual(index.refresh(self.repo_path), 1)
+            del parse_executor.submit
+
+        self.assertEqual(set(index.get_repo_functions(self.repo_path)), {
+            "add_numbers", "greet", "renamed", "function_1", "function_2",
+        })
+
+    def test_later_repositories_win_name_clashes(self):
+        other_repo = os.path.join(self.temp_dir.name, "other")
+        os.makedirs(other_repo)
+        with open(os.path.join(other_repo, "math.py"), "w") as f:
+            f.write("def add_numbers(x):\n    return x\n")
+
+        functions = self.create_index().get_functions([self.repo_path, other_repo])
+        self.assertEqual(functions["add_numbers"], "def add_numbers(x):\n    return x")
+        self.assertIn("greet", functions)
+
+
+if __name__ == '__main__':
+    unittest.main()
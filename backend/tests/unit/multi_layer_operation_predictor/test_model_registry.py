@@ -0,0 +1,131 @@
+import unittest
+import threading
+import sys
+import os
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from multi_layer_operation_predictor.model_registry import ModelRegistry
+from multi_layer_operation_predictor.operation_index import OperationIndex
+
+MOCKED_OPERATIONS = {
+    "add_numbers": "Adds two numbers.",
+    "multiply_numbers": "Multiplies two numbers.",
+}
+
+language = "python"
+
+
+class TestModelRegistry(unittest.TestCase):
+
+    def test_get_does_not_block_on_first_build(self):
+        registry = ModelRegistry()
+        release = threading.Event()
+
+        def build(_, __, ___):
+            release.wait(5)
+            return "knn", "vectorizer"
+
+        operations = OperationIndex(MOCKED_OPERATIONS, signature=1)
+        self.assertEqual(registry.get(language, operations, build), (None, None))
+
+        release.set()
+        self.assertTrue(registry.wait(language, timeout=5))
+        self.assertEqual(registry.get(language, operations, build), ("knn", "vectorizer"))
+
+    def test_rebuild_keeps_serving_old_model_until_swap(self):
+        registry = ModelRegistry()
+        registry.get(language, OperationIndex(MOCKED_OPERATIONS, signature=1), lambda *_: ("old", "vectorizer"))
+        registry.wait(language, timeout=5)
+
+        release = threading.Event()
+        resident_seen = []
+
+        def rebuild(_, __, resident):
+            resident_seen.append(resident)
+            release.wait(5)
+            return "new", "vectorizer"
+
+        changed = OperationIndex(MOCKED_OPERATIONS, signature=2)
+        self.assertEqual(registry.get(language, changed, rebuild), ("old", "vectorizer"))
+
+        release.set()
+        registry.wait(language, timeout=5)
+        self.assertEqual(registry.get(language, changed, rebuild), ("new", "vectorizer"))
+        self.assertEqual(resident_seen[0].knn_model, "old")
+
+    def test_same_function_set_is_built_once(self):
+        registry = ModelRegistry()
+        calls = []
+        release = threading.Event()
+
+        def build(*_):
+            calls.append(1)
+            release.wait(5)
+            return "knn", "vectorizer"
+
+        operations = OperationIndex(MOCKED_OPERATIONS, signature=1)
+        for _ in range(5):
+            registry.get(language, operations, build)
+        release.set()
+        registry.wait(language, timeout=5)
+        registry.get(language, operations, build)
+        self.assertEqual(len(calls), 1)
+
+    def test_failed_build_is_not_retried_for_same_function_set(self):
+        registry = ModelRegistry()
+        calls = []
+
+        def build(*_):
+            calls.append(1)
+            raise ValueError("empty vocabulary")
+
+        operations = OperationIndex(MOCKED_OPERATIONS, signature=1)
+        registry.get(language, operations, build)
+        registry.wait(language, timeout=5)
+        self.assertEqual(registry.get(language, operations, build), (None, None))
+        self.assertEqual(len(calls), 1)
+        self.assertFalse(registry.is_resident(language))
+
+    def test_build_running_when_discarded_is_not_made_resident(self):
+        registry = ModelRegistry()
+        release = threading.Event()
+
+        def build(*_):
+            release.wait(5)
+            return "knn", "vectorizer"
+
+        operations = OperationIndex(MOCKED_OPERATIONS, signature=1)
+        registry.get(language, operations, build)
+        future = registry.schedule(language, operations, build)
+        registry.discard(language)
+
+        release.set()
+        future.result(timeout=5)
+        self.assertFalse(registry.is_resident(language))
+
+        # The key is built again when it is used again
+        registry.get(language, operations, build)
+        self.assertTrue(registry.wait(language, timeout=5))
+
+    def test_least_recently_used_models_are_dropped_over_max_models(self):
+        registry = ModelRegistry(max_models=2)
+        operations = OperationIndex(MOCKED_OPERATIONS, signature=1)
+        build = lambda key, *_: (f"{key}_knn", "vectorizer")
+
+        for key in ("a", "b"):
+            registry.get(key, operations, build)
+            registry.wait(key, timeout=5)
+        # Using a makes b the least recently used
+        registry.get("a", operations, build)
+        registry.get("c", operations, build)
+        registry.wait("c", timeout=5)
+
+        self.assertTrue(registry.is_resident("a"))
+        self.assertFalse(registry.is_resident("b"))
+        self.assertTrue(registry.is_resident("c"))
+
+
+if __name__ == '__main__':
+    unittest.main()
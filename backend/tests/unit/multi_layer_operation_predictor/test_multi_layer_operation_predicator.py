@@ -1,7 +1,9 @@
 import unittest
 from unittest.mock import mock_open, patch, MagicMock
 import json
-from sklearn.neighbors import KNeighborsClassifier
+import subprocess
+import tempfile
+import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 import sys
 import os
@@ -9,17 +11,31 @@ import os
 # Add the backend directory to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
 
+import joblib
+from multi_layer_operation_predictor.similarity_search import CosineNeighbors
+from multi_layer_operation_predictor.operation_index import OperationIndex
 from multi_layer_operation_predictor.operation_predictor import (
     MatchMethod,
     clean_function_name,
     preprocess_text,
     load_functions,
     find_closest_operation_fuzzy,
+    find_closest_operations_fuzzy,
     find_closest_operation_substring,
     train_ml_model,
-    load_ml_model,
     predict_operation_name_ml,
-    get_operation_definition
+    predict_operation_names_ml,
+    search_operation_names_ml,
+    build_ml_model,
+    split_identifier,
+    get_vectorizer_params,
+    load_ml_artifact,
+    MODEL_SCHEMA_VERSION,
+    IMPORT_TIME_BUDGET,
+    get_lemmatizer,
+    load_lemmatizer,
+    get_operation_definition,
+    get_operation_definitions
 )
 
 MOCKED_OPERATIONS = {
@@ -62,20 +78,31 @@ class TestOperationFunctions(unittest.TestCase):
         # Test with a function name that has multiple spaces and keywords
         self.assertEqual(clean_function_name("def  async  addition_numbers  "), "addition_numbers")
 
-    @patch('fuzzywuzzy.fuzz.ratio', return_value=80)
-    def test_find_closest_operation_fuzzy(self, mock_fuzz):
-        # Positive test case: Fuzzy matching with high similarity
-        mock_fuzz.return_value = 90  # Set high similarity score
+    def test_find_closest_operation_fuzzy(self):
+        # Positive test case: Fuzzy matching with high similarity, ties keep the first name
         result, method = find_closest_operation_fuzzy("operation", MOCKED_OPERATIONS)
         self.assertEqual(result, "operation1")
         self.assertEqual(method, MatchMethod.FUZZY)
 
+        # Positive test case: Misspelled input resolves to the best scoring name
+        result, method = find_closest_operation_fuzzy("multiply_numbrs", MOCKED_OPERATIONS)
+        self.assertEqual(result, "multiply_numbers")
+
         # Negative test case: No close match found (low similarity)
-        mock_fuzz.return_value = 30  # Set low similarity score
         result, method = find_closest_operation_fuzzy("unknown", MOCKED_OPERATIONS)
         self.assertIsNone(result)
         self.assertEqual(method, MatchMethod.FUZZY)
 
+    def test_find_closest_operations_fuzzy(self):
+        # Batched scoring agrees with the scalar stage for every input
+        inputs = ["operation", "multiply_numbrs", "unknown", "ad_numbers"]
+        expected = [find_closest_operation_fuzzy(user_input, MOCKED_OPERATIONS)[0] for user_input in inputs]
+        self.assertEqual(find_closest_operations_fuzzy(inputs, MOCKED_OPERATIONS), expected)
+        self.assertEqual(expected, ["operation1", "multiply_numbers", None, "add_numbers"])
+
+        # Edge case: no inputs
+        self.assertEqual(find_closest_operations_fuzzy([], MOCKED_OPERATIONS), [])
+
     def test_find_closest_operation_substring(self):
         # Positive test case: Substring match found
         result, method = find_closest_operation_substring("oper", MOCKED_OPERATIONS)
@@ -89,45 +116,144 @@ class TestOperationFunctions(unittest.TestCase):
 
     @patch('joblib.dump')
     @patch('sklearn.feature_extraction.text.TfidfVectorizer.fit_transform')
-    @patch('sklearn.neighbors.KNeighborsClassifier.fit')
+    @patch('multi_layer_operation_predictor.similarity_search.CosineNeighbors.fit')
     def test_train_ml_model(self, _, __, mock_joblib_dump):
         # Positive test case: Training ML model
         knn_model, vectorizer = train_ml_model(MOCKED_OPERATIONS, language)
-        self.assertIsInstance(knn_model, KNeighborsClassifier)
+        self.assertIsInstance(knn_model, CosineNeighbors)
         self.assertIsInstance(vectorizer, TfidfVectorizer)
         mock_joblib_dump.assert_called_once()
 
     @patch('os.path.exists', return_value=True)
     @patch('joblib.load')
-    def test_load_ml_model_positive(self, mock_load, _):
+    def test_load_ml_artifact_positive(self, mock_load, _):
         mock_model = MagicMock()
         mock_vectorizer = MagicMock()
-        mock_load.return_value = (mock_model, mock_vectorizer)
+        mock_load.return_value = {
+            "schema_version": MODEL_SCHEMA_VERSION,
+            "knn_model": mock_model,
+            "vectorizer": mock_vectorizer,
+            "vectorizer_params": get_vectorizer_params(),
+        }
 
-        knn_model, vectorizer = load_ml_model(language)
-        self.assertEqual(knn_model, mock_model)
-        self.assertEqual(vectorizer, mock_vectorizer)
+        artifact = load_ml_artifact(language)
+        self.assertEqual(artifact["knn_model"], mock_model)
+        self.assertEqual(artifact["vectorizer"], mock_vectorizer)
+
+    @patch('os.path.exists', return_value=True)
+    @patch('joblib.load', return_value=(MagicMock(), MagicMock()))
+    def test_load_ml_artifact_legacy_tuple(self, _, __):
+        # Artifacts without recorded vectorizer parameters are not used
+        self.assertIsNone(load_ml_artifact(language))
 
     @patch('os.path.exists', return_value=False)
-    def test_load_ml_model_negative(self, _):
-        knn_model, vectorizer = load_ml_model(language)
-        self.assertIsNone(knn_model)
-        self.assertIsNone(vectorizer)
+    def test_load_ml_artifact_negative(self, _):
+        self.assertIsNone(load_ml_artifact(language))
+
+    def test_split_identifier(self):
+        self.assertEqual(split_identifier("squareRoot"), "square root")
+        self.assertEqual(split_identifier("add_numbers"), "add numbers")
+        self.assertEqual(split_identifier("parse-HTTPResponse"), "parse http response")
+        self.assertEqual(split_identifier("square root"), "square root")
+        self.assertEqual(split_identifier(""), "")
+
+    @patch('joblib.dump')
+    def test_identifier_analyzer_matches_split_names(self, mock_joblib_dump):
+        operations = {"squareRoot": "a", "reverseString": "b", "add_numbers": "c", "isPrime": "d"}
+        with patch('multi_layer_operation_predictor.operation_predictor.ML_ANALYZER_MODE', "identifier"):
+            knn_model, vectorizer = train_ml_model(operations, language)
+        self.assertEqual(predict_operation_names_ml(["square root", "reverse string", "prime"], knn_model, vectorizer),
+                         ["squareRoot", "reverseString", "isPrime"])
+        self.assertEqual(mock_joblib_dump.call_args[0][0]["vectorizer_params"], get_vectorizer_params("identifier"))
 
     def test_predict_operation_name_ml(self):
         mock_knn = MagicMock()
         mock_vectorizer = MagicMock()
-        mock_knn.predict_proba.return_value = [[0.8, 0.2]]
-        mock_knn.predict.return_value = ["operation1"]
+        mock_knn.search.return_value = [[("operation1", 0.8)]]
         result, method = predict_operation_name_ml("test_input", mock_knn, mock_vectorizer)
         self.assertEqual(result, "operation1")
         self.assertEqual(method, MatchMethod.ML)
 
+        # Negative test case: Best candidate is below the similarity threshold
+        mock_knn.search.return_value = [[("operation1", 0.3)]]
+        result, method = predict_operation_name_ml("test_input", mock_knn, mock_vectorizer)
+        self.assertEqual(result, "")
+
+        # The threshold is configurable
+        result, method = predict_operation_name_ml("test_input", mock_knn, mock_vectorizer, threshold=0.2)
+        self.assertEqual(result, "operation1")
+
+    def test_predict_operation_names_ml(self):
+        mock_knn = MagicMock()
+        mock_vectorizer = MagicMock()
+        mock_knn.search.return_value = [[("operation1", 0.8)], [("operation2", 0.4)], []]
+        result = predict_operation_names_ml(["test_input", "other_input", "empty"], mock_knn, mock_vectorizer)
+        self.assertEqual(result, ["operation1", "", ""])
+        mock_vectorizer.transform.assert_called_once_with(["test_input", "other_input", "empty"])
+        mock_knn.search.assert_called_once()
+
+    def test_search_operation_names_ml(self):
+        vectorizer = TfidfVectorizer()
+        X = vectorizer.fit_transform(["add numbers", "multiply numbers", "divide values"])
+        knn_model = CosineNeighbors(n_neighbors=3).fit(X, ["add_numbers", "multiply_numbers", "divide_values"])
+
+        candidates = search_operation_names_ml(["add numbers", "numbers"], knn_model, vectorizer, top_k=2)
+        self.assertEqual(candidates[0][0][0], "add_numbers")
+        self.assertAlmostEqual(candidates[0][0][1], 1.0)
+        self.assertEqual(candidates[0][1][0], "multiply_numbers")
+        self.assertLess(candidates[0][1][1], 1.0)
+        # Equal similarities keep the fitted order
+        self.assertEqual([name for name, _ in candidates[1]], ["add_numbers", "multiply_numbers"])
+
+        # Edge case: nothing in common with any name
+        candidates = search_operation_names_ml(["unknown"], knn_model, vectorizer)
+        self.assertTrue(all(similarity == 0 for _, similarity in candidates[0]))
+
+    def test_kneighbors_in_chunks(self):
+        vectorizer = TfidfVectorizer()
+        X = vectorizer.fit_transform(["add numbers", "multiply numbers", "divide values"])
+        knn_model = CosineNeighbors(n_neighbors=2).fit(X, ["add_numbers", "multiply_numbers", "divide_values"])
+        queries = vectorizer.transform(["add numbers", "divide", "numbers", "multiply", "values"])
+
+        expected = knn_model.kneighbors(queries)
+        # One query per chunk gives the same neighbours
+        with patch('multi_layer_operation_predictor.similarity_search.BATCH_CELLS', 3):
+            similarities, indices = knn_model.kneighbors(queries)
+        np.testing.assert_array_equal(indices, expected[1])
+        np.testing.assert_allclose(similarities, expected[0])
+        self.assertEqual(indices.shape, (5, 2))
+
     @patch('multi_layer_operation_predictor.operation_predictor.load_functions', return_value=MOCKED_OPERATIONS)
+    @patch('multi_layer_operation_predictor.operation_predictor.get_ml_model', return_value=(None, None))
+    def test_get_operation_definitions(self, _, __):
+        inputs = ["add!numbers", "  substract_numbers   ", "multiply", "unknown", "add!numbers"]
+        result = get_operation_definitions(inputs, language)
+        self.assertEqual(result, [
+            MOCKED_OPERATIONS["add_numbers"],
+            MOCKED_OPERATIONS["substract_numbers"],
+            MOCKED_OPERATIONS["multiply_numbers"],
+            "",
+            MOCKED_OPERATIONS["add_numbers"],
+        ])
+
+        # Each input resolves the same way as the scalar API
+        self.assertEqual(result, [get_operation_definition(user_input, language) for user_input in inputs])
+
+    @patch('multi_layer_operation_predictor.operation_predictor.load_functions', return_value=MOCKED_OPERATIONS)
+    @patch('multi_layer_operation_predictor.operation_predictor.get_ml_model', return_value=(MagicMock(), MagicMock()))
+    @patch('multi_layer_operation_predictor.operation_predictor.predict_operation_names_ml', side_effect=ValueError("bad"))
+    def test_get_operation_definitions_logs_ml_errors(self, _, __, ___):
+        with self.assertLogs('multi_layer_operation_predictor.operation_predictor', level='ERROR') as logs:
+            result = get_operation_definitions(["multiply", "unknown"], language)
+        self.assertEqual(result, [MOCKED_OPERATIONS["multiply_numbers"], ""])
+        self.assertIn("ML prediction failed: bad", logs.output[0])
+
+    @patch('multi_layer_operation_predictor.operation_predictor.load_functions', return_value=MOCKED_OPERATIONS)
+    @patch('multi_layer_operation_predictor.operation_predictor.get_ml_model', return_value=(MOCKED_KNN_MODEL, MOCKED_VECTORIZER))
     @patch('multi_layer_operation_predictor.operation_predictor.find_closest_operation_substring', return_value=("operation1", MatchMethod.SUBSTRING))
     @patch('multi_layer_operation_predictor.operation_predictor.find_closest_operation_fuzzy', return_value=("operation2", MatchMethod.FUZZY))
     @patch('multi_layer_operation_predictor.operation_predictor.predict_operation_name_ml', return_value=("operation3", MatchMethod.ML))
-    def test_get_operation_definition(self, mock_ml_predict, mock_fuzzy, mock_substring, _):
+    def test_get_operation_definition(self, mock_ml_predict, mock_fuzzy, mock_substring, _, __):
         # Positive test case: Successfully finding operation
         result = get_operation_definition("operation", language)
         self.assertEqual(result, "description1")
@@ -165,11 +291,12 @@ class TestOperationFunctions(unittest.TestCase):
         self.assertEqual(result, "hello, i am running 123 times!")
 
     @patch('multi_layer_operation_predictor.operation_predictor.load_functions', return_value=MOCKED_OPERATIONS)
-    @patch('multi_layer_operation_predictor.operation_predictor.load_ml_model')
+    @patch('multi_layer_operation_predictor.operation_predictor.get_ml_model')
     @patch('multi_layer_operation_predictor.operation_predictor.find_closest_operation_substring')
     @patch('multi_layer_operation_predictor.operation_predictor.find_closest_operation_fuzzy')
-    def test_ml_error(self, mock_find_fuzzy, mock_find_substring, mock_load_ml_model, _):
-        mock_load_ml_model.return_value = (None, None)
+    def test_ml_error(self, mock_find_fuzzy, mock_find_substring, mock_get_ml_model, _):
+        # No model is resident yet, the request must not wait for one
+        mock_get_ml_model.return_value = (None, None)
         mock_find_substring.return_value = (None, MatchMethod.SUBSTRING)
         mock_find_fuzzy.return_value = (None, MatchMethod.FUZZY)
 
@@ -189,5 +316,105 @@ class TestOperationFunctions(unittest.TestCase):
         result = get_operation_definition(user_input, language)
         self.assertEqual(result, MOCKED_OPERATIONS["substract_numbers"])
 
+class TestColdStart(unittest.TestCase):
+
+    def test_import_stays_within_budget(self):
+        # Measured in a fresh interpreter, nltk, sklearn and joblib must not be imported yet
+        backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+        code = (
+            "import sys, time\n"
+            "started = time.perf_counter()\n"
+            "import multi_layer_operation_predictor.operation_predictor\n"
+            "print(time.perf_counter() - started)\n"
+            "print(','.join(name for name in ('nltk', 'sklearn', 'joblib') if name in sys.modules))\n"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=backend_dir, capture_output=True, text=True, check=True
+        ).stdout.splitlines()
+        self.assertLess(float(output[0]), IMPORT_TIME_BUDGET)
+        self.assertEqual(output[1], "")
+
+    @patch('multi_layer_operation_predictor.operation_predictor._lemmatizer_loaded', False)
+    @patch('multi_layer_operation_predictor.operation_predictor._lemmatizer', None)
+    @patch('multi_layer_operation_predictor.operation_predictor.load_lemmatizer')
+    def test_lemmatizer_is_loaded_once(self, mock_load_lemmatizer):
+        self.assertIs(get_lemmatizer(), mock_load_lemmatizer.return_value)
+        self.assertIs(get_lemmatizer(), mock_load_lemmatizer.return_value)
+        mock_load_lemmatizer.assert_called_once()
+
+    @patch('nltk.download')
+    @patch('nltk.data.find', side_effect=LookupError)
+    def test_missing_corpus_disables_lemmatization_offline(self, _, mock_download):
+        self.assertIsNone(load_lemmatizer())
+        mock_download.assert_not_called()
+
+class TestVersionedModelArtifacts(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        model_path = os.path.join(self.temp_dir.name, "python_knn_model.h5")
+        patcher = patch('multi_layer_operation_predictor.operation_predictor.get_model_path', return_value=model_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.temp_dir.cleanup)
+        self.operations = {f"operation_{i}": f"description{i}" for i in range(40)}
+
+    def test_artifact_records_hash_and_schema_version(self):
+        train_ml_model(self.operations, language)
+        artifact = load_ml_artifact(language)
+        self.assertEqual(artifact["schema_version"], MODEL_SCHEMA_VERSION)
+        self.assertEqual(artifact["function_set_hash"], OperationIndex(self.operations).function_set_hash)
+        self.assertEqual(artifact["vectorizer_params"], get_vectorizer_params())
+
+    def test_unchanged_function_set_is_not_retrained(self):
+        train_ml_model(self.operations, language)
+        with patch('multi_layer_operation_predictor.operation_predictor.train_ml_model') as mock_train:
+            knn_model, _ = build_ml_model(language, dict(reversed(self.operations.items())), None)
+            mock_train.assert_not_called()
+        self.assertEqual(set(knn_model.labels_), set(self.operations))
+
+    def test_resident_model_is_kept_when_names_are_unchanged(self):
+        knn_model, vectorizer = train_ml_model(self.operations, language)
+        resident = MagicMock(knn_model=knn_model, vectorizer=vectorizer)
+        with patch('multi_layer_operation_predictor.operation_predictor.load_ml_artifact') as mock_load:
+            self.assertEqual(build_ml_model(language, self.operations, resident), (knn_model, vectorizer))
+            mock_load.assert_not_called()
+
+    def test_small_change_is_applied_incrementally(self):
+        _, vectorizer = train_ml_model(self.operations, language)
+        changed = dict(self.operations)
+        del changed["operation_0"]
+        changed["operation_41"] = "description41"
+
+        with patch('multi_layer_operation_predictor.operation_predictor.train_ml_model') as mock_train:
+            knn_model, updated_vectorizer = build_ml_model(language, changed, None)
+            mock_train.assert_not_called()
+
+        self.assertIs(type(updated_vectorizer), type(vectorizer))
+        self.assertEqual(set(knn_model.labels_), set(changed))
+        # The vectorizer keeps its vocabulary, added names are transformed with it
+        self.assertEqual(predict_operation_names_ml(["operation 41"], knn_model, updated_vectorizer), ["operation_41"])
+        artifact = load_ml_artifact(language)
+        self.assertEqual(artifact["function_set_hash"], OperationIndex(changed).function_set_hash)
+        self.assertEqual(artifact["incremental_changes"], 2)
+
+    def test_large_change_is_refit(self):
+        train_ml_model(self.operations, language)
+        changed = {f"renamed_{i}": "" for i in range(40)}
+        knn_model, _ = build_ml_model(language, changed, None)
+        self.assertEqual(set(knn_model.labels_), set(changed))
+        self.assertEqual(load_ml_artifact(language)["incremental_changes"], 0)
+
+    def test_other_schema_version_is_retrained(self):
+        train_ml_model(self.operations, language)
+        artifact = load_ml_artifact(language)
+        artifact["schema_version"] = MODEL_SCHEMA_VERSION - 1
+        joblib.dump(artifact, os.path.join(self.temp_dir.name, "python_knn_model.h5"))
+        self.assertIsNone(load_ml_artifact(language))
+
+        with patch('multi_layer_operation_predictor.operation_predictor.train_ml_model', return_value=("trained", "vectorizer")) as mock_train:
+            self.assertEqual(build_ml_model(language, self.operations, None), ("trained", "vectorizer"))
+            mock_train.assert_called_once()
+
 if __name__ == '__main__':
     unittest.main()
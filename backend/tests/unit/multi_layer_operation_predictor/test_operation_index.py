@@ -0,0 +1,248 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import json
+import tempfile
+import threading
+import sys
+import os
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from multi_layer_operation_predictor.operation_index import (
+    OperationIndex,
+    OperationIndexCache,
+    as_operation_index,
+    split_identifier,
+)
+from multi_layer_operation_predictor.operation_predictor import load_aliases
+
+MOCKED_OPERATIONS = {
+    "add_numbers": "Adds two numbers.",
+    "multiply_numbers": "Multiplies two numbers.",
+}
+
+language = "python"
+
+
+def load_json(file_path):
+    with open(file_path, "r") as file:
+        return json.load(file)
+
+
+class TestOperationIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, "python_functions.json")
+        self.write_operations(MOCKED_OPERATIONS)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_operations(self, operations):
+        with open(self.file_path, "w") as file:
+            json.dump(operations, file)
+        # Make sure the rewrite is visible even on filesystems with coarse mtimes
+        stat = os.stat(self.file_path)
+        os.utime(self.file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def test_index_behaves_like_operations_dict(self):
+        index = OperationIndex(MOCKED_OPERATIONS)
+        self.assertEqual(index.names, ["add_numbers", "multiply_numbers"])
+        self.assertEqual(index["add_numbers"], "Adds two numbers.")
+        self.assertIn("multiply_numbers", index)
+        self.assertEqual(dict(index), MOCKED_OPERATIONS)
+        self.assertIs(as_operation_index(index), index)
+
+    def test_find_substring_ranks_shortest_name_first(self):
+        index = OperationIndex({
+            "calculate_square_root": "a",
+            "square_root": "b",
+            "square": "c",
+            "squares": "d",
+        })
+        self.assertEqual(index.find_substring("square"), "square")
+        self.assertEqual(index.find_substring("root"), "square_root")
+        self.assertEqual(index.find_substring("sq"), "square")
+        self.assertIsNone(index.find_substring("cube"))
+        self.assertIsNone(index.find_substring("roots"))
+
+    def test_find_substring_matches_linear_scan(self):
+        names = ["fetch_user", "fetch_users_by_id", "user_id", "delete_user", "update_user_name", "users"]
+        index = OperationIndex({name: name for name in names})
+        for query in ["user", "users", "fetch", "_user", "id", "r_n", "e_user_n", "missing", "u"]:
+            expected = min((name for name in names if query in name), key=lambda name: (len(name), name), default=None)
+            self.assertEqual(index.find_substring(query), expected, query)
+
+    def test_find_alias(self):
+        index = OperationIndex(
+            {"add_numbers": "a", "squareRoot": "b", "sum": "c"},
+            aliases={"sum numbers": "add_numbers", "sqrt": "squareRoot", "total": "missing_operation", "sum": "add_numbers"},
+        )
+        # Name variants of every operation
+        self.assertEqual(index.find_alias("addNumbers"), "add_numbers")
+        self.assertEqual(index.find_alias("add-numbers"), "add_numbers")
+        self.assertEqual(index.find_alias(" Add Numbers "), "add_numbers")
+        self.assertEqual(index.find_alias("square_root"), "squareRoot")
+        # Input examples
+        self.assertEqual(index.find_alias("sumNumbers"), "add_numbers")
+        self.assertEqual(index.find_alias("SQRT"), "squareRoot")
+        # An operation's own name wins over another operation's alias
+        self.assertEqual(index.find_alias("sum"), "sum")
+        # Aliases of operations that are not loaded are ignored
+        self.assertIsNone(index.find_alias("total"))
+        self.assertIsNone(index.find_alias("add"))
+
+    def test_load_aliases(self):
+        aliases_path = os.path.join(self.temp_dir.name, "python_operations_data.json")
+        with open(aliases_path, "w") as file:
+            json.dump([
+                {"operation": "add_numbers", "function": "...", "input_examples": ["addNumbers", "sum numbers"]},
+                {"operation": "sum", "function": "...", "input_examples": ["sum numbers", "total"]},
+            ], file)
+        with patch('multi_layer_operation_predictor.operation_predictor.get_aliases_path', return_value=aliases_path):
+            aliases = load_aliases(language)
+        self.assertEqual(aliases, {"addNumbers": "add_numbers", "sum numbers": "add_numbers", "total": "sum"})
+
+        with patch('multi_layer_operation_predictor.operation_predictor.get_aliases_path', return_value=self.file_path + ".missing"):
+            self.assertEqual(load_aliases(language), {})
+
+    def test_split_identifier(self):
+        self.assertEqual(split_identifier("squareRoot"), "square root")
+        self.assertEqual(split_identifier("add!numbers"), "add numbers")
+
+    def test_cache_reloads_when_aliases_change(self):
+        cache = OperationIndexCache()
+        aliases_path = os.path.join(self.temp_dir.name, "python_operations_data.json")
+        alias_loader = MagicMock(return_value={"plus": "add_numbers"})
+        loader = MagicMock(side_effect=lambda _: load_json(self.file_path))
+
+        first = cache.get(language, self.file_path, loader, aliases_path, alias_loader)
+        self.assertIs(cache.get(language, self.file_path, loader, aliases_path, alias_loader), first)
+        self.assertEqual(first.find_alias("plus"), "add_numbers")
+
+        with open(aliases_path, "w") as file:
+            json.dump([], file)
+        second = cache.get(language, self.file_path, loader, aliases_path, alias_loader)
+        self.assertIsNot(first, second)
+        self.assertEqual(alias_loader.call_count, 2)
+
+    def test_cache_loads_once(self):
+        cache = OperationIndexCache()
+        loader = MagicMock(side_effect=lambda _: load_json(self.file_path))
+
+        first = cache.get(language, self.file_path, loader)
+        second = cache.get(language, self.file_path, loader)
+
+        self.assertIs(first, second)
+        loader.assert_called_once_with(language)
+
+    def test_cache_reloads_when_file_changes(self):
+        cache = OperationIndexCache()
+        loader = MagicMock(side_effect=lambda _: load_json(self.file_path))
+
+        first = cache.get(language, self.file_path, loader)
+        self.write_operations({"divide_numbers": "Divides two numbers."})
+        second = cache.get(language, self.file_path, loader)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(second.names, ["divide_numbers"])
+        self.assertEqual(loader.call_count, 2)
+
+    def test_cache_invalidate(self):
+        cache = OperationIndexCache()
+        loader = MagicMock(side_effect=lambda _: load_json(self.file_path))
+
+        cache.get(language, self.file_path, loader)
+        cache.invalidate(language)
+        cache.get(language, self.file_path, loader)
+        self.assertEqual(loader.call_count, 2)
+
+    def test_missing_file_is_not_cached(self):
+        cache = OperationIndexCache()
+        loader = MagicMock(return_value=MOCKED_OPERATIONS)
+        missing_path = os.path.join(self.temp_dir.name, "missing.json")
+
+        cache.get(language, missing_path, loader)
+        cache.get(language, missing_path, loader)
+        self.assertEqual(loader.call_count, 2)
+
+    def test_tenants_are_cached_separately(self):
+        cache = OperationIndexCache()
+        loader = MagicMock(side_effect=lambda _: load_json(self.file_path))
+
+        shared = cache.get(language, self.file_path, loader)
+        tenant = cache.get(language, self.file_path, loader, tenant="owner__repo__abc")
+        self.assertIsNot(shared, tenant)
+        self.assertIs(cache.get(language, self.file_path, loader, tenant="owner__repo__abc"), tenant)
+        self.assertEqual(loader.call_count, 2)
+
+    def test_cache_loads_outside_the_lock(self):
+        cache = OperationIndexCache()
+        loading = threading.Event()
+        release = threading.Event()
+
+        def slow_loader(_):
+            loading.set()
+            release.wait(5)
+            return load_json(self.file_path)
+
+        slow_loader = MagicMock(side_effect=slow_loader)
+        results = []
+
+        def get_a():
+            results.append(cache.get(language, self.file_path, slow_loader, tenant="a"))
+
+        threads = [threading.Thread(target=get_a) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        self.assertTrue(loading.wait(5))
+
+        # Another tenant is served while tenant a is still loading
+        loader = MagicMock(side_effect=lambda _: load_json(self.file_path))
+        cache.get(language, self.file_path, loader, tenant="b")
+        loader.assert_called_once_with(language)
+
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        # Both lookups of tenant a shared one load
+        slow_loader.assert_called_once_with(language)
+        self.assertIs(results[0], results[1])
+        self.assertIs(cache.get(language, self.file_path, slow_loader, tenant="a"), results[0])
+
+    def test_cache_evicts_least_recently_used_over_budget(self):
+        index_size = OperationIndex(load_json(self.file_path)).memory_size
+        evicted = []
+        cache = OperationIndexCache(max_bytes=2 * index_size, on_evict=evicted.append)
+        loader = MagicMock(side_effect=lambda _: load_json(self.file_path))
+
+        cache.get(language, self.file_path, loader, tenant="a")
+        cache.get(language, self.file_path, loader, tenant="b")
+        # Using a makes b the least recently used
+        cache.get(language, self.file_path, loader, tenant="a")
+        cache.get(language, self.file_path, loader, tenant="c")
+
+        self.assertEqual(evicted, [("b", language)])
+        self.assertNotIn(("b", language), cache)
+        self.assertIn(("a", language), cache)
+        self.assertEqual(cache.memory_size, 2 * index_size)
+        self.assertEqual(loader.call_count, 3)
+
+        # Evicted indexes are loaded from disk again when next used
+        cache.get(language, self.file_path, loader, tenant="b")
+        self.assertEqual(loader.call_count, 4)
+        self.assertEqual(evicted, [("b", language), ("a", language)])
+
+    def test_cache_keeps_index_larger_than_budget(self):
+        cache = OperationIndexCache(max_bytes=1)
+        loader = MagicMock(side_effect=lambda _: load_json(self.file_path))
+
+        first = cache.get(language, self.file_path, loader)
+        self.assertIs(cache.get(language, self.file_path, loader), first)
+        loader.assert_called_once_with(language)
+
+
+if __name__ == '__main__':
+    unittest.main()
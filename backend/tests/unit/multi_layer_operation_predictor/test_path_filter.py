@@ -0,0 +1,82 @@
+import unittest
+import sys
+import os
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from multi_layer_operation_predictor.path_filter import PathFilter, glob_to_regex
+
+
+class TestPathFilter(unittest.TestCase):
+
+    def test_glob_to_regex(self):
+        self.assertTrue(glob_to_regex("*.min.js").fullmatch("static/js/app.min.js"))
+        self.assertTrue(glob_to_regex("src/*.py").fullmatch("src/app.py"))
+        self.assertFalse(glob_to_regex("src/*.py").fullmatch("src/nested/app.py"))
+        self.assertFalse(glob_to_regex("src/*.py").fullmatch("lib/src/app.py"))
+        self.assertTrue(glob_to_regex("src/**/*.py").fullmatch("src/app.py"))
+        self.assertTrue(glob_to_regex("src/**/*.py").fullmatch("src/a/b/app.py"))
+        self.assertTrue(glob_to_regex("**/vendor/**").fullmatch("php/vendor/lib/file.php"))
+        self.assertTrue(glob_to_regex("test_?.py").fullmatch("test_a.py"))
+        self.assertTrue(glob_to_regex("file[!0-9].py").fullmatch("filea.py"))
+        self.assertFalse(glob_to_regex("file[!0-9].py").fullmatch("file1.py"))
+
+    def test_default_excludes_and_globs(self):
+        path_filter = PathFilter(include_globs=["src/**"], exclude_globs=["src/legacy/**"], max_file_size=100)
+        self.assertIsNone(path_filter.check("src/app.js", 10))
+        self.assertEqual(path_filter.check("src/node_modules/lib/index.js"), "excluded")
+        self.assertEqual(path_filter.check("src/legacy/old.js"), "excluded")
+        self.assertEqual(path_filter.check("scripts/deploy.py"), "not_included")
+        self.assertEqual(path_filter.check("src/app.min.js"), "minified")
+        self.assertEqual(path_filter.check("src/api_pb2.py"), "generated")
+        self.assertEqual(path_filter.check("src/app.js", 101), "too_large")
+        self.assertFalse(path_filter.allows_directory("src/vendor"))
+        self.assertTrue(path_filter.allows_directory("src/vendors"))
+
+    def test_gitignore(self):
+        path_filter = PathFilter()
+        path_filter.add_gitignore(".gitignore", "# comment\n\n*.log.py\n!keep.log.py\n/local/\nbuild-*/\n")
+        path_filter.add_gitignore("web/.gitignore", "*.js\n!app.js\n")
+
+        self.assertEqual(path_filter.check("debug.log.py"), "gitignore")
+        self.assertEqual(path_filter.check("deep/dir/debug.log.py"), "gitignore")
+        self.assertIsNone(path_filter.check("keep.log.py"))
+        # Anchored to the directory of the .gitignore
+        self.assertEqual(path_filter.check("local/settings.py"), "gitignore")
+        self.assertIsNone(path_filter.check("app/local/settings.py"))
+        # Directory patterns don't match files of that name
+        self.assertEqual(path_filter.check("build-1/out.js"), "gitignore")
+        self.assertIsNone(path_filter.check("build-1"))
+        self.assertFalse(path_filter.allows_directory("build-2"))
+        # Nested .gitignore files only apply below their directory and win over their parents
+        self.assertEqual(path_filter.check("web/bundle.js"), "gitignore")
+        self.assertIsNone(path_filter.check("web/app.js"))
+        self.assertIsNone(path_filter.check("server/bundle.js"))
+
+    def test_ignored_directory_cannot_be_reincluded(self):
+        path_filter = PathFilter()
+        path_filter.add_gitignore(".gitignore", "out/\n!out/keep.py\n")
+        self.assertEqual(path_filter.check("out/keep.py"), "gitignore")
+
+    def test_check_content(self):
+        path_filter = PathFilter()
+        self.assertIsNone(path_filter.check_content("def add(a, b):\n    return a + b\n"))
+        self.assertEqual(path_filter.check_content("# Code generated by protoc. DO NOT EDIT.\nx = 1\n"), "generated")
+        self.assertEqual(path_filter.check_content("/** @generated */\nfunction f() {}"), "generated")
+        self.assertEqual(path_filter.check_content("var a=1;" * 500), "minified")
+        # A short single line file is not minified
+        self.assertIsNone(path_filter.check_content("const add = (a, b) => a + b;"))
+
+    def test_summary(self):
+        path_filter = PathFilter()
+        path_filter.skip("a.min.js", "minified", 100)
+        path_filter.skip("b.min.js", "minified", 50)
+        path_filter.skip("node_modules/c.js", "excluded")
+        self.assertEqual(path_filter.summary(), {
+            "files": 3, "bytes": 150, "reasons": {"minified": 2, "excluded": 1},
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
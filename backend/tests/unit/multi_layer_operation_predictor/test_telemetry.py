@@ -0,0 +1,137 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from multi_layer_operation_predictor.telemetry import (
+    OTHER_LANGUAGE,
+    PredictionResult,
+    PredictorMetrics,
+    StageTrace,
+    add_prediction_hook,
+    remove_prediction_hook,
+)
+from multi_layer_operation_predictor.operation_predictor import (
+    MatchMethod,
+    get_operation_prediction,
+)
+
+MOCKED_OPERATIONS = {
+    "add_numbers": "Adds two numbers.",
+    "multiply_numbers": "Multiplies two numbers.",
+}
+
+language = "python"
+
+
+@patch('multi_layer_operation_predictor.operation_predictor.load_functions', return_value=MOCKED_OPERATIONS)
+class TestOperationPrediction(unittest.TestCase):
+
+    def setUp(self):
+        self.results = []
+        add_prediction_hook(self.results.append)
+        self.addCleanup(remove_prediction_hook, self.results.append)
+
+    def test_substring_resolution(self, _):
+        result = get_operation_prediction("multiply", language)
+        self.assertEqual(result.definition, MOCKED_OPERATIONS["multiply_numbers"])
+        self.assertEqual(result.method, MatchMethod.SUBSTRING.value)
+        self.assertEqual(result.operation_name, "multiply_numbers")
+        self.assertEqual([stage.method for stage in result.stages], ["alias", "substring"])
+        self.assertEqual(result.stages[1].candidates, 1)
+        self.assertAlmostEqual(result.score, 50.0)
+        self.assertEqual(self.results, [result])
+
+    def test_fuzzy_resolution_records_every_stage(self, _):
+        result = get_operation_prediction("ad_numbers", language)
+        self.assertEqual(result.method, MatchMethod.FUZZY.value)
+        self.assertEqual([stage.method for stage in result.stages], ["alias", "substring", "fuzzy"])
+        self.assertEqual(result.stages[2].candidates, len(MOCKED_OPERATIONS))
+        self.assertGreaterEqual(result.score, 70)
+        self.assertTrue(all(stage.latency >= 0 for stage in result.stages))
+        self.assertGreaterEqual(result.latency, sum(stage.latency for stage in result.stages))
+
+    @patch('multi_layer_operation_predictor.operation_predictor.get_ml_model', return_value=(MagicMock(), MagicMock()))
+    @patch('multi_layer_operation_predictor.operation_predictor.predict_operation_name_ml', side_effect=ValueError)
+    def test_ml_error_is_recorded(self, _, __, ___):
+        result = get_operation_prediction("unknown", language)
+        self.assertEqual(result.definition, "")
+        self.assertIsNone(result.method)
+        self.assertEqual(result.stages[-1].method, MatchMethod.ML_ERROR.value)
+
+    def test_alias_resolution(self, _):
+        result = get_operation_prediction("multiplyNumbers", language)
+        self.assertEqual(result.definition, MOCKED_OPERATIONS["multiply_numbers"])
+        self.assertEqual(result.method, MatchMethod.ALIAS.value)
+        self.assertEqual(len(result.stages), 1)
+
+    def test_failed_query_is_counted_as_error(self, load_functions):
+        load_functions.side_effect = FileNotFoundError
+        with patch('multi_layer_operation_predictor.telemetry.metrics', PredictorMetrics()) as metrics:
+            with self.assertRaises(FileNotFoundError):
+                get_operation_prediction("multiply", "cobol")
+            rendered = metrics.render()
+
+        self.assertEqual(self.results, [])
+        self.assertEqual(metrics.resolutions, {})
+        self.assertIn('operation_predictor_errors_total{language="cobol",error="FileNotFoundError"} 1', rendered)
+
+    def test_failing_hook_does_not_fail_prediction(self, _):
+        def failing_hook(result):
+            raise RuntimeError("hook failed")
+
+        add_prediction_hook(failing_hook)
+        self.addCleanup(remove_prediction_hook, failing_hook)
+        result = get_operation_prediction("multiply", language)
+        self.assertEqual(result.definition, MOCKED_OPERATIONS["multiply_numbers"])
+
+
+class TestPredictorMetrics(unittest.TestCase):
+
+    def test_render(self):
+        metrics = PredictorMetrics()
+        result = PredictionResult("add", language, "def add(): ...", "add", "fuzzy", 80.0, 0.002, [
+            StageTrace("substring", 0.0004, 0),
+            StageTrace("fuzzy", 0.0015, 2, 80.0, "add"),
+        ])
+        metrics(result)
+        metrics(PredictionResult("xyz", language, latency=0.003, stages=[StageTrace("substring", 0.0001, 0)]))
+        rendered = metrics.render()
+
+        self.assertIn('operation_predictor_resolutions_total{language="python",method="fuzzy"} 1', rendered)
+        self.assertIn('operation_predictor_resolutions_total{language="python",method="none"} 1', rendered)
+        self.assertIn('operation_predictor_stage_seconds_bucket{stage="substring",le="0.0005"} 2', rendered)
+        self.assertIn('operation_predictor_stage_seconds_count{stage="fuzzy"} 1', rendered)
+        self.assertIn('operation_predictor_stage_score_bucket{stage="fuzzy",le="80"} 1', rendered)
+        self.assertIn('operation_predictor_request_seconds_count{stage="all"} 2', rendered)
+
+    def test_unknown_languages_share_one_series(self):
+        metrics = PredictorMetrics(languages=[language])
+        metrics(PredictionResult("add", language, method="fuzzy"))
+        metrics(PredictionResult("add", "cobol", method="fuzzy"))
+        metrics(PredictionResult("add", 'evil"} 1\nfake_metric{a="', method="fuzzy"))
+        rendered = metrics.render()
+
+        self.assertIn('operation_predictor_resolutions_total{language="python",method="fuzzy"} 1', rendered)
+        other = f'operation_predictor_resolutions_total{{language="{OTHER_LANGUAGE}",method="fuzzy"}} 2'
+        self.assertIn(other, rendered)
+        self.assertNotIn("cobol", rendered)
+        self.assertNotIn("fake_metric", rendered)
+
+    def test_label_values_are_escaped(self):
+        metrics = PredictorMetrics()
+        metrics(PredictionResult("add", 'evil"} 1\nfake_metric{a="\\', method="fuzzy"))
+        rendered = metrics.render()
+
+        self.assertIn(
+            'operation_predictor_resolutions_total{language="evil\\"} 1\\nfake_metric{a=\\"\\\\",method="fuzzy"} 1',
+            rendered,
+        )
+        self.assertFalse(any(line.startswith("fake_metric") for line in rendered.splitlines()))
+
+
+if __name__ == '__main__':
+    unittest.main()
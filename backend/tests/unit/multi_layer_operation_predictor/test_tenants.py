@@ -0,0 +1,82 @@
+import unittest
+from unittest.mock import patch
+import json
+import tempfile
+import sys
+import os
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))))
+
+from multi_layer_operation_predictor.tenants import get_tenant_key, get_tenant_path
+from multi_layer_operation_predictor.extract_functions_from_repo import FunctionExtractor
+from multi_layer_operation_predictor.operation_predictor import get_operation_definitions, get_operation_index
+
+language = "python"
+
+
+class TestTenants(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_dir = os.path.join(self.temp_dir.name, "data")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_tenant_key(self):
+        key = get_tenant_key("User@Example.com", "https://github.com/Owner/Repo.git/")
+        self.assertEqual(key, get_tenant_key("user@example.com", "https://github.com/owner/repo"))
+        self.assertTrue(key.startswith("owner__repo__"))
+        self.assertNotIn("example", key)
+        self.assertNotEqual(key, get_tenant_key("other@example.com", "https://github.com/owner/repo"))
+        self.assertEqual(get_tenant_key("a@b.c", "https://github.com/o/../x y")[:8], "..__x_y_")
+
+    def test_invalid_repository_url(self):
+        for repo_url in ("repo", "/repo", "owner//", None):
+            with self.assertRaises(ValueError):
+                get_tenant_key("user_1", repo_url)
+
+    def test_tenant_path(self):
+        self.assertEqual(get_tenant_path("data", None, "python_functions.json"), os.path.join("data", "python_functions.json"))
+        self.assertEqual(
+            get_tenant_path("data", "owner__repo__abc", "python_functions.json"),
+            os.path.join("data", "tenants", "owner__repo__abc", "python_functions.json"),
+        )
+
+    def test_manifests_are_per_tenant(self):
+        repo_url = "https://github.com/owner/repo"
+        first = FunctionExtractor(repo_url, tenant=get_tenant_key("user_1", repo_url))
+        second = FunctionExtractor(repo_url, tenant=get_tenant_key("user_2", repo_url))
+        self.assertNotEqual(first.get_manifest_path(), second.get_manifest_path())
+        self.assertEqual(os.path.dirname(first.manifest_dir), first.get_data_dir())
+        self.assertTrue(FunctionExtractor(repo_url).manifest_dir.endswith(os.path.join("data", "manifests")))
+
+    def save_functions(self, user, functions):
+        tenant = get_tenant_key(user, "https://github.com/owner/repo")
+        extractor = FunctionExtractor("https://github.com/owner/repo", tenant=tenant)
+        extractor.functions_by_language[language] = functions
+        with patch.object(FunctionExtractor, "get_absolute_path", side_effect=lambda path: os.path.join(self.temp_dir.name, path)):
+            extractor.save_functions_to_store()
+        return tenant
+
+    def test_users_get_their_own_functions(self):
+        first = self.save_functions("first@example.com", {"add_numbers": "def add_numbers(a, b): ..."})
+        second = self.save_functions("second@example.com", {"multiply_numbers": "def multiply_numbers(a, b): ..."})
+        self.assertFalse(os.path.exists(os.path.join(self.data_dir, "python_functions.store")))
+
+        with patch('multi_layer_operation_predictor.operation_predictor.get_absolute_path',
+                   side_effect=lambda path: os.path.join(self.temp_dir.name, path)), \
+                patch('multi_layer_operation_predictor.operation_predictor.get_ml_model', return_value=(None, None)):
+            self.assertEqual(list(get_operation_index(language, first)), ["add_numbers"])
+            self.assertEqual(list(get_operation_index(language, second)), ["multiply_numbers"])
+            self.assertEqual(
+                get_operation_definitions(["add_numbers", "multiply_numbers"], language, second),
+                ["", "def multiply_numbers(a, b): ..."],
+            )
+            # A repository nothing was extracted from for the language has no functions
+            self.assertEqual(len(get_operation_index("java", first)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
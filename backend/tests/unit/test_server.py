@@ -0,0 +1,79 @@
+import unittest
+from unittest.mock import patch
+import asyncio
+import tempfile
+import threading
+import sys
+import os
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+# Keep the function index of these tests out of the real one
+os.environ.setdefault("FUNCTION_INDEX_PATH", os.path.join(tempfile.mkdtemp(), "function_index.sqlite3"))
+
+try:
+    import server
+except ImportError:
+    # fastapi is only installed with the full application
+    server = None
+
+
+@unittest.skipIf(server is None, "fastapi is not installed")
+class TestScanRepository(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+        self.release = threading.Event()
+
+    def refresh_repository(self, repo_path):
+        with self.lock:
+            self.calls.append(repo_path)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        self.release.wait(5)
+        with self.lock:
+            self.running -= 1
+
+    def run_scans(self, repo_paths):
+        async def scan_all():
+            # The semaphore has to belong to the event loop of this run
+            with patch.object(server, "scan_slots", asyncio.Semaphore(server.MAX_CONCURRENT_SCANS)):
+                scans = asyncio.gather(*(server.scan_repository(repo_path) for repo_path in repo_paths))
+                # Let every request reach the scans before they are allowed to finish
+                await asyncio.sleep(0.1)
+                self.release.set()
+                await scans
+
+        with patch.object(server, "refresh_repository", side_effect=self.refresh_repository), \
+                patch.object(server, "index_watcher", None):
+            asyncio.run(scan_all())
+
+    def test_concurrent_requests_share_one_scan(self):
+        repo_path = os.path.realpath(tempfile.gettempdir())
+        self.run_scans([repo_path] * 5)
+
+        self.assertEqual(self.calls, [repo_path])
+        self.assertEqual(server.scans_in_flight, {})
+
+    def test_scans_are_bounded(self):
+        repo_paths = [os.path.realpath(f"/repo{i}") for i in range(server.MAX_CONCURRENT_SCANS + 2)]
+        self.run_scans(repo_paths)
+
+        self.assertEqual(sorted(self.calls), sorted(repo_paths))
+        self.assertLessEqual(self.max_running, server.MAX_CONCURRENT_SCANS)
+
+    def test_later_request_scans_again(self):
+        repo_path = os.path.realpath(tempfile.gettempdir())
+        self.release.set()
+        self.run_scans([repo_path])
+        self.run_scans([repo_path])
+
+        self.assertEqual(self.calls, [repo_path, repo_path])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -32,6 +32,8 @@ export interface ToolsState {
   isEditorVisible: boolean;
   openFiles: File | null;
   openFolders: FileList | null;
+  // Repository whose extracted functions the multi-layer model completes with
+  repoUrl: string | null;
 }
 
 export interface Params {
@@ -41,6 +43,7 @@ export interface Params {
   language: keyof typeof supported_language_versions;
   model: Model;
   toggle: boolean;
+  repo_url: string | null;
 }
 
 interface ToolsProps {
@@ -66,6 +69,7 @@ const ToolsContext = createContext<ToolsProps>({
     isEditorVisible: true,
     openFiles: null,
     openFolders: null,
+    repoUrl: null,
   },
   params: {
     prefix: "",
@@ -74,6 +78,7 @@ const ToolsContext = createContext<ToolsProps>({
     language: "javascript",
     model: Model.Groq,
     toggle: false,
+    repo_url: null,
   },
   setParams: () => {},
   updateState: () => {},
@@ -103,13 +108,14 @@ export const ToolsProvider: React.FC<{ children: ReactNode }> = ({
             uploadFolders: null,
             toggle: false,
             isEditorVisible: false,
+            repoUrl: null,
           }),
       openFiles: savedOpenFiles ? JSON.parse(savedOpenFiles) : null,
       openFolders: savedOpenFolders ? JSON.parse(savedOpenFolders) : null,
     };
   }, []);
   const [state, setState] = useState<ToolsState>(initialState);
-  const { selectedModel, language, openFiles, openFolders } = state;
+  const { selectedModel, language, openFiles, openFolders, repoUrl } = state;
 
   const initialParams = useMemo<Params>(() => ({
     prefix: "",
@@ -118,9 +124,14 @@ export const ToolsProvider: React.FC<{ children: ReactNode }> = ({
     language: language,
     model: selectedModel,
     toggle: false,
-  }), [language, selectedModel]);
+    repo_url: repoUrl ?? null,
+  }), [language, selectedModel, repoUrl]);
   const [params, setParams] = useState<Params>(initialParams);
 
+  useEffect(() => {
+    setParams((prev) => ({ ...prev, repo_url: repoUrl ?? null }));
+  }, [repoUrl]);
+
   const API = axios.create({
     baseURL: "https://emkc.org/api/v2/piston",
   });
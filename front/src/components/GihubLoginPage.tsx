@@ -9,22 +9,53 @@ import { IconBrandGithub, IconCheck, IconClock, IconArrowLeft, IconLink, IconCod
 import { useLocation, useNavigate } from "react-router-dom";
 import useLazyApi, { BackendEndpoints, FetchOptions } from "../hooks/useLazyApi";
 import { RequestStatus } from "./Layout/types";
+import { useTools } from "./CodeCompletionToolsProviders";
 
 const encodeCode = (code: string): string => {
     return btoa(code);
 };
 
+// Seconds between polls of a running extraction job
+const EXTRACTION_POLL_INTERVAL = 2;
+
+interface ExtractionProgress {
+    files_total?: number;
+    files_unchanged?: number;
+    files_fetched?: number;
+    files_parsed?: number;
+    functions_found?: number;
+    files_skipped?: number;
+}
+
 interface ExtractFunctionsResponse {
     status: RequestStatus;
+    job_id?: string;
+    repo_url?: string;
+    progress?: ExtractionProgress;
     message?: string;
 }
 
+const isJobActive = (job: ExtractFunctionsResponse | null) =>
+    job?.status === RequestStatus.QUEUED || job?.status === RequestStatus.RUNNING;
+
+const formatProgress = (job: ExtractFunctionsResponse | null) => {
+    if (job?.status === RequestStatus.QUEUED) {
+        return 'Waiting for other extractions to finish';
+    }
+    const { files_total = 0, files_unchanged = 0, files_parsed = 0, files_skipped = 0 } = job?.progress || {};
+    const skipped = files_skipped ? `, ${files_skipped} vendored or generated files skipped` : '';
+    return files_total
+        ? `${files_unchanged + files_parsed} of ${files_total} files processed${skipped}`
+        : 'Listing repository files';
+};
+
 export default function GithubLoginPage() {
     const [repoUrl, setRepoUrl] = useState("");
     const processedCode = React.useRef<string | null>(null);
     const { user } = useUser();
     const { handleLogin } = useGitHubOAuth();
     const { colorScheme } = useMantineColorScheme();
+    const { updateState } = useTools();
     const location = useLocation();
     const navigate = useNavigate();
     const email = user?.primaryEmailAddress?.emailAddress;
@@ -43,6 +74,18 @@ export default function GithubLoginPage() {
         data: extractResponse
     } = useLazyApi<ExtractFunctionsResponse>(BackendEndpoints.ExtractRepoFunctions);
 
+    const {
+        fetchData: fetchExtractionStatus,
+        error: statusError,
+        data: statusResponse
+    } = useLazyApi<ExtractFunctionsResponse>(BackendEndpoints.ExtractRepoFunctionsStatus);
+
+    // The latest known state of the job started by the last extraction request
+    const extractionJob = statusResponse && statusResponse.job_id === extractResponse?.job_id
+        ? statusResponse
+        : extractResponse;
+    const isExtractionRunning = isExtracting || (isJobActive(extractionJob) && !statusError);
+
     // Check for OAuth callback on mount and URL changes
     useEffect(() => {
         const queryParams = new URLSearchParams(location.search);
@@ -77,19 +120,34 @@ export default function GithubLoginPage() {
         await extractFunctions(options);
     };
 
-    // Handle extract functions response
+    // Poll the extraction job until it finishes
     useEffect(() => {
-        if (extractResponse) {
-            if (extractResponse.status === RequestStatus.SUCCESS) {
-                toast.success("Functions extracted successfully!");
-            } else {
-                toast.error(extractResponse.message || "Failed to extract functions");
-            }
+        if (!extractionJob) {
+            return;
+        }
+        if (isJobActive(extractionJob)) {
+            const timeout = setTimeout(() => {
+                fetchExtractionStatus({ method: "GET", params: { job_id: extractionJob.job_id } });
+            }, EXTRACTION_POLL_INTERVAL * 1000);
+            return () => clearTimeout(timeout);
         }
+        if (extractionJob.status === RequestStatus.SUCCESS) {
+            // Completions use the functions of the repository extracted last
+            updateState("repoUrl", extractionJob.repo_url ?? repoUrl);
+            toast.success("Functions extracted successfully!");
+        } else {
+            toast.error(extractionJob.message || "Failed to extract functions");
+        }
+    }, [extractionJob]);
+
+    useEffect(() => {
         if (extractError) {
             toast.error("Failed to extract functions: " + extractError);
         }
-    }, [extractResponse, extractError]);
+        if (statusError) {
+            toast.error("Failed to check extraction progress: " + statusError);
+        }
+    }, [extractError, statusError]);
 
     return (
         <Box 
@@ -195,7 +253,7 @@ export default function GithubLoginPage() {
                                 <Text fw={500} size="lg">Step 3: Extract Functions</Text>
                                 <Button 
                                     onClick={handleExtractFunctions}
-                                    loading={isExtracting}
+                                    loading={isExtractionRunning}
                                     disabled={!repoUrl.trim() || tokenStatus?.status !== RequestStatus.SUCCESS}
                                     variant="gradient"
                                     gradient={{ from: 'blue', to: 'cyan', deg: 90 }}
@@ -203,8 +261,11 @@ export default function GithubLoginPage() {
                                     size="md"
                                     leftSection={<IconCode size={20} />}
                                 >
-                                    {isExtracting ? 'Extracting Functions...' : 'Start Function Extraction'}
+                                    {isExtractionRunning ? 'Extracting Functions...' : 'Start Function Extraction'}
                                 </Button>
+                                {isExtractionRunning && (
+                                    <Text size="sm" c="dimmed">{formatProgress(extractionJob)}</Text>
+                                )}
                             </Stack>
                         </Stack>
                     </form>
@@ -21,6 +21,8 @@ export const supported_language_versions = {
 };
 
 export enum RequestStatus {
+  QUEUED = 'QUEUED',
+  RUNNING = 'RUNNING',
   SUCCESS = 'SUCCESS',
   FAILED = 'FAILED'
 }
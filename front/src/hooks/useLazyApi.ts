@@ -12,6 +12,7 @@ export enum BackendEndpoints {
   ChatHistory = "chat-history",
   GetGithubToken = "get-github-token",
   ExtractRepoFunctions = "extract-repo-functions",
+  ExtractRepoFunctionsStatus = "extract-repo-functions/status",
   AllChatHistories = "all-chat-histories",
 }
 